@@ -14,6 +14,7 @@ from .stats.routes import stats_bp
 from app.media.routes import media_bp
 from .db import db
 from .utils import populate_exercise_table
+from database.migrations import apply_migrations
 
 from dotenv import load_dotenv  # <-- if you’re using a .env
 
@@ -77,9 +78,28 @@ def create_app():
     def healthz():
         return "ok", 200
 
+    # Pool counters and per-query timings are internal; only exposed when
+    # DB_STATS_ENDPOINT is set, otherwise the route is a liveness check.
+    db_stats_endpoint = os.getenv("DB_STATS_ENDPOINT", "0").strip().lower() in ("1", "true", "yes", "on")
+
+    @app.get("/healthz/db")
+    def healthz_db():
+        if db_stats_endpoint:
+            return jsonify({**db.pool_stats(), "queries": db.query_stats()}), 200
+        try:
+            db.execute("SELECT 1;", fetch=True)
+        except Exception as e:
+            print(f"DB health check failed: {e}")
+            return jsonify({"status": "error"}), 503
+        return jsonify({"status": "ok"}), 200
+
     # ---------------------------
     # Ensure DB init on startup
     # ---------------------------
+    # Apply pending schema migrations (or run `python -m database.migrate`)
+    if os.getenv("DB_MIGRATE_ON_STARTUP", "0").strip().lower() in ("1", "true", "yes", "on"):
+        apply_migrations(db)
+
     # populate_exercise_table(db, drop=True)
     # populate_exercise_table -> params: db, drop=False
     
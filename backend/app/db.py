@@ -1,3 +1,3 @@
 from database.database import Database
 
-db = Database()  # create the global database instance
+db = Database()  # create the global database instance (connects lazily, per process)
@@ -1,5 +1,7 @@
 from flask import Blueprint, request, jsonify
+from psycopg2.extras import execute_values
 from app.db import db  # import the db instance from app/db.py
+from app.venues.utils import bump_equipment_version
 # import json
 
 equipment_bp = Blueprint("equipment", __name__, url_prefix="/equipment")
@@ -133,6 +135,8 @@ def update_user_equipment(equipment_id, user_id):
             db.execute(insert_query, (current_venue_id, equipment_id, 1))
             action = "added"
 
+        bump_equipment_version(db, current_venue_id)
+
     except Exception as e:
         return jsonify({"error": "Error updating user equipment", "details": str(e)}), 500
     
@@ -240,6 +244,7 @@ def add_equipment():
                     WHERE venue_id = %s AND equipment_id = %s;
                 """
                 db.execute(update_q, (quantity, current_venue_id, equipment_id))
+                bump_equipment_version(db, current_venue_id)
                 return jsonify({"message": "Equipment quantity updated successfully"}), 200
             else:
                 insert_q = """
@@ -247,6 +252,7 @@ def add_equipment():
                     VALUES (%s, %s, %s);
                 """
                 db.execute(insert_q, (current_venue_id, equipment_id, quantity))
+                bump_equipment_version(db, current_venue_id)
                 return jsonify({"message": "Equipment added successfully"}), 200
 
         # --- Bulk add path (quantity is null / not provided) ---
@@ -275,6 +281,7 @@ def add_equipment():
                 VALUES (%s, %s, %s);
             """
             db.execute(fallback_insert, (current_venue_id, equipment_id, 2))
+            bump_equipment_version(db, current_venue_id)
             return jsonify({
                 "message": "No variants found; added the provided equipment with quantity 2"
             }), 200
@@ -294,10 +301,11 @@ def add_equipment():
         if to_insert:
             insert_many_q = """
                 INSERT INTO Venue_equipment (venue_id, equipment_id, quantity)
-                VALUES (%s, %s, %s);
+                VALUES %s;
             """
-            for eid in to_insert:
-                db.execute(insert_many_q, (current_venue_id, eid, 2))
+            with db.transaction() as tx:
+                execute_values(tx.cursor, insert_many_q, [(current_venue_id, eid, 2) for eid in to_insert])
+                bump_equipment_version(db, current_venue_id)
 
         added_count = len(to_insert)
         skipped_count = len(variant_ids) - added_count
@@ -353,6 +361,7 @@ def remove_equipment():
             WHERE venue_id = %s AND equipment_id = %s;
         """
         db.execute(delete_query, (current_venue_id, equipment_id))
+        bump_equipment_version(db, current_venue_id)
     except Exception as e:
         return jsonify({"error": "Error removing equipment", "details": str(e)}), 500
 
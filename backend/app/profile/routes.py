@@ -384,82 +384,81 @@ def delete_user_account():
         picture_url = None  # non-fatal
 
     try:
-        # db.execute("BEGIN;")
-
-        # 1) Delete children of SUGGESTED/ACTUAL, then parents, then workouts
-        db.execute(
-            """
-            DELETE FROM suggested_exercise_records
-            WHERE suggested_workout_id IN (
-                SELECT sw.suggested_workout_id
-                FROM suggested_workouts sw
-                JOIN workouts w ON w.workout_id = sw.workout_id
-                WHERE w.user_id = %s
-            );
-            """,
-            (user_id,),
-        )
-        db.execute(
-            """
-            DELETE FROM suggested_workouts
-            WHERE workout_id IN (
-                SELECT workout_id
-                FROM workouts
-                WHERE user_id = %s
-            );
-            """,
-            (user_id,),
-        )
-        db.execute(
-            """
-            DELETE FROM actual_exercise_records
-            WHERE actual_workout_id IN (
-                SELECT aw.actual_workout_id
-                FROM actual_workout aw
-                JOIN workouts w ON w.workout_id = aw.workout_id
-                WHERE w.user_id = %s
-            );
-            """,
-            (user_id,),
-        )
-        db.execute(
-            """
-            DELETE FROM actual_workout
-            WHERE workout_id IN (
-                SELECT workout_id
-                FROM workouts
-                WHERE user_id = %s
-            );
-            """,
-            (user_id,),
-        )
-        db.execute("DELETE FROM workouts WHERE user_id = %s;", (user_id,))
-
-        # 2) Venue-related
-        db.execute(
-            """
-            DELETE FROM Venue_equipment
-            WHERE venue_id IN (
-                SELECT venue_id FROM Venues WHERE user_id = %s
-            );
-            """,
-            (user_id,),
-        )
-        db.execute("DELETE FROM Venues WHERE user_id = %s;", (user_id,))
-
-        # 3) Other direct user-owned tables
-        db.execute("DELETE FROM Milestones WHERE user_id = %s;", (user_id,))
-        db.execute("DELETE FROM exercise_preferences WHERE user_id = %s;", (user_id,))
-        db.execute("DELETE FROM password_resets WHERE user_id = %s;", (user_id,))
-        db.execute("DELETE FROM user_providers WHERE user_id = %s;", (user_id,))
-
-        # NEW: Clear Users.picture explicitly (helps with soft deletes / audit trails)
-        db.execute("UPDATE Users SET picture = NULL WHERE user_id = %s;", (user_id,))
-
-        # 4) Finally, delete the user
-        db.execute("DELETE FROM Users WHERE user_id = %s;", (user_id,))
-
-        # db.execute("COMMIT;")
+        with db.transaction():
+            # 1) Delete children of SUGGESTED/ACTUAL, then parents, then workouts
+            db.execute(
+                """
+                DELETE FROM suggested_exercise_records
+                WHERE suggested_workout_id IN (
+                    SELECT sw.suggested_workout_id
+                    FROM suggested_workouts sw
+                    JOIN workouts w ON w.workout_id = sw.workout_id
+                    WHERE w.user_id = %s
+                );
+                """,
+                (user_id,),
+            )
+            db.execute(
+                """
+                DELETE FROM suggested_workouts
+                WHERE workout_id IN (
+                    SELECT workout_id
+                    FROM workouts
+                    WHERE user_id = %s
+                );
+                """,
+                (user_id,),
+            )
+            db.execute(
+                """
+                DELETE FROM actual_exercise_records
+                WHERE actual_workout_id IN (
+                    SELECT aw.actual_workout_id
+                    FROM actual_workout aw
+                    JOIN workouts w ON w.workout_id = aw.workout_id
+                    WHERE w.user_id = %s
+                );
+                """,
+                (user_id,),
+            )
+            db.execute(
+                """
+                DELETE FROM actual_workout
+                WHERE workout_id IN (
+                    SELECT workout_id
+                    FROM workouts
+                    WHERE user_id = %s
+                );
+                """,
+                (user_id,),
+            )
+            db.execute("DELETE FROM workouts WHERE user_id = %s;", (user_id,))
+
+            # 2) Venue-related
+            db.execute(
+                """
+                DELETE FROM Venue_equipment
+                WHERE venue_id IN (
+                    SELECT venue_id FROM Venues WHERE user_id = %s
+                );
+                """,
+                (user_id,),
+            )
+            db.execute("DELETE FROM Venues WHERE user_id = %s;", (user_id,))
+
+            # 3) Other direct user-owned tables
+            db.execute("DELETE FROM Milestones WHERE user_id = %s;", (user_id,))
+            db.execute("DELETE FROM exercise_preferences WHERE user_id = %s;", (user_id,))
+            db.execute("DELETE FROM user_exercise_history WHERE user_id = %s;", (user_id,))
+            db.execute("DELETE FROM user_daily_stats WHERE user_id = %s;", (user_id,))
+            db.execute("DELETE FROM password_resets WHERE user_id = %s;", (user_id,))
+            db.execute("DELETE FROM user_providers WHERE user_id = %s;", (user_id,))
+
+            # NEW: Clear Users.picture explicitly (helps with soft deletes / audit trails)
+            db.execute("UPDATE Users SET picture = NULL WHERE user_id = %s;", (user_id,))
+
+            # 4) Finally, delete the user
+            db.execute("DELETE FROM Users WHERE user_id = %s;", (user_id,))
 
         # Post-commit: try to delete the local avatar file if it exists
         try:
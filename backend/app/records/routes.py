@@ -1,21 +1,107 @@
 from flask import Blueprint, jsonify
+from datetime import date as date_cls
 from app.db import db
 
 records_bp = Blueprint("records", __name__, url_prefix="/records")
 
+
+# ---------------------------------------------------------------------
+# Month of training records
+#
+# Notes:
+# - Two queries per request, however many sessions the month has: the
+#   month's workouts, then every exercise record of those workouts with
+#   the personal best it has to beat (MONTH_RECORDS_QUERY).
+# - The personal best before a session is the heaviest completed set
+#   (sets[i] = 1, numeric load) of that exercise on any earlier day. It is
+#   computed once per (exercise, day) as a running max over the user's
+#   history of the month's exercises, instead of one scan of that history
+#   per record.
+# ---------------------------------------------------------------------
+
+MONTH_WORKOUTS_QUERY = """
+    SELECT w.workout_id, w.date, w.phase, w.split_group, aw.duration_actual
+    FROM workouts w
+    LEFT JOIN actual_workout aw ON w.workout_id = aw.workout_id
+    WHERE w.user_id = %s
+      AND w.date >= %s
+      AND w.date < %s
+    ORDER BY w.date DESC;
+"""
+
+MONTH_RECORDS_QUERY = """
+    WITH month_records AS (
+        SELECT aw.workout_id, w.date, aer.exercise_id,
+               aer.intensity, aer.load_numeric, aer.reps, aer.sets,
+               aer.exercise_type, aer.order_index
+        FROM actual_workout aw
+        JOIN workouts w ON w.workout_id = aw.workout_id
+        JOIN actual_exercise_records aer ON aer.actual_workout_id = aw.actual_workout_id
+        WHERE aw.workout_id = ANY(%(workout_ids)s)
+    ),
+    day_best AS (
+        -- heaviest completed set per exercise and training day (NULL if none)
+        SELECT aer.exercise_id, w.date,
+               MAX(st.load) FILTER (WHERE st.sr = 1) AS best
+        FROM workouts w
+        JOIN actual_workout aw ON aw.workout_id = w.workout_id
+        JOIN actual_exercise_records aer ON aer.actual_workout_id = aw.actual_workout_id
+        LEFT JOIN LATERAL UNNEST(aer.load_numeric, aer.sets) AS st(load, sr) ON TRUE
+        WHERE w.user_id = %(user_id)s
+          AND w.date <= (SELECT MAX(date) FROM month_records)
+          AND aer.exercise_id IN (SELECT exercise_id FROM month_records)
+        GROUP BY aer.exercise_id, w.date
+    ),
+    prior_best AS (
+        -- best over strictly earlier days (EXCLUDE GROUP drops the day itself)
+        SELECT exercise_id, date,
+               MAX(best) OVER (
+                   PARTITION BY exercise_id ORDER BY date
+                   RANGE BETWEEN UNBOUNDED PRECEDING AND CURRENT ROW EXCLUDE GROUP
+               ) AS past_best
+        FROM day_best
+    )
+    SELECT
+        r.workout_id,
+        r.exercise_id,
+        r.intensity,           -- TEXT[]
+        r.load_numeric,        -- REAL[] (intensity as a number, else NULL)
+        r.reps,                -- INT[]
+        r.sets,                -- INT[]
+        e.name          AS exercise_name,
+        e.main_muscles,
+        e.secondary_muscles,
+        r.exercise_type,
+        p.past_best
+    FROM month_records r
+    JOIN Exercises e ON r.exercise_id = e.exercise_id
+    LEFT JOIN prior_best p ON p.exercise_id = r.exercise_id AND p.date = r.date
+    ORDER BY r.workout_id, r.order_index;
+"""
+
+
 @records_bp.route("/<int:user_id>/<int:month>/<int:year>", methods=["GET"])
 def get_user_records(user_id, month, year):
     try:
-        workout_query = """
-            SELECT w.workout_id, w.date, w.phase, w.split_group, aw.duration_actual
-            FROM workouts w
-            LEFT JOIN actual_workout aw ON w.workout_id = aw.workout_id
-            WHERE w.user_id = %s
-              AND EXTRACT(MONTH FROM w.date) = %s
-              AND EXTRACT(YEAR  FROM w.date) = %s
-            ORDER BY w.date DESC;
-        """
-        workouts = db.execute(workout_query, (user_id, month, year), fetch=True)
+        # A month range (instead of EXTRACT on w.date) lets idx_workouts_user_date serve it
+        try:
+            month_start = date_cls(year, month, 1)
+            month_end = date_cls(year + month // 12, month % 12 + 1, 1)
+        except ValueError:
+            workouts = []
+        else:
+            workouts = db.execute(MONTH_WORKOUTS_QUERY, (user_id, month_start, month_end), fetch=True)
+
+        # Every exercise record of the month, with its prior personal best
+        records_by_workout = {}
+        if workouts:
+            records = db.execute(
+                MONTH_RECORDS_QUERY,
+                {"user_id": user_id, "workout_ids": [w[0] for w in workouts]},
+                fetch=True
+            )
+            for record in records or []:
+                records_by_workout.setdefault(record[0], []).append(record[1:])
 
         sessions = []
 
@@ -29,24 +115,7 @@ def get_user_records(user_id, month, year):
         for workout in workouts or []:
             workout_id, date, phase, split_group, duration_actual = workout
 
-            # Pull intensity (TEXT[]), reps, sets, names, muscles, and exercise_type
-            exercise_query = """
-                SELECT
-                    aer.exercise_id,
-                    aer.intensity,           -- TEXT[]
-                    aer.reps,                -- INT[]
-                    aer.sets,                -- INT[]
-                    e.name          AS exercise_name,
-                    e.main_muscles,
-                    e.secondary_muscles,
-                    aer.exercise_type
-                FROM actual_exercise_records aer
-                JOIN Exercises e ON aer.exercise_id = e.exercise_id
-                WHERE aer.actual_workout_id = (
-                    SELECT actual_workout_id FROM actual_workout WHERE workout_id = %s
-                );
-            """
-            exercise_records = db.execute(exercise_query, (workout_id,), fetch=True)
+            exercise_records = records_by_workout.get(workout_id, [])
 
             total_volume = 0.0
             total_sets = 0
@@ -56,8 +125,8 @@ def get_user_records(user_id, month, year):
             exercise_dict = {}
 
             for record in exercise_records or []:
-                (exercise_id, intensity_arr, reps_arr, sets_arr, exercise_name,
-                 main_muscles, secondary_muscles, exercise_type) = record
+                (exercise_id, intensity_arr, load_arr, reps_arr, sets_arr, exercise_name,
+                 main_muscles, secondary_muscles, exercise_type, past_best) = record
 
                 # Normalize arrays
                 reps = []
@@ -77,9 +146,9 @@ def get_user_records(user_id, month, year):
                 numeric_intensity = []
 
                 if exercise_type == 'Gym Equipment':
-                    numeric_intensity = [float(i) for i in intensity_arr]
+                    numeric_intensity = [w if w is not None else 0.0 for w in (load_arr or [])]
                 else:
-                    numeric_intensity = intensity_arr
+                    numeric_intensity = intensity_arr or []
 
                 # Compute volume on aligned indices only; sets==1 means
                 # completed
@@ -127,25 +196,7 @@ def get_user_records(user_id, month, year):
 
                 # ----- Personal Best (historical) -----
                 # Only completed sets (sets[i] = 1), numeric intensity, and strictly before this session date
-                personal_best_query = """
-                    SELECT MAX(val::DECIMAL) AS best_weight
-                    FROM (
-                        SELECT it.iv AS val
-                        FROM actual_exercise_records aer
-                        JOIN actual_workout aw ON aer.actual_workout_id = aw.actual_workout_id
-                        JOIN workouts w ON w.workout_id = aw.workout_id
-                        , UNNEST(aer.intensity) WITH ORDINALITY AS it(iv, i)
-                        , UNNEST(aer.sets)      WITH ORDINALITY AS st(sr, j)
-                        WHERE w.user_id = %s
-                          AND aer.exercise_id = %s
-                          AND w.date < %s
-                          AND i = j              -- align indices
-                          AND sr = 1             -- completed sets only
-                          AND iv ~ '^[0-9]+(\\.[0-9]+)?$'  -- numeric intensity only
-                    ) t;
-                """
-                past_best = db.execute(personal_best_query, (user_id, exercise_id, date), fetch=True)
-                best_weight = float(past_best[0][0]) if past_best and past_best[0] and past_best[0][0] is not None else 0.0
+                best_weight = float(past_best) if past_best is not None else 0.0
 
                 # Current-session PB should consider only completed sets
 
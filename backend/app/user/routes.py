@@ -1,8 +1,22 @@
 from flask import Blueprint, request, jsonify
 from app.db import db  # import the db instance from app/db.py
+from app.workout.training_context import training_context_cache
 
 user_bp = Blueprint("user", __name__, url_prefix="/user")
 
+@user_bp.after_request
+def _drop_cached_training_context(response):
+    """
+    User fields (level, birthday, current venue) feed the cached
+    TrainingContext; drop it after successful writes.
+    """
+    if request.method != "GET" and response.status_code < 400:
+        args = request.view_args or {}
+        if "user_id" in args:
+            training_context_cache.invalidate_user(args["user_id"])
+    return response
+
+
 @user_bp.route("/gender/<int:user_id>", methods=["GET"])
 def get_user_gender(user_id):
     try:
@@ -1,10 +1,27 @@
 from flask import Blueprint, request, jsonify
 from app.db import db  # import the db instance from app/db.py
-from .utils import gym_equipment, INDEX_TO_SETUP, set_gym_setup, seed_venue_equipment_from_setup
+from .utils import gym_equipment, INDEX_TO_SETUP, set_gym_setup, seed_venue_equipment_from_setup, bump_equipment_version
+from app.workout.venue_cache import venue_equipment_cache
+from app.workout.training_context import training_context_cache
 from ..workout.utils import get_training_phase_and_group_for_day, get_reps_and_rest_time
 
 venues_bp = Blueprint("venues", __name__, url_prefix="/venues")
 
+@venues_bp.after_request
+def _drop_cached_training_context(response):
+    """
+    Venue settings feed the cached TrainingContext; drop it after
+    successful writes.
+    """
+    if request.method != "GET" and response.status_code < 400:
+        args = request.view_args or {}
+        if "venue_id" in args:
+            training_context_cache.invalidate_venue(args["venue_id"])
+        if "user_id" in args:
+            training_context_cache.invalidate_user(args["user_id"])
+    return response
+
+
 @venues_bp.route("/", methods=["POST"])
 def get_venues():
     data = request.get_json(silent=True)
@@ -213,22 +230,34 @@ def set_gym_setup_route(venue_id):
     if val not in (1, 2, 3, 4, 5):
         return jsonify({"error": "Invalid 'gym_setup'. Use 1..5."}), 400
 
+    seed_error = None
     try:
-        set_gym_setup(db, venue_id, val)
-        summary = seed_venue_equipment_from_setup(
-            db,
-            venue_id=venue_id,
-            setup_index=val,
-            index_to_setup=INDEX_TO_SETUP,
-            gym_equipment=gym_equipment,
-            replace=True,  # set False if you want to merge instead of replace
-        )
+        with db.transaction():
+            set_gym_setup(db, venue_id, val)
+            try:
+                # Savepoint: a failed seed keeps the venue's previous equipment
+                # instead of leaving it half replaced.
+                with db.transaction():
+                    summary = seed_venue_equipment_from_setup(
+                        db,
+                        venue_id=venue_id,
+                        setup_index=val,
+                        index_to_setup=INDEX_TO_SETUP,
+                        gym_equipment=gym_equipment,
+                        replace=True,  # set False if you want to merge instead of replace
+                    )
+            except Exception as e:
+                seed_error = e
     except Exception as e:
+        # set_gym_setup (or the commit) failed: nothing was saved
+        return jsonify({"error": "Failed to update gym setup", "details": str(e)}), 500
+
+    if seed_error is not None:
         # Setup was updated; equipment seeding failed → partial success
         return jsonify({
             "message": "Gym setup updated, but equipment population encountered an error.",
             "gym_setup": val,
-            "error": str(e),
+            "error": str(seed_error),
         }), 207
 
     return jsonify({
@@ -540,6 +569,8 @@ def create_venue(user_id):
                     """,
                     (venue_id, equipment_id, quantity)
                 )
+        if equipment_list:
+            bump_equipment_version(db, venue_id)
 
         return jsonify({"message": "Venue created successfully", "venue_id": venue_id}), 200
 
@@ -652,17 +683,19 @@ def delete_venue(user_id, venue_id):
                 next_venue_id = v[0]
                 break
 
-        # Delete associated equipment
-        db.execute("DELETE FROM Venue_equipment WHERE venue_id = %s;", (venue_id,))
+        with db.transaction() as tx:
+            # Delete associated equipment
+            tx.execute("DELETE FROM Venue_equipment WHERE venue_id = %s;", (venue_id,))
 
-        # Delete the venue
-        db.execute("DELETE FROM Venues WHERE venue_id = %s;", (venue_id,))
+            # Delete the venue
+            tx.execute("DELETE FROM Venues WHERE venue_id = %s;", (venue_id,))
 
-        # Set current_venue_id to another remaining venue
-        db.execute(
-            "UPDATE Users SET current_venue_id = %s WHERE user_id = %s;",
-            (next_venue_id, user_id)
-        )
+            # Set current_venue_id to another remaining venue
+            tx.execute(
+                "UPDATE Users SET current_venue_id = %s WHERE user_id = %s;",
+                (next_venue_id, user_id)
+            )
+        venue_equipment_cache.invalidate(venue_id)
 
         return jsonify({
             "message": "Venue deleted successfully",
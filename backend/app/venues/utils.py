@@ -2,6 +2,8 @@ from __future__ import annotations
 from typing import Optional, Tuple, Dict, Any
 from collections import defaultdict
 import re
+from app.workout.venue_cache import venue_equipment_cache
+from app.workout.training_context import training_context_cache
 
 #DICTIONARY OF PRESELECTED EQUIPMENT BASED ON THE 'Gym Setup' THAT THE USER
 #SELECTS. (KEY: Gym Setup, VALUES: equipment(list), available_weights(nested
@@ -316,6 +318,23 @@ def upsert_venue_equipment(db, venue_id: int, equipment_id: int, quantity: int)
         ins = "INSERT INTO Venue_equipment (venue_id, equipment_id, quantity) VALUES (%s, %s, %s);"
         db.execute(ins, (venue_id, equipment_id, int(quantity)))
 
+def bump_equipment_version(db, venue_id: int) -> None:
+    """
+    Mark a venue's equipment as changed. Call after every Venue_equipment
+    write so cached feasibility (app.workout.venue_cache) is rebuilt.
+    """
+    db.execute(
+        "UPDATE Venues SET equipment_version = equipment_version + 1 WHERE venue_id = %s;",
+        (venue_id,)
+    )
+
+    def _invalidate():
+        venue_equipment_cache.invalidate(venue_id)
+        training_context_cache.invalidate_venue(venue_id)
+
+    # Inside db.transaction() other requests can't see the change until commit.
+    db.after_commit(_invalidate)
+
 # ---------- Public API used by routes ----------
 
 def set_gym_setup(db, venue_id: int, setup_index: int) -> None:
@@ -383,6 +402,8 @@ def seed_venue_equipment_from_setup(
             upsert_venue_equipment(db, venue_id, eq_id, int(qty))
             inserts += 1
 
+    bump_equipment_version(db, venue_id)
+
     return {
         "base_items": len(base_counts),
         "weighted_items": sum(len(variants or {}) for variants in weighted.values()),
@@ -0,0 +1,164 @@
+import os
+import threading
+import pandas as pd
+from pathlib import Path
+from .catalog_index import CatalogIndex
+from .catalog_artifact import load_catalog_artifact
+
+# Path to exercises.json in the same folder as this file
+EXERCISES_PATH = Path(__file__).resolve().parent / "exercises.json"
+
+
+# ---------------------------------------------------------------------
+# Process-wide exercise catalog
+#
+# Notes:
+# - exercises.json is loaded once per process and shared by every route.
+#   When the pipeline's columnar artifact (exercises.catalog/, see
+#   catalog_artifact.py) matches the file, it is memory-mapped instead of
+#   parsing the JSON: the index and name lookups read its arrays, and the
+#   DataFrame is only decoded the first time a caller touches .df.
+# - Staleness is checked with a cheap os.stat (mtime + size); the file is
+#   only re-parsed when the dataset pipeline has rewritten it.
+# - The DataFrame is shared: callers must treat it as read-only and take
+#   a .copy() before assigning columns.
+# ---------------------------------------------------------------------
+
+class ExerciseCatalog:
+    """
+    Loaded-once view of the exercise dataset.
+
+    Attributes (valid after the first refresh):
+    - df (pd.DataFrame): the full dataset, read-only (decoded from the
+      artifact on first access).
+    - version (int): bumps every time the file is (re)loaded.
+    - artifact (CatalogArtifact | None): the memory-mapped columnar
+      artifact the snapshot was built from, if any.
+    - index (CatalogIndex): row bitsets used by filter_data / filter_muscles.
+    - name_to_pos (dict[str, int]): exact name -> row position.
+    - casefold_to_pos (dict[str, int]): casefolded name -> row position
+      (first occurrence wins, matching the previous .loc[...].iloc[0]).
+
+    Per-row values derived from the dataset (see derived()) are memoized
+    alongside the snapshot and dropped on reload.
+    """
+
+    def __init__(self, path=EXERCISES_PATH):
+        self.path = Path(path)
+        self._df = None
+        self.version = 0
+        self.artifact = None
+        self.index = None
+        self.name_to_pos = {}
+        self.casefold_to_pos = {}
+        self._derived = {}
+        self._stamp = None
+        self._lock = threading.Lock()
+
+    def _file_stamp(self):
+        st = os.stat(self.path)
+        return (st.st_mtime_ns, st.st_size)
+
+    @property
+    def df(self):
+        df = self._df
+        if df is None and self.artifact is not None:
+            with self._lock:
+                if self._df is None:
+                    self._df = self.artifact.to_dataframe()
+                df = self._df
+        return df
+
+    def _load(self, stamp):
+        artifact = load_catalog_artifact(self.path)
+        if artifact is not None:
+            df = None
+            names = artifact.column("name", artifact.kind("name"))
+        else:
+            df = pd.read_json(self.path)
+            names = df["name"].tolist()
+
+        name_to_pos = {}
+        casefold_to_pos = {}
+        for pos, name in enumerate(names):
+            name_to_pos.setdefault(name, pos)
+            casefold_to_pos.setdefault(str(name).casefold(), pos)
+
+        index = CatalogIndex(df, artifact=artifact, muscle_vocabulary=_muscle_vocabulary)
+
+        # Publish the new snapshot in one go so readers never see a mix.
+        self._df = df
+        self.artifact = artifact
+        self.index = index
+        self.name_to_pos = name_to_pos
+        self.casefold_to_pos = casefold_to_pos
+        self._derived = {}
+        self.version += 1
+        self._stamp = stamp
+
+    def refresh(self):
+        """
+        Reload the dataset if the file changed since the last load.
+
+        Returns:
+        - ExerciseCatalog: self, for chaining.
+        """
+        stamp = self._file_stamp()
+        if stamp == self._stamp:
+            return self
+
+        with self._lock:
+            # Another thread may have reloaded while we waited.
+            if stamp != self._stamp:
+                self._load(stamp)
+        return self
+
+    def derived(self, key, build):
+        """
+        Memoize `build(df)` for the current snapshot.
+
+        Parameters:
+        - key (str): unique name of the derived value.
+        - build (callable[[pd.DataFrame], Any])
+        """
+        derived = self._derived
+        if key not in derived:
+            derived[key] = build(self.df)
+        return derived[key]
+
+    def row_by_name(self, exercise_name):
+        """
+        Case-insensitive lookup of a single exercise row.
+
+        Returns:
+        - pd.Series | None
+        """
+        pos = self.casefold_to_pos.get(str(exercise_name).casefold())
+        if pos is None:
+            return None
+        return self.df.iloc[pos]
+
+
+_catalog = ExerciseCatalog()
+
+# Muscles of the split definitions (registered by workout.utils); they get
+# the first codes in CatalogIndex.muscle.
+_muscle_vocabulary = ()
+
+
+def register_muscle_vocabulary(muscles):
+    """
+    Seed the muscle vocabulary; forces a rebuild if already loaded.
+    """
+    global _muscle_vocabulary
+    muscles = tuple(dict.fromkeys(muscles))
+    if muscles != _muscle_vocabulary:
+        _muscle_vocabulary = muscles
+        _catalog._stamp = None
+
+
+def get_catalog():
+    """
+    Return the shared catalog, reloading it first if exercises.json changed.
+    """
+    return _catalog.refresh()
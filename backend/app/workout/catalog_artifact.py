@@ -0,0 +1,320 @@
+import os
+import sys
+import json
+import mmap
+import hashlib
+import numpy as np
+import pandas as pd
+from pathlib import Path
+
+
+# ---------------------------------------------------------------------
+# Columnar catalog artifact (exercises.catalog/)
+#
+# Notes:
+# - Written by the dataset pipeline next to exercises.json (see
+#   normalizing_exercises_columns_name.py, or run
+#   `python catalog_artifact.py [exercises.json]` in this folder).
+# - Layout: one .npy file per array plus manifest.json. Every string
+#   (names, muscles, equipment tokens, ...) is interned once in a shared
+#   table (strings.bin + strings.offsets.npy); columns store int32 codes.
+#   List columns are CSR: <col>.indptr.npy slices <col>.codes.npy per row;
+#   list-of-list columns add <col>.outer.npy (row -> inner lists).
+# - The server memory-maps the arrays (the first time each is used) and
+#   the string table, so forked workers share the pages. CatalogIndex reads
+#   the code / indptr arrays directly; strings are decoded on demand, and
+#   the full DataFrame (the one pd.read_json(exercises.json) would give)
+#   only when a caller asks for it.
+# - manifest["source_stamp"] (size + mtime of exercises.json at build
+#   time) is checked with one os.stat. Only when it differs (a fresh
+#   checkout or copy) is the file hashed against manifest["source_sha256"];
+#   a stale artifact is ignored.
+# ---------------------------------------------------------------------
+
+ARTIFACT_FORMAT = 1
+ARTIFACT_DIRNAME = "exercises.catalog"
+
+# Codes for missing scalar strings: NaN (key absent) / None (JSON null)
+_NAN_CODE = -1
+_NONE_CODE = -2
+
+
+def artifact_dir_for(json_path):
+    return Path(json_path).resolve().parent / ARTIFACT_DIRNAME
+
+
+def source_stamp(path):
+    st = os.stat(path)
+    return [st.st_size, st.st_mtime_ns]
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _is_missing(value):
+    return value is None or (isinstance(value, float) and np.isnan(value))
+
+
+def _column_kind(series):
+    """
+    How a DataFrame column is encoded: int64 / float64 / bool (as is),
+    str, list (of str), list2 (list of lists of str), or json (anything
+    else, one JSON document per row).
+    """
+    if series.dtype.kind in "iufb":
+        return series.dtype.name
+
+    values = series.tolist()
+    if all(isinstance(v, str) or _is_missing(v) for v in values):
+        return "str"
+    if all(isinstance(v, list) for v in values):
+        items = [item for v in values for item in v]
+        if all(isinstance(i, str) for i in items):
+            return "list"
+        if all(isinstance(i, list) and all(isinstance(s, str) for s in i) for i in items):
+            return "list2"
+    return "json"
+
+
+class _Interner:
+    def __init__(self):
+        self.codes = {}
+        self.strings = []
+
+    def code(self, text):
+        code = self.codes.get(text)
+        if code is None:
+            code = self.codes[text] = len(self.strings)
+            self.strings.append(text)
+        return code
+
+
+def _csr(rows):
+    indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+    indptr[1:] = np.cumsum([len(r) for r in rows])
+    return indptr
+
+
+def write_catalog_artifact(json_path, out_dir=None):
+    """
+    Build exercises.catalog/ from a normalized exercises.json.
+
+    Parameters:
+        json_path (str | Path): the normalized dataset.
+        out_dir (str | Path, optional): defaults to artifact_dir_for(json_path).
+
+    Returns:
+        Path: the artifact directory.
+    """
+    json_path = Path(json_path)
+    out_dir = Path(out_dir) if out_dir else artifact_dir_for(json_path)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    df = pd.read_json(json_path)
+    strings = _Interner()
+    arrays = {}
+    columns = []
+
+    for name in df.columns:
+        series = df[name]
+        kind = _column_kind(series)
+        values = series.tolist()
+
+        if kind in ("str", "json"):
+            codes = []
+            for v in values:
+                if kind == "str" and _is_missing(v):
+                    codes.append(_NONE_CODE if v is None else _NAN_CODE)
+                else:
+                    codes.append(strings.code(v if kind == "str" else json.dumps(v)))
+            arrays[f"{name}.codes"] = np.asarray(codes, dtype=np.int32)
+        elif kind == "list":
+            arrays[f"{name}.indptr"] = _csr(values)
+            arrays[f"{name}.codes"] = np.asarray(
+                [strings.code(s) for v in values for s in v], dtype=np.int32
+            )
+        elif kind == "list2":
+            inner = [group for v in values for group in v]
+            arrays[f"{name}.outer"] = _csr(values)
+            arrays[f"{name}.indptr"] = _csr(inner)
+            arrays[f"{name}.codes"] = np.asarray(
+                [strings.code(s) for group in inner for s in group], dtype=np.int32
+            )
+        else:
+            arrays[name] = series.to_numpy()
+
+        columns.append({"name": name, "kind": kind})
+
+    encoded = [s.encode("utf-8") for s in strings.strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(b) for b in encoded])
+    arrays["strings.offsets"] = offsets
+
+    for key, array in arrays.items():
+        np.save(out_dir / f"{key}.npy", array, allow_pickle=False)
+    with open(out_dir / "strings.bin", "wb") as f:
+        f.write(b"".join(encoded))
+
+    manifest = {
+        "format": ARTIFACT_FORMAT,
+        "source": json_path.name,
+        "source_stamp": source_stamp(json_path),
+        "source_sha256": file_sha256(json_path),
+        "n_rows": len(df),
+        "n_strings": len(encoded),
+        "columns": columns,
+    }
+    # Written last: a half-written artifact has no (or an old) manifest
+    with open(out_dir / "manifest.json", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+
+    return out_dir
+
+
+def _map_npy(path):
+    """
+    Read-only view of a .npy file backed by a shared mmap; what
+    np.load(mmap_mode="r") gives, without np.memmap's per-file overhead.
+    """
+    with open(path, "rb") as f:
+        version = np.lib.format.read_magic(f)
+        if version == (1, 0):
+            shape, fortran, dtype = np.lib.format.read_array_header_1_0(f)
+        else:
+            shape, fortran, dtype = np.lib.format.read_array_header_2_0(f)
+        offset = f.tell()
+        buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    count = int(np.prod(shape, dtype=np.int64))
+    array = np.frombuffer(buf, dtype=dtype, count=count, offset=offset)
+    return array.reshape(shape, order="F" if fortran else "C")
+
+
+class _ArrayFiles(dict):
+    """
+    name -> array of <dir>/<name>.npy, mapped on first access.
+    """
+
+    def __init__(self, path):
+        super().__init__()
+        self.path = path
+
+    def __missing__(self, key):
+        array = self[key] = _map_npy(self.path / f"{key}.npy")
+        return array
+
+
+class CatalogArtifact:
+    """
+    Memory-mapped view of exercises.catalog/.
+
+    Attributes:
+    - manifest (dict)
+    - n_rows (int)
+    - arrays (dict[str, np.ndarray]): read-only, memory-mapped on first
+      access.
+
+    Strings are decoded from the mapped table on demand (see string()).
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        with open(self.path / "manifest.json", "r", encoding="utf-8") as f:
+            self.manifest = json.load(f)
+
+        self.arrays = _ArrayFiles(self.path)
+        self.n_rows = self.manifest["n_rows"]
+        self._offsets = self.arrays["strings.offsets"].tolist()
+        with open(self.path / "strings.bin", "rb") as f:
+            self._blob = (mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                          if os.fstat(f.fileno()).st_size else b"")
+        self._decoded = {}
+
+    def string(self, code):
+        """
+        Decode one entry of the string table (memoized).
+        """
+        text = self._decoded.get(code)
+        if text is None:
+            start, end = self._offsets[code], self._offsets[code + 1]
+            text = self._decoded[code] = self._blob[start:end].decode("utf-8")
+        return text
+
+    def kind(self, name):
+        """
+        Encoding of column `name` (see _column_kind), or None.
+        """
+        for col in self.manifest["columns"]:
+            if col["name"] == name:
+                return col["kind"]
+        return None
+
+    @staticmethod
+    def _split(values, indptr):
+        ptr = indptr.tolist()
+        return [values[ptr[i]:ptr[i + 1]] for i in range(len(ptr) - 1)]
+
+    def column(self, name, kind):
+        """
+        Decode one column to the values pd.read_json would produce.
+        """
+        a = self.arrays
+        if kind in ("str", "json", "list", "list2"):
+            codes = a[f"{name}.codes"].tolist()
+            table = {c: self.string(c) for c in set(codes) if c >= 0}
+            table[_NONE_CODE] = None
+            table[_NAN_CODE] = float("nan")
+            values = [table[c] for c in codes]
+
+        if kind == "str":
+            return values
+        if kind == "json":
+            return [json.loads(s) for s in values]
+        if kind == "list":
+            return self._split(values, a[f"{name}.indptr"])
+        if kind == "list2":
+            return self._split(self._split(values, a[f"{name}.indptr"]), a[f"{name}.outer"])
+        return np.array(a[name])
+
+    def to_dataframe(self):
+        data = {}
+        for col in self.manifest["columns"]:
+            values = self.column(col["name"], col["kind"])
+            if isinstance(values, np.ndarray):
+                data[col["name"]] = values
+            else:
+                data[col["name"]] = pd.Series(values, dtype=object)
+        return pd.DataFrame(data)
+
+
+def load_catalog_artifact(json_path):
+    """
+    Open the artifact built from `json_path`, or None when there is none,
+    it is unreadable, or it was built from a different exercises.json.
+    """
+    path = artifact_dir_for(json_path)
+    if not (path / "manifest.json").exists():
+        return None
+    try:
+        artifact = CatalogArtifact(path)
+        manifest = artifact.manifest
+        if manifest.get("format") != ARTIFACT_FORMAT:
+            return None
+        # A copied / checked-out file keeps its bytes but not its mtime
+        if (manifest.get("source_stamp") != source_stamp(json_path)
+                and manifest.get("source_sha256") != file_sha256(json_path)):
+            print(f"Ignoring stale catalog artifact at {path}")
+            return None
+        return artifact
+    except Exception as e:
+        print(f"Failed to read catalog artifact at {path}: {e}")
+        return None
+
+
+if __name__ == "__main__":
+    source = Path(sys.argv[1]) if len(sys.argv) > 1 else Path(__file__).resolve().parent / "exercises.json"
+    print(f"Wrote {write_catalog_artifact(source)}")
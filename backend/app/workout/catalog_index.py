@@ -0,0 +1,368 @@
+import numpy as np
+import pandas as pd
+
+
+# ---------------------------------------------------------------------
+# Inverted indexes over the exercise catalog
+#
+# Notes:
+# - Built once per catalog load (see catalog.ExerciseCatalog). From the
+#   columnar artifact, the CSR arrays are read in place and only the
+#   distinct strings they reference are decoded.
+# - Every mask is a NumPy bool array aligned with catalog row positions.
+# - List columns are integer-coded against a per-column vocabulary
+#   (CodedListColumn); each value keeps one packed bitmask of the rows
+#   containing it, so "any of these values" is a bitwise OR of a few
+#   small uint8 rows.
+# - Membership is exact (`value in list`), the same as the row-wise
+#   lambdas in filter_data / filter_muscles.
+# ---------------------------------------------------------------------
+
+class CodedListColumn:
+    """
+    A list-of-strings column encoded against a vocabulary.
+
+    Attributes:
+    - vocab (list[str]): code -> value; seeded values come first, so their
+      codes are stable across reloads.
+    - code (dict[str, int]): value -> code.
+    - indptr / codes (np.ndarray): CSR, codes[indptr[r]:indptr[r + 1]]
+      are the values of row r.
+    - bits (np.ndarray[uint8]): packed row bitmask per code, shape
+      (len(vocab), ceil(n_rows / 8)).
+    """
+
+    def __init__(self, vocab, indptr, codes, n_rows):
+        self.vocab = list(vocab)
+        self.code = {v: i for i, v in enumerate(self.vocab)}
+        self.n_rows = n_rows
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.codes = np.asarray(codes, dtype=np.int32)
+
+        # Duplicate values within a row just set the same bit twice.
+        rows = np.repeat(np.arange(n_rows), np.diff(self.indptr))
+        dense = np.zeros((len(self.vocab), n_rows), dtype=bool)
+        dense[self.codes, rows] = True
+        self.bits = np.packbits(dense, axis=1)
+
+    @classmethod
+    def from_lists(cls, values, n_rows, seed=()):
+        """
+        Encode one list per row (None counts as empty).
+        """
+        code = {v: i for i, v in enumerate(dict.fromkeys(seed))}
+        indptr = [0]
+        codes = []
+        for items in values:
+            for item in items or []:
+                codes.append(code.setdefault(item, len(code)))
+            indptr.append(len(codes))
+        return cls(list(code), indptr, codes, n_rows)
+
+    @classmethod
+    def from_csr(cls, indptr, string_codes, decode, n_rows, seed=()):
+        """
+        Re-encode a CSR column whose codes index a shared string table
+        (see catalog_artifact.py) against its own vocabulary.
+
+        Parameters:
+        - decode (callable[[int], str]): string table lookup; called once
+          per distinct code.
+        """
+        string_codes = np.asarray(string_codes)
+        code = {v: i for i, v in enumerate(dict.fromkeys(seed))}
+        present = np.unique(string_codes)
+        remap = np.zeros(int(present[-1]) + 1 if len(present) else 0, dtype=np.int32)
+        for sc in present.tolist():
+            remap[sc] = code.setdefault(decode(sc), len(code))
+        return cls(list(code), indptr, remap[string_codes], n_rows)
+
+    def codes_of(self, keys):
+        """
+        Codes of the known `keys` (unknown keys are dropped).
+        """
+        return [c for c in (self.code.get(k) for k in keys) if c is not None]
+
+    def _unpack(self, packed):
+        return np.unpackbits(packed, count=self.n_rows).view(bool)
+
+    def get(self, key):
+        """
+        Row mask for one value, or None if it never occurs.
+        """
+        c = self.code.get(key)
+        if c is None:
+            return None
+        return self._unpack(self.bits[c])
+
+    def any_mask(self, keys):
+        """
+        Rows containing at least one of `keys`.
+        """
+        ids = self.codes_of(keys)
+        if not ids:
+            return np.zeros(self.n_rows, dtype=bool)
+        packed = self.bits[ids[0]].copy()
+        for c in ids[1:]:
+            np.bitwise_or(packed, self.bits[c], out=packed)
+        return self._unpack(packed)
+
+
+class EquipmentMatrix:
+    """
+    Compiled OR-of-AND equipment requirements (CSR layout).
+
+    Every non-empty alternative group of every exercise is one sparse row
+    of a (group x equipment token) matrix:
+    - indptr[g]:indptr[g + 1] slices token_ids for group g (group order kept).
+    - group_owner[g] is the catalog row the group belongs to.
+    - row_indptr[r]:row_indptr[r + 1] are the groups of catalog row r.
+
+    Venue checks build one bool vector over `vocab` (see token_mask) and
+    answer every question below with a single pass over the nonzeros.
+
+    Build with from_lists (a DataFrame column) or from_csr (the artifact
+    arrays); vocab is in first-appearance order either way.
+    """
+
+    def __init__(self, vocab, indptr, token_ids, owners, row_indptr):
+        self.vocab = list(vocab)
+        self.vocab_lower = [t.strip().lower() for t in self.vocab]
+        self.n_rows = len(row_indptr) - 1
+        self.indptr = np.asarray(indptr, dtype=np.intp)
+        self.token_ids = np.asarray(token_ids, dtype=np.intp)
+        self.group_owner = np.asarray(owners, dtype=np.intp)
+        self.row_indptr = np.asarray(row_indptr, dtype=np.intp)
+        self.group_len = np.diff(self.indptr)
+        self.entry_group = np.repeat(np.arange(len(owners)), self.group_len)
+
+        # Rows with a bodyweight alternative ("None" in any group).
+        none_ids = [i for i, t in enumerate(self.vocab_lower) if t == "none"]
+        group_has_none = np.bincount(
+            self.entry_group[np.isin(self.token_ids, none_ids)],
+            minlength=len(owners)
+        ) > 0
+        self.row_has_none = np.zeros(self.n_rows, dtype=bool)
+        self.row_has_none[self.group_owner[group_has_none]] = True
+
+    @classmethod
+    def from_lists(cls, equipment_column):
+        """
+        Compile one list of alternative groups per row (None counts as
+        empty; empty tokens and groups are dropped).
+        """
+        vocab = {}
+        indptr = [0]
+        token_ids = []
+        owners = []
+        row_indptr = [0]
+
+        for pos, subsets in enumerate(equipment_column):
+            for subset in subsets or []:
+                tokens = [t for t in subset if t]
+                if not tokens:
+                    continue
+                for token in tokens:
+                    token_ids.append(vocab.setdefault(token, len(vocab)))
+                indptr.append(len(token_ids))
+                owners.append(pos)
+            row_indptr.append(len(owners))
+
+        return cls(list(vocab), indptr, token_ids, owners, row_indptr)
+
+    @classmethod
+    def from_csr(cls, outer, indptr, string_codes, decode):
+        """
+        Compile a list-of-lists artifact column (see catalog_artifact.py)
+        without materializing the lists; same result as from_lists.
+
+        Parameters:
+        - outer (np.ndarray): row -> inner groups.
+        - indptr (np.ndarray): inner group -> string_codes.
+        - decode (callable[[int], str]): string table lookup; called once
+          per distinct code.
+        """
+        outer = np.asarray(outer, dtype=np.intp)
+        indptr = np.asarray(indptr, dtype=np.intp)
+        string_codes = np.asarray(string_codes, dtype=np.intp)
+        n_rows = len(outer) - 1
+        n_groups = len(indptr) - 1
+
+        present = np.unique(string_codes).tolist()
+        keep = np.isin(string_codes, [sc for sc in present if decode(sc)])
+        kept = string_codes[keep]
+
+        uniq, first = np.unique(kept, return_index=True)
+        order = uniq[np.argsort(first)]
+        remap = np.zeros(int(order.max()) + 1 if len(order) else 0, dtype=np.intp)
+        remap[order] = np.arange(len(order))
+
+        entry_group = np.repeat(np.arange(n_groups), np.diff(indptr))
+        group_len = np.bincount(entry_group[keep], minlength=n_groups)
+        nonempty = group_len > 0
+        owners = np.repeat(np.arange(n_rows), np.diff(outer))[nonempty]
+
+        return cls(
+            [decode(sc) for sc in order.tolist()],
+            np.concatenate(([0], np.cumsum(group_len[nonempty]))),
+            remap[kept],
+            owners,
+            np.concatenate(([0], np.cumsum(np.bincount(owners, minlength=n_rows)))),
+        )
+
+    def token_mask(self, has_token):
+        """
+        Evaluate `has_token` once per vocabulary token.
+
+        Parameters:
+        - has_token (callable[[str], bool])
+
+        Returns:
+        - np.ndarray[bool] aligned with vocab.
+        """
+        return np.fromiter((bool(has_token(t)) for t in self.vocab),
+                           dtype=bool, count=len(self.vocab))
+
+    def missing_counts(self, has):
+        """
+        Number of unavailable tokens in every group.
+        """
+        return np.bincount(self.entry_group, weights=~has[self.token_ids],
+                           minlength=len(self.group_owner))
+
+    def feasible_rows(self, has):
+        """
+        Rows with at least one fully available group.
+        """
+        group_ok = self.missing_counts(has) == 0
+        mask = np.zeros(self.n_rows, dtype=bool)
+        mask[self.group_owner[group_ok]] = True
+        return mask
+
+    def cheapest_missing(self, pos, has):
+        """
+        Missing tokens of the closest group of catalog row `pos`.
+
+        The closest group has the fewest missing tokens; ties go to the
+        shorter group, then the earlier one. Returns [] when some group is
+        fully available or the row has no requirements.
+
+        Returns:
+        - list[str]: raw tokens, in group order.
+        """
+        g0, g1 = self.row_indptr[pos], self.row_indptr[pos + 1]
+        if g0 == g1:
+            return []
+
+        e0, e1 = self.indptr[g0], self.indptr[g1]
+        ids = self.token_ids[e0:e1]
+        missing = ~has[ids]
+        counts = np.add.reduceat(missing, self.indptr[g0:g1] - e0, dtype=np.intp)
+        if (counts == 0).any():
+            return []
+
+        best = np.lexsort((np.arange(g1 - g0), self.group_len[g0:g1], counts))[0]
+        start, end = self.indptr[g0 + best] - e0, self.indptr[g0 + best + 1] - e0
+        return [self.vocab[i] for i in ids[start:end][missing[start:end]]]
+
+
+class CatalogIndex:
+    """
+    Integer-coded views of the columns used by filtering.
+
+    Parameters:
+    - df (pd.DataFrame, optional): the catalog; not needed (nor decoded)
+      when `artifact` is given.
+    - artifact (CatalogArtifact, optional): when the catalog came from the
+      columnar artifact, every column is read from its memory-mapped
+      arrays instead of walking the Python lists.
+    - muscle_vocabulary (iterable[str]): muscles given the first codes
+      (the split definitions), so they stay stable across reloads.
+
+    Attributes:
+    - level / muscle / purpose / pain (CodedListColumn)
+    - risk_level (np.ndarray)
+    - equipment (EquipmentMatrix)
+    """
+
+    # Artifact encodings the array paths below understand
+    _ARTIFACT_KINDS = {
+        "level": "list",
+        "main_muscles": "list",
+        "exercise_purpose": "list",
+        "pain_exclusions": "list",
+        "risk_level": "int64",
+        "equipment": "list2",
+    }
+
+    def __init__(self, df=None, artifact=None, muscle_vocabulary=()):
+        if artifact is not None and any(
+            artifact.kind(c) != k for c, k in self._ARTIFACT_KINDS.items()
+        ):
+            # e.g. a column that is all nulls was inferred as json
+            df = artifact.to_dataframe() if df is None else df
+            artifact = None
+
+        if artifact is not None:
+            # Same labels as pd.read_json / CatalogArtifact.to_dataframe
+            self.n_rows = artifact.n_rows
+            self._labels = pd.RangeIndex(self.n_rows)
+        else:
+            self.n_rows = len(df)
+            self._labels = df.index
+
+        self.level = self._coded(df, "level", artifact)
+        self.muscle = self._coded(df, "main_muscles", artifact, seed=muscle_vocabulary)
+        self.purpose = self._coded(df, "exercise_purpose", artifact)
+        self.pain = self._coded(df, "pain_exclusions", artifact)
+
+        if artifact is not None:
+            a = artifact.arrays
+            self.risk_level = a["risk_level"]
+            self.equipment = EquipmentMatrix.from_csr(
+                a["equipment.outer"], a["equipment.indptr"], a["equipment.codes"],
+                artifact.string
+            )
+        else:
+            self.risk_level = df["risk_level"].to_numpy()
+            self.equipment = EquipmentMatrix.from_lists(df["equipment"])
+
+    def _coded(self, df, column, artifact, seed=()):
+        if artifact is not None:
+            a = artifact.arrays
+            return CodedListColumn.from_csr(
+                a[f"{column}.indptr"], a[f"{column}.codes"], artifact.string,
+                self.n_rows, seed=seed
+            )
+        return CodedListColumn.from_lists(df[column], self.n_rows, seed=seed)
+
+    # ----------------------------- masks -----------------------------
+
+    def _none(self):
+        return np.zeros(self.n_rows, dtype=bool)
+
+    def any_of(self, column, keys):
+        """
+        Rows of `column` (a CodedListColumn) containing any of `keys`
+        (unknown keys contribute nothing).
+        """
+        return column.any_mask(keys)
+
+    def level_mask(self, user_level):
+        hit = self.level.get(user_level)
+        return hit if hit is not None else self._none()
+
+    def equipment_mask(self, user_equipment):
+        """
+        Rows with at least one equipment group fully covered by the user.
+        """
+        owned = set(user_equipment)
+        return self.equipment.feasible_rows(
+            self.equipment.token_mask(owned.__contains__)
+        )
+
+    def positions(self, df):
+        """
+        Catalog row positions of the rows in `df` (a subset of the catalog).
+        """
+        return self._labels.get_indexer(df.index)
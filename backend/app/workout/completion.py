@@ -0,0 +1,55 @@
+from database.daily_stats import refresh_daily_stats
+
+
+# ---------------------------------------------------------------------
+# Workout completion state (actual_workout.completed_sets)
+#
+# Notes:
+# - A workout is completed iff any of its actual_exercise_records has a
+#   completed set (sets[i] = 1). actual_workout keeps that denormalized:
+#     * completed_sets: number of completed sets across its records,
+#     * first_completed_at: when completed_sets first went above 0
+#       (NULL again if every set is un-done).
+# - Recomputed for the touched workout wherever completed sets can change
+#   (update_exercise_sets, exercise delete/replace, workout regeneration),
+#   the same places that refresh user_exercise_history (see history.py),
+#   so readers filter on `aw.completed_sets > 0` instead of unnesting
+#   every sets array.
+# - Migration 3 adds the columns and backfills them.
+# - The user_daily_stats row of the workout's day is refreshed with it
+#   (see database/daily_stats.py).
+# ---------------------------------------------------------------------
+
+REFRESH_WORKOUT_COMPLETION_QUERY = """
+    UPDATE actual_workout aw
+    SET completed_sets = c.completed_sets,
+        first_completed_at = CASE
+            WHEN c.completed_sets = 0 THEN NULL
+            ELSE COALESCE(aw.first_completed_at, NOW())
+        END
+    FROM (
+        SELECT COUNT(*)::int AS completed_sets
+        FROM actual_exercise_records aer
+        CROSS JOIN LATERAL UNNEST(aer.sets) AS s(done)
+        WHERE aer.actual_workout_id = %(actual_workout_id)s
+          AND s.done = 1
+    ) c
+    WHERE aw.actual_workout_id = %(actual_workout_id)s
+      AND (aw.completed_sets IS DISTINCT FROM c.completed_sets
+           OR (c.completed_sets > 0) <> (aw.first_completed_at IS NOT NULL))
+"""
+
+
+def refresh_workout_completion(db, actual_workout_id):
+    """
+    Recompute completed_sets / first_completed_at of one actual workout,
+    then its day in user_daily_stats.
+
+    Parameters:
+    - db (Database | Transaction)
+    - actual_workout_id (int)
+    """
+    if actual_workout_id is None:
+        return
+    db.execute(REFRESH_WORKOUT_COMPLETION_QUERY, {"actual_workout_id": int(actual_workout_id)})
+    refresh_daily_stats(db, actual_workout_id)
@@ -0,0 +1,166 @@
+import os
+from .training_context import training_context_cache
+
+
+# ---------------------------------------------------------------------
+# Per-user, per-exercise history summary (user_exercise_history)
+#
+# Notes:
+# - One row per (user, exercise, phase) holding the last
+#   EXERCISE_HISTORY_DEPTH completed performances (oldest first), the best
+#   completed set and the last completed set.
+# - A performance is an actual_exercise_records row with at least one
+#   completed set (sets[i] = 1).
+# - Rows are recomputed for the touched exercises whenever completed sets
+#   can change (update_exercise_sets, exercise delete/replace), so reading
+#   history costs the same no matter how long the user has trained.
+# - Migration 6 built the summaries of every record that predates the
+#   table; backfill_exercise_history() rebuilds them by hand.
+# ---------------------------------------------------------------------
+
+EXERCISE_HISTORY_DEPTH = int(os.getenv("EXERCISE_HISTORY_DEPTH", "20"))
+
+# Filters: %(user_id)s / %(exercise_ids)s may be NULL (= every user / exercise).
+_PERFORMANCES_CTE = """
+    perf AS (
+        SELECT
+            w.user_id,
+            aer.exercise_id,
+            COALESCE(w.phase, '') AS phase,
+            aer.exercise_type,
+            aer.intensity,
+            aer.load_numeric,
+            aer.reps,
+            aer.sets,
+            aer.time,
+            w.date,
+            aer.actual_workout_id,
+            aer.order_index,
+            ROW_NUMBER() OVER (
+                PARTITION BY w.user_id, aer.exercise_id, COALESCE(w.phase, '')
+                ORDER BY w.date DESC, aer.actual_workout_id DESC, aer.order_index DESC
+            ) AS rn
+        FROM actual_exercise_records aer
+        JOIN actual_workout aw ON aw.actual_workout_id = aer.actual_workout_id
+        JOIN workouts w        ON w.workout_id = aw.workout_id
+        WHERE 1 = ANY(aer.sets)
+          AND (%(user_id)s::int IS NULL OR w.user_id = %(user_id)s::int)
+          AND (%(exercise_ids)s::int[] IS NULL OR aer.exercise_id = ANY(%(exercise_ids)s::int[]))
+    )
+"""
+
+REFRESH_EXERCISE_HISTORY_QUERY = """
+    WITH """ + _PERFORMANCES_CTE + """,
+    completed_sets AS (
+        SELECT p.user_id, p.exercise_id, p.phase, p.rn,
+               s.intensity, s.load, s.reps, s.time, s.idx
+        FROM perf p
+        CROSS JOIN LATERAL unnest(p.intensity, p.load_numeric, p.reps, p.sets, p.time)
+            WITH ORDINALITY AS s(intensity, load, reps, done, time, idx)
+        WHERE s.done = 1
+    ),
+    best AS (
+        SELECT DISTINCT ON (user_id, exercise_id, phase)
+               user_id, exercise_id, phase,
+               load::numeric AS best_intensity,
+               reps AS best_reps
+        FROM completed_sets
+        WHERE load IS NOT NULL
+        ORDER BY user_id, exercise_id, phase,
+                 load DESC, reps DESC NULLS LAST
+    ),
+    last_set AS (
+        SELECT DISTINCT ON (user_id, exercise_id, phase)
+               user_id, exercise_id, phase,
+               jsonb_build_object('intensity', intensity, 'reps', reps, 'time', time) AS last_set
+        FROM completed_sets
+        WHERE rn = 1
+        ORDER BY user_id, exercise_id, phase, idx DESC
+    ),
+    recent AS (
+        SELECT user_id, exercise_id, phase,
+               jsonb_agg(jsonb_build_object(
+                   'exercise_type', exercise_type,
+                   'intensity', intensity,
+                   'reps', reps,
+                   'time', time,
+                   'date', date,
+                   'actual_workout_id', actual_workout_id,
+                   'order_index', order_index
+               ) ORDER BY rn DESC) AS recent,
+               MAX(date) AS last_performed_on
+        FROM perf
+        WHERE rn <= %(depth)s
+        GROUP BY user_id, exercise_id, phase
+    )
+    INSERT INTO user_exercise_history
+        (user_id, exercise_id, phase, recent, last_performed_on,
+         best_intensity, best_reps, last_set, updated_at)
+    SELECT r.user_id, r.exercise_id, r.phase, r.recent, r.last_performed_on,
+           b.best_intensity, b.best_reps, l.last_set, NOW()
+    FROM recent r
+    LEFT JOIN best b     USING (user_id, exercise_id, phase)
+    LEFT JOIN last_set l USING (user_id, exercise_id, phase)
+    ON CONFLICT (user_id, exercise_id, phase) DO UPDATE SET
+        recent            = EXCLUDED.recent,
+        last_performed_on = EXCLUDED.last_performed_on,
+        best_intensity    = EXCLUDED.best_intensity,
+        best_reps         = EXCLUDED.best_reps,
+        last_set          = EXCLUDED.last_set,
+        updated_at        = EXCLUDED.updated_at
+"""
+
+# Drop summaries whose exercise no longer has any completed performance
+# in that phase (deleted or replaced records).
+PRUNE_EXERCISE_HISTORY_QUERY = """
+    WITH """ + _PERFORMANCES_CTE + """
+    DELETE FROM user_exercise_history h
+    WHERE h.user_id = %(user_id)s::int
+      AND h.exercise_id = ANY(%(exercise_ids)s::int[])
+      AND NOT EXISTS (
+          SELECT 1 FROM perf p
+          WHERE p.user_id = h.user_id
+            AND p.exercise_id = h.exercise_id
+            AND p.phase = h.phase
+      )
+"""
+
+
+def refresh_exercise_history(db, user_id, exercise_ids):
+    """
+    Recompute the history summary of some exercises for one user.
+
+    Parameters:
+    - user_id (int)
+    - exercise_ids (iterable[int])
+    """
+    exercise_ids = sorted({int(x) for x in exercise_ids if x is not None})
+    if not exercise_ids:
+        return
+
+    params = {
+        "user_id": int(user_id),
+        "exercise_ids": exercise_ids,
+        "depth": EXERCISE_HISTORY_DEPTH,
+    }
+    db.execute(REFRESH_EXERCISE_HISTORY_QUERY, params)
+    db.execute(PRUNE_EXERCISE_HISTORY_QUERY, params)
+    # Inside a transaction, other requests only see the new rows on commit
+    db.after_commit(lambda: training_context_cache.invalidate_user(int(user_id)))
+
+
+def backfill_exercise_history(db, user_id=None):
+    """
+    Rebuild summaries from the full actual_exercise_records history, for
+    one user or (user_id=None) everyone. Migration 6 runs the same backfill
+    once for existing databases.
+    """
+    db.execute(REFRESH_EXERCISE_HISTORY_QUERY, {
+        "user_id": user_id,
+        "exercise_ids": None,
+        "depth": EXERCISE_HISTORY_DEPTH,
+    })
+    if user_id is None:
+        db.after_commit(training_context_cache.clear)
+    else:
+        db.after_commit(lambda: training_context_cache.invalidate_user(int(user_id)))
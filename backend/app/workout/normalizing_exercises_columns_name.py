@@ -2,6 +2,7 @@ import json
 import re
 from collections import defaultdict
 from pathlib import Path
+from catalog_artifact import write_catalog_artifact
 
 # --- File paths ---
 # SRC_FILE = "exercises_unprocessed.json"     # your raw source
@@ -161,6 +162,9 @@ if seen_noncanon:
 with open(OUT_FILE, "w", encoding="utf-8") as f:
     json.dump(normalized, f, indent=4, ensure_ascii=False)
 
+# --- Columnar artifact the server memory-maps (exercises.catalog/) ---
+print("Wrote catalog artifact:", write_catalog_artifact(OUT_FILE))
+
 # --- Sanity check: confirm exact key set equals canonical + extras (union across entries) ---
 final_keys = set()
 for e in normalized:
@@ -1,8 +1,15 @@
 from datetime import date, datetime, timezone
 from zoneinfo import ZoneInfo
+from types import MappingProxyType
 from collections import defaultdict
 import json
 import ast
+from psycopg2.extras import execute_values
+from database.prepared import register_statement
+from .catalog import get_catalog
+from .venue_cache import venue_equipment_cache
+
+FREE_WEIGHT = ["Kettlebells", "Dumbbells", "FixedWeightBar", "Mini loop band", "Regular loop band", "Handle band"]
 
 def build_available_weights(equipment_rows):
     """
@@ -49,6 +56,92 @@ DAY_MAP = {
 }
 
 
+def resolve_venue_equipment(db, venue_id, equipment_version=None, equip_rows=None):
+    """
+    Resolve a venue's equipment into the inputs workout generation needs.
+
+    Cached per venue (see venue_cache); a hit skips the equipment query and
+    the feasibility pass entirely. Pass the venue's current
+    Venues.equipment_version, or None to bypass the cache. Callers that
+    already fetched the venue's (equipment_id, name, quantity,
+    weight_resistance_time) rows can pass them as equip_rows.
+
+    Returns:
+    - dict: {"equipment", "available_weights", "equipment_mask", "catalog_version"}
+    """
+    catalog = get_catalog()
+    use_cache = venue_id is not None and equipment_version is not None
+    if use_cache:
+        cached = venue_equipment_cache.get(venue_id, equipment_version, catalog.version)
+        if cached is not None:
+            return cached
+
+    if equip_rows is None:
+        equip_rows = db.execute(
+            """
+            SELECT e.equipment_id, e.name, ve.quantity, e.weight_resistance_time
+            FROM Venue_equipment ve
+            JOIN equipment e ON e.equipment_id = ve.equipment_id
+            WHERE ve.venue_id = %s AND COALESCE(ve.quantity, 0) > 0
+            ORDER BY e.name
+            """,
+            (venue_id,), fetch=True
+        )
+
+    equipment = []
+    for (equipment_id, name, quantity, weight_resistance_time) in (equip_rows or []):
+        equipment.append({
+            "equipment_id": equipment_id,
+            "name": name,
+            "quantity": quantity,
+            "weight_resistance_time": weight_resistance_time,
+        })
+
+    none_free_weight_equipment = [
+        eq['name'] for eq in equipment
+        if eq['name'] not in FREE_WEIGHT
+    ]
+    free_weight_equipment = [
+        eq for eq in equipment
+        if eq['name'] in FREE_WEIGHT
+    ]
+
+    available_weights = build_available_weights(free_weight_equipment) or {}
+    for eq_name, weights in available_weights.items():
+        for w, count in weights.items():
+            # Only add labels for Dumbbells / Kettlebells, matching your earlier logic
+            if eq_name in ("Dumbbells", "Kettlebells", "Regular loop band", "Handle band"):
+                name_lower = eq_name.lower()
+                if "dumbbell" in name_lower:
+                    eq_label = "Dumbbell"
+                elif "kettlebell" in name_lower:
+                    eq_label = "Kettlebell"
+                elif "loop band" in name_lower:
+                    eq_label = "Loop Band"
+                elif "handle band" in name_lower:
+                    eq_label = "Handle Band"
+                else:
+                    continue  # skip unknown types
+
+                label = f"{1 if count == 1 else 2} {eq_label}"
+                if label not in none_free_weight_equipment:
+                    none_free_weight_equipment.append(label)
+
+    # Ensure "None" exists for bodyweight exercises ---
+    if "None" not in none_free_weight_equipment:
+        none_free_weight_equipment.append("None")
+
+    entry = {
+        "equipment": none_free_weight_equipment,
+        "available_weights": available_weights,
+        "equipment_mask": catalog.index.equipment_mask(none_free_weight_equipment),
+        "catalog_version": catalog.version,
+    }
+    if use_cache:
+        venue_equipment_cache.put(venue_id, equipment_version, entry)
+    return entry
+
+
 def compute_age(bday) -> int:
     if not bday:
         return 0  # or a sensible default
@@ -142,6 +235,28 @@ def build_exercise_payloads(db, exercises_list):
         })
     return payloads
 
+# Session names of every split, in cycle order (see get_today_workout)
+SPLIT_CYCLES = MappingProxyType({
+    "Full-Body": ("Full-Body",),
+    "Upper-Lower": ("Upper", "Lower"),
+    "Push-Pull-Legs": ("Push", "Pull", "Legs"),
+    "Power Hypertrophy Upper Lower": (
+        "Power Upper", "Power Lower", "Hypertrophy Upper", "Hypertrophy Lower"
+    ),
+    "Hybrid PPL + Upper-Lower": (
+        "Push", "Pull", "Legs", "Upper", "Lower"
+    ),
+    "Body Part Split": (
+        "Chest", "Back", "Shoulders", "Arms", "Legs"
+    ),
+    "6-Day Body Part Split": (
+        "Chest", "Back", "Shoulders", "Arms", "Legs", "Core"
+    ),
+    "Push-Pull-Legs + active rest": (
+        "Push", "Pull", "Legs", "Active Rest"
+    ),
+})
+
 def get_today_workout(split, workout_counter):
     """
     Determine today's workout based on the split and the number of workouts
@@ -154,31 +269,10 @@ def get_today_workout(split, workout_counter):
     Returns:
     - str: Today's workout.
     """
-    split_cycles = {
-        "Full-Body": ["Full-Body"],
-        "Upper-Lower": ["Upper", "Lower"],
-        "Push-Pull-Legs": ["Push", "Pull", "Legs"],
-        "Power Hypertrophy Upper Lower": [
-            "Power Upper", "Power Lower", "Hypertrophy Upper", "Hypertrophy Lower"
-        ],
-        "Hybrid PPL + Upper-Lower": [
-            "Push", "Pull", "Legs", "Upper", "Lower"
-        ],
-        "Body Part Split": [
-            "Chest", "Back", "Shoulders", "Arms", "Legs"
-        ],
-        "6-Day Body Part Split": [
-            "Chest", "Back", "Shoulders", "Arms", "Legs", "Core"
-        ],
-        "Push-Pull-Legs + active rest": [
-            "Push", "Pull", "Legs", "Active Rest"
-        ]
-    }
-
-    if split not in split_cycles:
+    if split not in SPLIT_CYCLES:
         raise ValueError(f"Unknown split: {split}")
 
-    cycle = split_cycles[split]
+    cycle = SPLIT_CYCLES[split]
 
     # Pre-increment semantics: next workout = completed_so_far % len(cycle)
     today_index = workout_counter % len(cycle)
@@ -187,7 +281,8 @@ def get_today_workout(split, workout_counter):
     # print(f"[get_today_workout] completed_so_far={workout_counter} → idx={today_index} → {cycle[today_index]}")
     return cycle[today_index]
 
-def persist_generated_workout(db, user_id, user_timezone, generated_exercises, split_group=None, estimated_time=0):
+def persist_generated_workout(db, user_id, user_timezone, generated_exercises, split_group=None, estimated_time=0,
+                              generation_seed=None):
     """
     Persist generated_exercises into:
       workouts → suggested_workouts → suggested_exercise_records
@@ -195,6 +290,7 @@ def persist_generated_workout(db, user_id, user_timezone, generated_exercises, s
 
     Extracts split_group from the first exercise's 'exercise_type'
     and phase from the first exercise if available (else defaults).
+    generation_seed is stored on the workouts row so it can be replayed.
 
     Returns:
         created: dict with ids and metadata:
@@ -237,110 +333,116 @@ def persist_generated_workout(db, user_id, user_timezone, generated_exercises, s
 
     per_ex = [_as_record_fields(ge, idx) for idx, ge in enumerate(generated_exercises)]
 
-    created = {}
-    try:
-        # db.execute("BEGIN")
-
-        # Use user's timezone for the workout's calendar date
-        user_tz = ZoneInfo(user_timezone)
-        now_utc = datetime.now(timezone.utc)
-        local_date = now_utc.astimezone(user_tz).date()
+    # Use user's timezone for the workout's calendar date
+    user_tz = ZoneInfo(user_timezone)
+    now_utc = datetime.now(timezone.utc)
+    local_date = now_utc.astimezone(user_tz).date()
 
+    # Whole workout graph on one connection, one transaction.
+    with db.transaction() as tx:
         # 1) workouts
-        rows = db.execute(
+        rows = tx.execute(
             """
-            INSERT INTO workouts (user_id, date, phase, split_group)
-            VALUES (%s, %s, %s, %s)
+            INSERT INTO workouts (user_id, date, phase, split_group, generation_seed)
+            VALUES (%s, %s, %s, %s, %s)
             RETURNING workout_id
             """,
-            (user_id, local_date, phase, split_group),
+            (user_id, local_date, phase, split_group, generation_seed),
             fetch=True
         )
         workout_id = rows[0][0]
-        created["workout_id"] = workout_id
-        created["split_group"] = split_group
 
-        # 2) suggested_workouts
-        rows = db.execute(
+        # 2) suggested_workouts + 4) actual_workout
+        rows = tx.execute(
             """
-            INSERT INTO suggested_workouts (workout_id, duration_predicted)
-            VALUES (%s, %s)
-            RETURNING suggested_workout_id
-            """,
-            (workout_id, estimated_time),
-            fetch=True
-        )
-        suggested_workout_id = rows[0][0]
-        created["suggested_workout_id"] = suggested_workout_id
-
-        # 3) suggested_exercise_records
-        for rec in per_ex:
-            db.execute(
-                """
-                INSERT INTO suggested_exercise_records
-                    (suggested_workout_id, exercise_id, exercise_type, intensity, reps, sets, time, order_index)
-                VALUES
-                    (%s, %s, %s, %s, %s, %s, %s, %s)
-                """,
-                (
-                    suggested_workout_id,
-                    rec["exercise_id"],
-                    rec["exercise_type"],
-                    rec["intensity"],
-                    rec["reps"],
-                    rec["sets"],
-                    rec["time"],
-                    rec["order_index"],
-                ),
-                fetch=False
+            WITH sw AS (
+                INSERT INTO suggested_workouts (workout_id, duration_predicted)
+                VALUES (%s, %s)
+                RETURNING suggested_workout_id
+            ), aw AS (
+                INSERT INTO actual_workout (workout_id, duration_actual)
+                VALUES (%s, %s)
+                RETURNING actual_workout_id
             )
-
-        # 4) actual_workout
-        rows = db.execute(
-            """
-            INSERT INTO actual_workout (workout_id, duration_actual)
-            VALUES (%s, %s)
-            RETURNING actual_workout_id
+            SELECT sw.suggested_workout_id, aw.actual_workout_id FROM sw, aw
             """,
-            (workout_id, 0),  # initialize as not-started / 0 duration
+            (workout_id, estimated_time, workout_id, 0),  # actual: not-started / 0 duration
             fetch=True
         )
-        actual_workout_id = rows[0][0]
-        created["actual_workout_id"] = actual_workout_id
-
-        # 5) actual_exercise_records
-        for rec in per_ex:
-            db.execute(
-                """
-                INSERT INTO actual_exercise_records
-                    (actual_workout_id, exercise_id, exercise_type, intensity, reps, sets, time, order_index)
-                VALUES
-                    (%s, %s, %s, %s, %s, %s, %s, %s)
-                """,
-                (
-                    actual_workout_id,
-                    rec["exercise_id"],
-                    rec["exercise_type"],
-                    rec["intensity"],
-                    rec["reps"],
-                    rec["sets"],
-                    rec["time"],
-                    rec["order_index"],
-                ),
-                fetch=False
-            )
+        suggested_workout_id, actual_workout_id = rows[0]
 
-        # db.execute("COMMIT")
+        # 3) suggested_exercise_records + 5) actual_exercise_records
+        insert_exercise_records(tx.cursor, suggested_workout_id, actual_workout_id, per_ex)
 
-        # # Signal the caller that a NEW workout was created, 
-        # so the app should clear any running timer.
-        # created["reset_progress_timer"] = True
+    # # Signal the caller that a NEW workout was created,
+    # so the app should clear any running timer.
+    # created["reset_progress_timer"] = True
 
-        return created
+    return {
+        "workout_id": workout_id,
+        "split_group": split_group,
+        "suggested_workout_id": suggested_workout_id,
+        "actual_workout_id": actual_workout_id,
+    }
 
-    except Exception:
-        # db.execute("ROLLBACK")
-        raise
+
+def insert_exercise_records(cur, suggested_workout_id, actual_workout_id, per_ex):
+    """
+    Multi-row insert of one workout's suggested + actual exercise records.
+
+    Runs on the caller's cursor (e.g. db.transaction()'s tx.cursor), so it
+    joins the caller's transaction.
+
+    Parameters:
+    - per_ex (list[dict]): exercise_id, exercise_type, intensity, reps,
+      sets, time, order_index.
+    """
+    if not per_ex:
+        return
+
+    def _values(parent_id):
+        return [
+            (parent_id, rec["exercise_id"], rec["exercise_type"], rec["intensity"],
+             rec["reps"], rec["sets"], rec["time"], rec["order_index"])
+            for rec in per_ex
+        ]
+
+    execute_values(
+        cur,
+        """
+        INSERT INTO suggested_exercise_records
+            (suggested_workout_id, exercise_id, exercise_type, intensity, reps, sets, time, order_index)
+        VALUES %s
+        """,
+        _values(suggested_workout_id)
+    )
+    execute_values(
+        cur,
+        """
+        INSERT INTO actual_exercise_records
+            (actual_workout_id, exercise_id, exercise_type, intensity, reps, sets, time, order_index)
+        VALUES %s
+        """,
+        _values(actual_workout_id)
+    )
+
+FETCH_EXERCISE_LIST = register_statement("fetch_exercise_list", """
+    SELECT
+        aer.exercise_id,
+        ex.name,
+        ex.animation            AS video_link,
+        ex.written_instructions AS instructions,
+        aer.exercise_type       AS exercise_type,
+        aer.intensity,          -- Text[]
+        aer.reps,               -- INT[]
+        aer.sets,               -- INT[]
+        aer.time,               -- INT (seconds)
+        aer.order_index
+    FROM actual_exercise_records aer
+    JOIN Exercises ex ON ex.exercise_id = aer.exercise_id
+    WHERE aer.actual_workout_id = %s
+    ORDER BY aer.order_index ASC
+    """)
 
 def fetch_exercise_list(db, actual_workout_id: int):
     """
@@ -358,27 +460,7 @@ def fetch_exercise_list(db, actual_workout_id: int):
         "intensity": float | int | None
     }
     """
-    rows = db.execute(
-        """
-        SELECT
-            aer.exercise_id,
-            ex.name,
-            ex.animation            AS video_link,
-            ex.written_instructions AS instructions,
-            aer.exercise_type       AS exercise_type,
-            aer.intensity,          -- Text[]
-            aer.reps,               -- INT[]
-            aer.sets,               -- INT[]
-            aer.time,               -- INT (seconds)
-            aer.order_index
-        FROM actual_exercise_records aer
-        JOIN Exercises ex ON ex.exercise_id = aer.exercise_id
-        WHERE aer.actual_workout_id = %s
-        ORDER BY aer.order_index ASC
-        """,
-        (actual_workout_id,),
-        fetch=True
-    ) or []
+    rows = db.execute_prepared(FETCH_EXERCISE_LIST, (actual_workout_id,), fetch=True) or []
 
 
     exercise_list = []
@@ -400,6 +482,16 @@ def fetch_exercise_list(db, actual_workout_id: int):
 
     return exercise_list
 
+ACTUAL_WORKOUT_ID_FOR_WORKOUT = register_statement(
+    "actual_workout_id_for_workout",
+    "SELECT actual_workout_id FROM actual_workout WHERE workout_id = %s"
+)
+WORKOUT_HAS_COMPLETED_SET = register_statement("workout_has_completed_set", """
+    SELECT completed_sets > 0
+    FROM actual_workout
+    WHERE actual_workout_id = %s
+    """)
+
 def workout_has_any_completed_set(db, workout_id: int = None, actual_workout_id: int = None) -> bool:
     """
     Returns True if the workout has ANY completed set (i.e., a 1 appears in any 'sets' array)
@@ -412,33 +504,13 @@ def workout_has_any_completed_set(db, workout_id: int = None, actual_workout_id:
 
     # Resolve actual_workout_id from workout_id if needed
     if actual_workout_id is None:
-        row = db.execute(
-            "SELECT actual_workout_id FROM actual_workout WHERE workout_id = %s",
-            (int(workout_id),),
-            fetch=True
-        )
+        row = db.execute_prepared(ACTUAL_WORKOUT_ID_FOR_WORKOUT, (int(workout_id),), fetch=True)
         if not row or row[0][0] is None:
             return False
         actual_workout_id = int(row[0][0])
 
-    # Check if any exercise row has a '1' in its sets array
-    # COALESCE handles NULL arrays; UNNEST lets us search within the array.
-    res = db.execute(
-        """
-        SELECT EXISTS (
-            SELECT 1
-            FROM actual_exercise_records aer
-            WHERE aer.actual_workout_id = %s
-              AND EXISTS (
-                    SELECT 1
-                    FROM UNNEST(COALESCE(aer.sets, '{}')) AS s
-                    WHERE s = 1
-              )
-        )
-        """,
-        (int(actual_workout_id),),
-        fetch=True
-    )
+    # Maintained count of completed sets (see completion.py)
+    res = db.execute_prepared(WORKOUT_HAS_COMPLETED_SET, (int(actual_workout_id),), fetch=True)
     return bool(res and res[0][0])
 
 
@@ -696,21 +768,11 @@ def check_user_equipment_for_exercise(
         missing items (fewest missing; tie-break by group length, then index).
     """
     ex_name, eq_raw = _get_exercise_equipment_raw(db, exercise_id, exercise_name)
-    groups = _parse_equipment_spec(eq_raw)
     ctx = _get_user_equipment_context(db, user_id)
     # print("ctx: ", ctx['equipment_names'])
     user_names = ctx["equipment_names"]     # lowercase set of venue equipment names
     aw = ctx["available_weights"]
 
-    # No requirements → pass
-    if not groups:
-        return True, [], []
-
-    # Bodyweight anywhere → pass
-    for g in groups:
-        if any((s or "").strip().lower() == "none" for s in g):
-            return True, [], []
-
     def has_item(token: str) -> bool:
         t = (token or "").strip().lower()
         if not t:
@@ -721,6 +783,30 @@ def check_user_equipment_for_exercise(
         # Direct venue-equipment name match
         return t in user_names
 
+    # Catalog exercises use the compiled requirement matrix; anything else
+    # (e.g. rows added to the table by hand) falls back to parsing the spec.
+    catalog = get_catalog()
+    pos = catalog.name_to_pos.get(ex_name)
+    if pos is not None:
+        matrix = catalog.index.equipment
+        if matrix.row_has_none[pos]:
+            return True, [], []
+        best_missing = matrix.cheapest_missing(pos, matrix.token_mask(has_item))
+        if not best_missing:
+            return True, [], []
+        return False, best_missing, _map_missing_to_equipment_ids(db, best_missing)
+
+    groups = _parse_equipment_spec(eq_raw)
+
+    # No requirements → pass
+    if not groups:
+        return True, [], []
+
+    # Bodyweight anywhere → pass
+    for g in groups:
+        if any((s or "").strip().lower() == "none" for s in g):
+            return True, [], []
+
     # Evaluate each OR-group; collect missing per group with metadata
     misses: list[tuple[list[str], int, int]] = []  # (missing_list, group_len, index)
     for idx, group in enumerate(groups):
@@ -736,4 +822,4 @@ def check_user_equipment_for_exercise(
     # Map missing names to equipment IDs
     best_missing_ids = _map_missing_to_equipment_ids(db, best_missing)
 
-    return False, best_missing, best_missing_ids
\ No newline at end of file
+    return False, best_missing, best_missing_ids
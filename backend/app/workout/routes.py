@@ -2,22 +2,50 @@ from flask import Blueprint, request, jsonify
 from datetime import datetime, timezone
 from zoneinfo import ZoneInfo
 from app.db import db  # Your database helper
-from .utils import recommend_split, workout_generator, determine_user_exercise_weight
+from database.prepared import register_statement
+from .utils import recommend_split, workout_generator, determine_user_exercise_weight, new_generation_seed
 from .route_helpers import (
-    compute_age, 
-    DAY_MAP, 
-    build_available_weights, 
     build_exercise_payloads, 
     persist_generated_workout, 
+    insert_exercise_records,
     fetch_exercise_list,
     check_user_equipment_for_exercise,
     get_today_workout,
     workout_has_any_completed_set,
 )
+from .training_context import load_training_context, training_context_cache
+from .history import refresh_exercise_history
+from .completion import refresh_workout_completion
 
 workout_bp = Blueprint("workout", __name__, url_prefix="/workout")
 
-FREE_WEIGHT = ["Kettlebells", "Dumbbells", "FixedWeightBar", "Mini loop band", "Regular loop band", "Handle band"]
+# Hot queries, run as server-side prepared statements (database/prepared.py)
+LATEST_WORKOUT = register_statement("latest_workout", """
+    SELECT 
+        w.workout_id,
+        w.date,
+        w.split_group,
+        sw.suggested_workout_id,
+        aw.actual_workout_id,
+        COALESCE(aw.duration_actual, 0) AS duration_actual
+    FROM workouts w
+    JOIN suggested_workouts sw ON sw.workout_id = w.workout_id
+    LEFT JOIN actual_workout aw ON aw.workout_id = w.workout_id
+    WHERE w.user_id = %s
+    ORDER BY w.date DESC, w.workout_id DESC
+    LIMIT 1
+    """)
+EXERCISE_PREFERENCE = register_statement("exercise_preference", """
+    SELECT preference
+    FROM exercise_preferences
+    WHERE user_id = %s AND exercise_id = %s;
+    """)
+UPSERT_EXERCISE_PREFERENCE = register_statement("upsert_exercise_preference", """
+    INSERT INTO exercise_preferences (user_id, exercise_id, preference)
+    VALUES (%s, %s, %s)
+    ON CONFLICT (user_id, exercise_id)
+    DO UPDATE SET preference = EXCLUDED.preference;
+    """)
 
 @workout_bp.route("/generate_workout/<int:user_id>", methods=["POST"])
 def generate_user_workout(user_id: int):
@@ -27,6 +55,13 @@ def generate_user_workout(user_id: int):
         was_venue_changed = bool(data.get("wasVenueChanged") or False)
         user_wants_new_workout = bool(data.get("user_wants_new_workout") or False)
 
+        # Optional "seed" replays an earlier generation (workouts.generation_seed)
+        is_replay = data.get("seed") is not None
+        try:
+            generation_seed = int(data["seed"]) if is_replay else new_generation_seed()
+        except (TypeError, ValueError):
+            return jsonify({"success": False, "error": "seed must be an integer"}), 400
+
         # ---- User-local "today" ----
         try:
             user_tz = ZoneInfo(user_device_timezone)
@@ -36,25 +71,7 @@ def generate_user_workout(user_id: int):
         local_today = now_utc.astimezone(user_tz).date()
 
         # ---- Most recent generated workout ----
-        latest = db.execute(
-            """
-            SELECT 
-                w.workout_id,
-                w.date,
-                w.split_group,
-                sw.suggested_workout_id,
-                aw.actual_workout_id,
-                COALESCE(aw.duration_actual, 0) AS duration_actual
-            FROM workouts w
-            JOIN suggested_workouts sw ON sw.workout_id = w.workout_id
-            LEFT JOIN actual_workout aw ON aw.workout_id = w.workout_id
-            WHERE w.user_id = %s
-            ORDER BY w.date DESC, w.workout_id DESC
-            LIMIT 1
-            """,
-            (user_id,),
-            fetch=True
-        )
+        latest = db.execute_prepared(LATEST_WORKOUT, (user_id,), fetch=True)
         
         # -------------------------------
         # Reuse short-circuits (ONLY when user did NOT request a new workout and no venue change)
@@ -107,158 +124,27 @@ def generate_user_workout(user_id: int):
                 }), 200
 
         # -------------------------------
-        # Load user/venue context
+        # Load user/venue context (always fresh here; primes the TTL cache)
         # -------------------------------
-        rows = db.execute(
-            """
-            SELECT 
-                u.birthday,
-                u.level AS user_level,
-                v.days_of_week,
-                v.workout_frequency,
-                v.time_per_workout,
-                v.goals,
-                v.pain_points,
-                v.priority_muscles,
-                v.split,
-                u.workout_number,
-                v.rest_time_between_set
-            FROM Users u
-            LEFT JOIN Venues v ON v.venue_id = u.current_venue_id
-            WHERE u.user_id = %s
-            """,
-            (user_id,),
-            fetch=True
-        )
-
-        if not rows or not rows[0]:
+        ctx = load_training_context(db, user_id, max_age=0)
+        if ctx is None:
             return jsonify({"success": False, "error": "User not found"}), 404
 
-        (birthday, user_level, days_of_week_raw, wf_raw, tpw_raw,
-         goals_raw, pains_raw, pri_musc_raw, split_raw,
-         workout_number, rest_time_between_set) = rows[0]
-
-        age = compute_age(birthday)
-        time_per_workout = int(tpw_raw or 120)
-        level = str(user_level if user_level is not None else "1")
-        workout_number = int(workout_number or 0)
-
-        user_goals = list(goals_raw or [])
-        pains_raw = [p.split(" ")[0] for p in (pains_raw or [])]
-        pain_points = list(pains_raw or [])
-        priority_muscles = list(pri_musc_raw or [])
-
-        pref_rows = db.execute(
-            """
-            SELECT e.name, ep.preference
-            FROM exercise_preferences ep
-            JOIN Exercises e ON e.exercise_id = ep.exercise_id
-            WHERE ep.user_id = %s
-            """,
-            (user_id,),
-            fetch=True
-        ) or []
-        user_favorites, suggest_less, dont_show_again = set(), set(), set()
-        for (exercise_name, pref_val) in pref_rows:
-            if pref_val == 3: user_favorites.add(exercise_name)
-            elif pref_val == 2: suggest_less.add(exercise_name)
-            elif pref_val == 1: dont_show_again.add(exercise_name)
-
-        # Venue + equipment
-        venue_rows = db.execute(
-            "SELECT u.current_venue_id FROM Users u WHERE u.user_id = %s",
-            (user_id,), fetch=True
-        )
-        if not venue_rows:
-            return jsonify({"success": False, "error": "No venue found"}), 404
-        venue_id = venue_rows[0][0]
-
-        equip_rows = db.execute(
-            """
-            SELECT e.equipment_id, e.name, ve.quantity, e.weight_resistance_time
-            FROM Venue_equipment ve
-            JOIN equipment e ON e.equipment_id = ve.equipment_id
-            WHERE ve.venue_id = %s AND COALESCE(ve.quantity, 0) > 0
-            ORDER BY e.name
-            """,
-            (venue_id,), fetch=True
-        )
-
-        equipment = []
-        for (equipment_id, name, quantity, weight_resistance_time) in (equip_rows or []):
-            equipment.append({
-                "equipment_id": equipment_id,
-                "name": name,
-                "quantity": quantity,
-                "weight_resistance_time": weight_resistance_time,
-            })
-
-        none_free_weight_equipment = [
-            eq['name'] for eq in equipment
-            if eq['name'] not in FREE_WEIGHT
-        ]
-        free_weight_equipment = [
-            eq for eq in equipment
-            if eq['name'] in FREE_WEIGHT
-        ]
-
-        available_weights = build_available_weights(free_weight_equipment) or {}
-        for eq_name, weights in available_weights.items():
-            for w, count in weights.items():
-                # Only add labels for Dumbbells / Kettlebells, matching your earlier logic
-                if eq_name in ("Dumbbells", "Kettlebells", "Regular loop band", "Handle band"):
-                    name_lower = eq_name.lower()
-                    if "dumbbell" in name_lower:
-                        eq_label = "Dumbbell"
-                    elif "kettlebell" in name_lower:
-                        eq_label = "Kettlebell"
-                    elif "loop band" in name_lower:
-                        eq_label = "Loop Band"
-                    elif "handle band" in name_lower:
-                        eq_label = "Handle Band"
-                    else:
-                        continue  # skip unknown types
-                    
-                    # label = f"{1 if count == 1 else 2} {'Dumbbell' if eq_name == 'Dumbbells' else 'Kettlebell'}"
-                    label = f"{1 if count == 1 else 2} {eq_label}"
-                    if label not in none_free_weight_equipment:
-                        none_free_weight_equipment.append(label)
-
-        # Ensure "None" exists for bodyweight exercises ---
-        if "None" not in none_free_weight_equipment:
-            none_free_weight_equipment.append("None")
-
-        # History → user_records
-        user_records = {str(user_id): {"by_exercise": {}}}
-        hist_rows = db.execute(
-            """
-            SELECT e.name, aer.intensity, aer.reps, aer.sets, e.movement, e.level, e.main_muscles, e.secondary_muscles
-            FROM actual_exercise_records aer
-            JOIN actual_workout aw ON aw.actual_workout_id = aer.actual_workout_id
-            JOIN workouts w ON w.workout_id = aw.workout_id
-            JOIN Exercises e ON e.exercise_id = aer.exercise_id
-            WHERE w.user_id = %s
-            ORDER BY aw.actual_workout_id DESC, aer.order_index ASC
-            LIMIT 200
-            """,
-            (user_id,), fetch=True
-        ) or []
-
-        for (ex_name, intensity_arr, reps_arr, sets_arr, movement, level_str, main_muscles, secondary_muscles) in hist_rows:
-            exercise_type = "Gym Equipment"
-            if isinstance(intensity_arr, list) and intensity_arr and isinstance(intensity_arr[-1], (int, float)):
-                exercise_intensity = float(intensity_arr[-1])
-            elif exercise_type == "Resistance Band":
-                exercise_intensity = intensity_arr[-1]
-            else:
-                exercise_intensity = None
-            entry = {
-                "phase": "Unknown",
-                "weight": exercise_intensity,
-                "reps": reps_arr,
-                "time": intensity_arr[-1] if exercise_type == 'Timed Exercise' else None
-            }
-            user_records[str(user_id)]["by_exercise"].setdefault(ex_name, []).append(entry)
+        age = ctx.age
+        time_per_workout = ctx.time_per_workout
+        level = ctx.level
+        workout_number = ctx.workout_number
+        split_raw = ctx.split
+        rest_time_between_set = ctx.rest_time_between_set
+        user_goals = ctx.user_goals
+        pain_points = ctx.pain_points
+        priority_muscles = ctx.priority_muscles
+        user_favorites, suggest_less, dont_show_again = ctx.user_favorites, ctx.suggest_less, ctx.dont_show_again
+
+        # Venue + equipment (cached per venue until its equipment changes)
+        venue_equipment = ctx.venue_equipment
+        none_free_weight_equipment = venue_equipment["equipment"]
+        user_records = ctx.records
 
         # -------------------------------
         # Decide split + replacing/adding
@@ -301,10 +187,13 @@ def generate_user_workout(user_id: int):
             pain_points=pain_points,
             priority_muscles=priority_muscles,
             equipment=none_free_weight_equipment,
-            user_available_weights=build_available_weights(free_weight_equipment),
+            user_available_weights=venue_equipment["available_weights"],
             user_favorites=user_favorites,
             suggest_less=suggest_less,
             dont_show_again=dont_show_again,
+            venue_equipment=venue_equipment,
+            seed=generation_seed,
+            replay=is_replay,
         )
         generated_exercises = build_exercise_payloads(db, exercises)
         total_estimated_time = estimated_session_time + rest_time_between_set * 4 * len(generated_exercises)
@@ -343,66 +232,32 @@ def generate_user_workout(user_id: int):
                     "order_index": idx,
                 })
 
-            try:
-                # db.execute("BEGIN")
+            # One transaction: the old records are only replaced if the
+            # whole new workout is written.
+            with db.transaction() as tx:
                 # update the container rows (date & split)
-                db.execute(
+                tx.execute(
                     """
                     UPDATE workouts 
-                    SET date = %s, split_group = %s
+                    SET date = %s, split_group = %s, generation_seed = %s
                     WHERE workout_id = (SELECT workout_id FROM actual_workout WHERE actual_workout_id = %s)
                     """,
-                    (local_today, split_group, int(mr_aw_id))
+                    (local_today, split_group, generation_seed, int(mr_aw_id))
                 )
-                db.execute(
+                tx.execute(
                     "UPDATE suggested_workouts SET duration_predicted = %s WHERE suggested_workout_id = %s",
                     (int(total_estimated_time), int(mr_sw_id))
                 )
-                db.execute("DELETE FROM suggested_exercise_records WHERE suggested_workout_id = %s", (int(mr_sw_id),))
-                db.execute("DELETE FROM actual_exercise_records    WHERE actual_workout_id   = %s", (int(mr_aw_id),))
+                tx.execute("DELETE FROM suggested_exercise_records WHERE suggested_workout_id = %s", (int(mr_sw_id),))
+                tx.execute("DELETE FROM actual_exercise_records    WHERE actual_workout_id   = %s", (int(mr_aw_id),))
 
-                for rec in per_ex:
-                    db.execute(
-                        """
-                        INSERT INTO suggested_exercise_records
-                            (suggested_workout_id, exercise_id, exercise_type, intensity, reps, sets, time, order_index)
-                        VALUES
-                            (%s, %s, %s, %s, %s, %s, %s, %s)
-                        """,
-                        (
-                            int(mr_sw_id),
-                            rec["exercise_id"],
-                            rec["exercise_type"],
-                            rec["intensity"],
-                            rec["reps"],
-                            rec["sets"],
-                            rec["time"],
-                            rec["order_index"],
-                        )
-                    )
-                    db.execute(
-                        """
-                        INSERT INTO actual_exercise_records
-                            (actual_workout_id, exercise_id, exercise_type, intensity, reps, sets, time, order_index)
-                        VALUES
-                            (%s, %s, %s, %s, %s, %s, %s, %s)
-                        """,
-                        (
-                            int(mr_aw_id),
-                            rec["exercise_id"],
-                            rec["exercise_type"],
-                            rec["intensity"],
-                            rec["reps"],
-                            rec["sets"],
-                            rec["time"],
-                            rec["order_index"],
-                        )
-                    )
+                insert_exercise_records(tx.cursor, int(mr_sw_id), int(mr_aw_id), per_ex)
+                refresh_workout_completion(tx, mr_aw_id)
 
                 # IMPORTANT: advance workout_number ONLY when the user explicitly requested a new workout;
                 # venue-change replacement keeps the same split and does NOT advance.
                 if user_wants_new_workout and not was_venue_changed:
-                    db.execute(
+                    tx.execute(
                         """
                         UPDATE Users
                         SET workout_number = COALESCE(workout_number, 0) + 1
@@ -410,11 +265,8 @@ def generate_user_workout(user_id: int):
                         """,
                         (user_id,)
                     )
-
-                # db.execute("COMMIT")
-            except Exception:
-                # db.execute("ROLLBACK")
-                raise
+                    # The cached context still holds the old workout_number
+                    tx.after_commit(lambda: training_context_cache.invalidate_user(user_id))
 
             exercise_list = fetch_exercise_list(db, int(mr_aw_id))
             # Re-read workout_id for completeness
@@ -429,31 +281,38 @@ def generate_user_workout(user_id: int):
                 "workout_id": int(re_wid),
                 "suggested_workout_id": int(mr_sw_id),
                 "actual_workout_id": int(mr_aw_id),
+                "generation_seed": generation_seed,
                 "exercise_list": exercise_list
             }), 200
 
         # -------------------------------
         # Default ADD NEW (includes user_wants_new_workout when latest is complete or missing)
         # -------------------------------
-        created_ids = persist_generated_workout(
-            db=db,
-            user_id=user_id,
-            user_timezone=user_device_timezone,
-            generated_exercises=generated_exercises,
-            split_group=split_group,
-            estimated_time=total_estimated_time,
-        )
-        exercise_list = fetch_exercise_list(db, int(created_ids["actual_workout_id"]))
+        # The new workout and the workout_number bump commit together
+        # (persist_generated_workout's own transaction nests as a savepoint).
+        with db.transaction() as tx:
+            created_ids = persist_generated_workout(
+                db=db,
+                user_id=user_id,
+                user_timezone=user_device_timezone,
+                generated_exercises=generated_exercises,
+                split_group=split_group,
+                estimated_time=total_estimated_time,
+                generation_seed=generation_seed,
+            )
 
-        # Advance workout_number for newly added workout
-        db.execute(
-            """
-            UPDATE Users
-            SET workout_number = COALESCE(workout_number, 0) + 1
-            WHERE user_id = %s
-            """,
-            (user_id,),
-        )
+            # Advance workout_number for newly added workout
+            tx.execute(
+                """
+                UPDATE Users
+                SET workout_number = COALESCE(workout_number, 0) + 1
+                WHERE user_id = %s
+                """,
+                (user_id,),
+            )
+            tx.after_commit(lambda: training_context_cache.invalidate_user(user_id))
+
+        exercise_list = fetch_exercise_list(db, int(created_ids["actual_workout_id"]))
 
         return jsonify({
             "success": True,
@@ -462,6 +321,7 @@ def generate_user_workout(user_id: int):
             "workout_id": created_ids["workout_id"],
             "suggested_workout_id": created_ids["suggested_workout_id"],
             "actual_workout_id": created_ids["actual_workout_id"],
+            "generation_seed": generation_seed,
             "exercise_list": exercise_list
         }), 200
 
@@ -517,114 +377,20 @@ def add_exercise_to_actual_workout(user_id: int, actual_workout_id: int):
             return jsonify({"success": False, "error": "actual_workout_id not found for user"}), 404
         workout_id = wrow[0][1]
 
-        # 1) Pull user/venue/equipment context (same as your determine_weight route)
-        rows = db.execute(
-            """
-            SELECT 
-                u.birthday, u.level AS user_level, v.days_of_week, v.workout_frequency,
-                v.time_per_workout, v.goals, v.pain_points, v.priority_muscles, v.split,
-                u.workout_number, v.rest_time_between_set
-            FROM Users u
-            LEFT JOIN Venues v ON v.venue_id = u.current_venue_id
-            WHERE u.user_id = %s
-            """,
-            (user_id,),
-            fetch=True
-        )
-        if not rows:
+        # 1) Pull user/venue/equipment context (shared with the other routes, TTL-cached)
+        ctx = load_training_context(db, user_id)
+        if ctx is None:
             return jsonify({"success": False, "error": "User not found"}), 404
-        (birthday, user_level, days_of_week_raw, wf_raw, tpw_raw,
-         goals_raw, pains_raw, pri_musc_raw, split_raw, workout_number,
-         rest_time_between_set) = rows[0]
-
-        age = compute_age(birthday)
-        days_of_week_raw = [
-            DAY_MAP[day.lower()]
-            for day in (days_of_week_raw or [])
-            if isinstance(day, str) and day.lower() in DAY_MAP
-        ]
-        # days_of_week = [int(d) for d in (days_of_week_raw or [1,2,3,4,5,6,7])]
-        # workout_frequency = int(wf_raw or 1)
-        # time_per_workout = int(tpw_raw or 120)
-        level = str(user_level if user_level is not None else "1")
-        workout_number = int(workout_number or 0)
-        user_goals = list(goals_raw or [])
-        pains_raw = [p.split(" ")[0] for p in (pains_raw or [])]
-        pain_points = list(pains_raw or [])
-        # priority_muscles = list(pri_musc_raw or [])
-
-        # Venue + equipment
-        venue_id_row = db.execute("SELECT u.current_venue_id FROM Users u WHERE u.user_id = %s", (user_id,), fetch=True)
-        if not venue_id_row:
-            return jsonify({"success": False, "error": "User not found"}), 404
-        (venue_id,) = venue_id_row[0]
-        if venue_id is None:
+        if ctx.venue_id is None:
             return jsonify({"success": False, "error": "User has no current venue set"}), 404
 
-        equip_rows = db.execute(
-            """
-            SELECT e.equipment_id, e.name, ve.quantity, e.weight_resistance_time
-            FROM Venue_equipment ve
-            JOIN equipment e ON e.equipment_id = ve.equipment_id
-            WHERE ve.venue_id = %s AND COALESCE(ve.quantity, 0) > 0
-            ORDER BY e.name
-            """,
-            (venue_id,),
-            fetch=True
-        )
-        equipment = [{"equipment_id": r[0], "name": r[1], "quantity": r[2], "weight_resistance_time": r[3]} for r in (equip_rows or [])]
-        none_free_weight_equipment = [eq['name'] for eq in equipment if eq['name'] not in ["Kettlebells","Dumbbells","FixedWeightBar", "Mini loop band", "Regular loop band", "Handle band"]]
-        free_weight_equipment = [eq for eq in equipment if eq['name'] in ["Kettlebells","Dumbbells","FixedWeightBar", "Mini loop band", "Regular loop band", "Handle band"]]
-        available_weights = build_available_weights(free_weight_equipment)
-        for eq_name in available_weights:
-            for w, c in available_weights[eq_name].items():
-                label = f"{1 if c==1 else 2} {'Dumbbell' if eq_name=='Dumbbells' else 'Kettlebell'}"
-                if label not in none_free_weight_equipment:
-                    none_free_weight_equipment.append(label)
-        # if "2 Dumbbell" not in none_free_weight_equipment:
-        # none_free_weight_equipment.append("2 Dumbbell")
-        
-        # Database does not contain None as equipment.Therefore adding it for
-        # bodyweight exercises
-        if "None" not in none_free_weight_equipment: none_free_weight_equipment.append("None")
-        # print(free_weight_equipment)
-        # Prior user records (for determine_user_exercise_weight)
-        rec_rows = db.execute(
-            """
-            SELECT e.name, w.phase, w.date, aer.intensity, aer.reps, aer.time, aer.exercise_type
-            FROM actual_exercise_records aer
-            JOIN actual_workout aw ON aw.actual_workout_id = aer.actual_workout_id
-            JOIN workouts w        ON w.workout_id = aw.workout_id
-            JOIN Exercises e       ON e.exercise_id = aer.exercise_id
-            WHERE w.user_id = %s
-            ORDER BY w.date ASC, aw.actual_workout_id ASC, aer.order_index ASC
-            """,
-            (user_id,),
-            fetch=True
-        )
-        user_records = {str(user_id): {"by_exercise": {}}}
-        for (ex_name, phase, w_date, intensity_arr, reps_arr, set_time, exercise_type) in (rec_rows or []):
-            if exercise_type == 'Gym Equipment':
-                exercise_intensity = float(intensity_arr[-1])
-            elif exercise_type == "Resistance Band":
-                exercise_intensity = intensity_arr[-1]
-            else:
-                exercise_intensity = None
-
-            user_records[str(user_id)]["by_exercise"].setdefault(ex_name, []).append({
-                "phase": phase,
-                "weight": exercise_intensity,
-                "reps": reps_arr,
-                "time": intensity_arr[-1] if exercise_type == 'Timed Exercise' else None #[int(secs) for secs in (set_time or []) if secs is not None],
-            })
-
         # Suggested intensity
         result = determine_user_exercise_weight(
-            exercise_name=exercise_name, user_id=user_id, age=age,
-            user_workout_count=workout_number, user_split=split_raw,
-            user_records=user_records, level=level, user_goals=user_goals,
-            pain_points=pain_points, equipment=none_free_weight_equipment,
-            user_available_weights=available_weights
+            exercise_name=exercise_name, user_id=user_id, age=ctx.age,
+            user_workout_count=ctx.workout_number, user_split=ctx.split,
+            user_records=ctx.records, level=ctx.level, user_goals=ctx.user_goals,
+            pain_points=ctx.pain_points, equipment=ctx.equipment_names,
+            user_available_weights=ctx.available_weights
         )
 
         # print(result)
@@ -776,110 +542,25 @@ def replace_actual_exercise_by_workout_and_exercise(user_id: int, actual_workout
             exercise_name = nr[0][0]
 
         # 3) Build the same context (user/venue/equipment/records) used elsewhere
-        #    — this mirrors your existing routes so suggestions stay consistent. :contentReference[oaicite:0]{index=0}
-        rows_user = db.execute(
-            """
-            SELECT 
-                u.birthday, u.level AS user_level, v.days_of_week, v.workout_frequency,
-                v.time_per_workout, v.goals, v.pain_points, v.priority_muscles, v.split,
-                u.workout_number, v.rest_time_between_set
-            FROM Users u
-            LEFT JOIN Venues v ON v.venue_id = u.current_venue_id
-            WHERE u.user_id = %s
-            """,
-            (user_id,),
-            fetch=True
-        )
-        if not rows_user:
-            return jsonify({"success": False, "error": "User not found"}), 404
-
-        (birthday, user_level, days_of_week_raw, wf_raw, tpw_raw,
-         goals_raw, pains_raw, pri_musc_raw, split_raw, workout_number,
-         rest_time_between_set) = rows_user[0]
-
-        age = compute_age(birthday)
-        level = str(user_level if user_level is not None else "1")
-        user_goals = list(goals_raw or [])
-        pains_raw = [p.split(" ")[0] for p in (pains_raw or [])]
-        pain_points = list(pains_raw or [])
-
-        vrow = db.execute("SELECT u.current_venue_id FROM Users u WHERE u.user_id = %s", (user_id,), fetch=True)
-        if not vrow:
+        ctx = load_training_context(db, user_id)
+        if ctx is None:
             return jsonify({"success": False, "error": "User not found"}), 404
-        (venue_id,) = vrow[0]
-        if venue_id is None:
+        if ctx.venue_id is None:
             return jsonify({"success": False, "error": "User has no current venue set"}), 404
 
-        equip_rows = db.execute(
-            """
-            SELECT e.equipment_id, e.name, ve.quantity, e.weight_resistance_time
-            FROM Venue_equipment ve
-            JOIN equipment e ON e.equipment_id = ve.equipment_id
-            WHERE ve.venue_id = %s AND COALESCE(ve.quantity, 0) > 0
-            ORDER BY e.name
-            """,
-            (venue_id,),
-            fetch=True
-        )
-        # print(equip_rows)
-        equipment = [{"equipment_id": r[0], "name": r[1], "quantity": r[2], "weight_resistance_time": r[3]} for r in (equip_rows or [])]
-        none_free_weight_equipment = [eq['name'] for eq in equipment if eq['name'] not in ["Kettlebells","Dumbbells","FixedWeightBar", "Mini loop band", "Regular loop band", "Handle band"]]
-        free_weight_equipment = [eq for eq in equipment if eq['name'] in ["Kettlebells","Dumbbells", "FixedWeightBar", "Mini loop band", "Regular loop band", "Handle band"]]
-
-        # for w in free_weight_equipment:
-        #     print(f"ye: {w}")
-
-        available_weights = build_available_weights(free_weight_equipment)
-        for eq_name in available_weights:
-            for _, c in available_weights[eq_name].items():
-                label = f"{1 if c==1 else 2} {'Dumbbell' if eq_name=='Dumbbells' else 'Kettlebell'}"
-                if label not in none_free_weight_equipment:
-                    none_free_weight_equipment.append(label)
-        # if "2 Dumbbell" not in none_free_weight_equipment: none_free_weight_equipment.append("2 Dumbbell")
-        if "None" not in none_free_weight_equipment: none_free_weight_equipment.append("None")
-
-        rec_rows = db.execute(
-            """
-            SELECT e.name, w.phase, w.date, aer.intensity, aer.reps, aer.time, aer.exercise_type
-            FROM actual_exercise_records aer
-            JOIN actual_workout aw ON aw.actual_workout_id = aer.actual_workout_id
-            JOIN workouts w        ON w.workout_id = aw.workout_id
-            JOIN Exercises e       ON e.exercise_id = aer.exercise_id
-            WHERE w.user_id = %s
-            ORDER BY w.date ASC, aw.actual_workout_id ASC, aer.order_index ASC
-            """,
-            (user_id,),
-            fetch=True
-        )
-        user_records = {str(user_id): {"by_exercise": {}}}
-        for (ex_name, phase, w_date, intensity_arr, reps_arr, set_time, exercise_type) in (rec_rows or []):
-            if exercise_type == 'Gyme Equipment':
-                exercise_intensity = float(intensity_arr[-1])
-            elif exercise_type == "Resistance Band":
-                exercise_intensity = intensity_arr[-1]
-            else:
-                exercise_intensity = None
-        
-            user_records[str(user_id)]["by_exercise"].setdefault(ex_name, []).append({
-                "phase": phase,
-                "weight": exercise_intensity,
-                "reps": reps_arr,
-                "time": intensity_arr[-1] if exercise_type == 'Timed Exercise' else None
-            })
-
         # 4) Determine suggested intensity ONCE (apply to all targets)
         result = determine_user_exercise_weight(
             exercise_name=exercise_name,
             user_id=user_id,
-            age=age,
-            user_workout_count=workout_number,
-            user_split=split_raw,
-            user_records=user_records,
-            level=level,
-            user_goals=user_goals,
-            pain_points=pain_points,
-            equipment=none_free_weight_equipment,
-            user_available_weights=available_weights
+            age=ctx.age,
+            user_workout_count=ctx.workout_number,
+            user_split=ctx.split,
+            user_records=ctx.records,
+            level=ctx.level,
+            user_goals=ctx.user_goals,
+            pain_points=ctx.pain_points,
+            equipment=ctx.equipment_names,
+            user_available_weights=ctx.available_weights
         )
         # print("results: ", result)
         si = result.get("suggested_intensity") or {}
@@ -910,19 +591,23 @@ def replace_actual_exercise_by_workout_and_exercise(user_id: int, actual_workout
         intensity = [x for x in _pad(intensity, 0.0)]
         time   = [int(x)   for x in _pad(time, 0)]
 
-        # 5) Update 1 or many rows (preserve order_index)
+        # 5) Update 1 or many rows (preserve order_index), together with the
+        #    summaries that depend on them
         updated_ids = []
-        for (actual_record_id, _) in target_rows:
-            db.execute(
-                """
-                UPDATE actual_exercise_records
-                SET exercise_id = %s, intensity = %s, reps = %s, sets = %s,
-                time = %s, exercise_type = %s
-                WHERE actual_record_id = %s
-                """,
-                (new_exercise_id, intensity, reps, sets, time, si.get("exercise_type"), actual_record_id)
-            )
-            updated_ids.append(int(actual_record_id))
+        with db.transaction() as tx:
+            for (actual_record_id, _) in target_rows:
+                tx.execute(
+                    """
+                    UPDATE actual_exercise_records
+                    SET exercise_id = %s, intensity = %s, reps = %s, sets = %s,
+                    time = %s, exercise_type = %s
+                    WHERE actual_record_id = %s
+                    """,
+                    (new_exercise_id, intensity, reps, sets, time, si.get("exercise_type"), actual_record_id)
+                )
+                updated_ids.append(int(actual_record_id))
+            refresh_exercise_history(tx, user_id, [old_exercise_id])
+            refresh_workout_completion(tx, actual_workout_id)
 
         return jsonify({
             "success": True,
@@ -978,102 +663,23 @@ def normalize_intensity(si):
 
 
 def _build_user_context_for_intensity(user_id):
-    # Pull user + venue + equipment + records (mirrors existing routes)
-    rows = db.execute(
-        """
-        SELECT 
-            u.birthday, u.level AS user_level, v.days_of_week, v.workout_frequency,
-            v.time_per_workout, v.goals, v.pain_points, v.priority_muscles, v.split,
-            u.workout_number, v.rest_time_between_set
-        FROM Users u
-        LEFT JOIN Venues v ON v.venue_id = u.current_venue_id
-        WHERE u.user_id = %s
-        """,
-        (user_id,),
-        fetch=True
-    )
-    if not rows:
+    # Pull user + venue + equipment + records (shared loader, TTL-cached)
+    ctx = load_training_context(db, user_id)
+    if ctx is None:
         raise ValueError("User not found")
-    (birthday, user_level, days_of_week_raw, wf_raw, tpw_raw,
-     goals_raw, pains_raw, pri_musc_raw, split_raw, workout_number,
-     rest_time_between_set) = rows[0]
-
-    age = compute_age(birthday)
-    level = str(user_level if user_level is not None else "1")
-    user_goals = list(goals_raw or [])
-    pains_raw = [p.split(" ")[0] for p in (pains_raw or [])]
-    pain_points = list(pains_raw or [])
-
-    vrow = db.execute("SELECT u.current_venue_id FROM Users u WHERE u.user_id = %s",
-                      (user_id,), fetch=True)
-    if not vrow:
-        raise ValueError("User not found")
-    (venue_id,) = vrow[0]
-    if venue_id is None:
+    if ctx.venue_id is None:
         raise ValueError("User has no current venue set")
 
-    equip_rows = db.execute(
-        """
-        SELECT e.equipment_id, e.name, ve.quantity, e.weight_resistance_time
-        FROM Venue_equipment ve
-        JOIN equipment e ON e.equipment_id = ve.equipment_id
-        WHERE ve.venue_id = %s AND COALESCE(ve.quantity, 0) > 0
-        ORDER BY e.name
-        """,
-        (venue_id,),
-        fetch=True
-    )
-    equipment = [{"equipment_id": r[0], "name": r[1], "quantity": r[2], "weight_resistance_time": r[3]} for r in (equip_rows or [])]
-    none_free_weight_equipment = [eq['name'] for eq in equipment if eq['name'] not in ["Kettlebells","Dumbbells","FixedWeightBar", "Mini loop band", "Regular loop band", "Handle band"]]
-    free_weight_equipment = [eq for eq in equipment if eq['name'] in ["Kettlebells","Dumbbells","FixedWeightBar", "Mini loop band", "Regular loop band", "Handle band"]]
-    available_weights = build_available_weights(free_weight_equipment)
-    for eq_name in available_weights:
-        for _, c in available_weights[eq_name].items():
-            label = f"{1 if c==1 else 2} {'Dumbbell' if eq_name=='Dumbbells' else 'Kettlebell'}"
-            if label not in none_free_weight_equipment:
-                none_free_weight_equipment.append(label)
-    if "2 Dumbbell" not in none_free_weight_equipment: none_free_weight_equipment.append("2 Dumbbell")
-    if "None" not in none_free_weight_equipment: none_free_weight_equipment.append("None")
-
-    rec_rows = db.execute(
-        """
-        SELECT e.name, w.phase, w.date, aer.intensity, aer.reps, aer.time, exercise_type
-        FROM actual_exercise_records aer
-        JOIN actual_workout aw ON aw.actual_workout_id = aer.actual_workout_id
-        JOIN workouts w        ON w.workout_id = aw.workout_id
-        JOIN Exercises e       ON e.exercise_id = aer.exercise_id
-        WHERE w.user_id = %s
-        ORDER BY w.date ASC, aw.actual_workout_id ASC, aer.order_index ASC
-        """,
-        (user_id,),
-        fetch=True
-    )
-    user_records = {str(user_id): {"by_exercise": {}}}
-    for (ex_name, phase, w_date, intensity_arr, reps_arr, set_time, exercise_type) in (rec_rows or []):
-        if exercise_type == 'Gyme Equipment':
-            exercise_intensity = float(intensity_arr[-1])
-        elif exercise_type == "Resistance Band":
-            exercise_intensity = intensity_arr[-1]
-        else:
-            exercise_intensity = None
-    
-        user_records[str(user_id)]["by_exercise"].setdefault(ex_name, []).append({
-            "phase": phase,
-            "weight": exercise_intensity,
-            "reps": reps_arr,
-            "time": intensity_arr[-1] if exercise_type == 'Timed Exercise' else None
-        })
-
     return {
-        "age": age,
-        "level": level,
-        "split": split_raw,
-        "workout_number": int(workout_number or 0),
-        "user_goals": user_goals,
-        "pain_points": pain_points,
-        "equipment_names": none_free_weight_equipment,
-        "available_weights": available_weights,
-        "records": user_records
+        "age": ctx.age,
+        "level": ctx.level,
+        "split": ctx.split,
+        "workout_number": ctx.workout_number,
+        "user_goals": ctx.user_goals,
+        "pain_points": ctx.pain_points,
+        "equipment_names": ctx.equipment_names,
+        "available_weights": ctx.available_weights,
+        "records": ctx.records
     }
 
 
@@ -1196,15 +802,18 @@ def adjust_and_replace(user_id: int, actual_workout_id: int, old_exercise_id: in
         time = [0] * 4
 
         # update that one row in place
-        db.execute(
-            """
-            UPDATE actual_exercise_records
-            SET exercise_id = %s, intensity = %s, reps = %s, sets = %s, time =
-            %s, exercise_type = %s
-            WHERE actual_record_id = %s
-            """,
-            (new_ex_id, intensity, reps, sets, time, si.get("exercise_type"), actual_record_id)
-        )
+        with db.transaction() as tx:
+            tx.execute(
+                """
+                UPDATE actual_exercise_records
+                SET exercise_id = %s, intensity = %s, reps = %s, sets = %s, time =
+                %s, exercise_type = %s
+                WHERE actual_record_id = %s
+                """,
+                (new_ex_id, intensity, reps, sets, time, si.get("exercise_type"), actual_record_id)
+            )
+            refresh_exercise_history(tx, user_id, [old_exercise_id])
+            refresh_workout_completion(tx, actual_workout_id)
 
         return jsonify({
             "success": True,
@@ -1309,15 +918,18 @@ def replace_with_variation(user_id: int, actual_workout_id: int, old_exercise_id
         time = [0] * 4
 
         # update the row
-        db.execute(
-            """
-            UPDATE actual_exercise_records
-            SET exercise_id = %s, intensity = %s, reps = %s, sets = %s, time =
-            %s, exercise_type = %s
-            WHERE actual_record_id = %s
-            """,
-            (new_ex_id, intensity, reps, sets, time, si.get("exercise_type"), actual_record_id)
-        )
+        with db.transaction() as tx:
+            tx.execute(
+                """
+                UPDATE actual_exercise_records
+                SET exercise_id = %s, intensity = %s, reps = %s, sets = %s, time =
+                %s, exercise_type = %s
+                WHERE actual_record_id = %s
+                """,
+                (new_ex_id, intensity, reps, sets, time, si.get("exercise_type"), actual_record_id)
+            )
+            refresh_exercise_history(tx, user_id, [old_exercise_id])
+            refresh_workout_completion(tx, actual_workout_id)
 
         return jsonify({
             "success": True,
@@ -1530,34 +1142,51 @@ def delete_actual_exercise(actual_workout_id: int, exercise_id: int):
                 "error": "Exercise not found for this actual workout"
             }), 404
 
-        # Delete the exercise row(s)
-        db.execute(
-            """
-            DELETE FROM actual_exercise_records
-            WHERE actual_workout_id = %s AND exercise_id = %s
-            """,
-            (actual_workout_id, exercise_id)
-        )
+        # Delete, resequence and refresh the summaries as one unit
+        with db.transaction() as tx:
+            # Delete the exercise row(s)
+            tx.execute(
+                """
+                DELETE FROM actual_exercise_records
+                WHERE actual_workout_id = %s AND exercise_id = %s
+                """,
+                (actual_workout_id, exercise_id)
+            )
 
-        # Resequence order_index to keep neighbors logic consistent
-        # Make order_index dense starting at 0 in the original ordering.
-        db.execute(
-            """
-            WITH reseq AS (
-                SELECT
-                    actual_record_id,
-                    ROW_NUMBER() OVER (ORDER BY order_index ASC, actual_record_id ASC) - 1 AS new_idx
-                FROM actual_exercise_records
-                WHERE actual_workout_id = %s
+            # Completed sets may have gone with it
+            owner = tx.execute(
+                """
+                SELECT w.user_id
+                FROM actual_workout aw
+                JOIN workouts w ON w.workout_id = aw.workout_id
+                WHERE aw.actual_workout_id = %s
+                """,
+                (actual_workout_id,),
+                fetch=True
+            )
+            if owner:
+                refresh_exercise_history(tx, owner[0][0], [exercise_id])
+            refresh_workout_completion(tx, actual_workout_id)
+
+            # Resequence order_index to keep neighbors logic consistent
+            # Make order_index dense starting at 0 in the original ordering.
+            tx.execute(
+                """
+                WITH reseq AS (
+                    SELECT
+                        actual_record_id,
+                        ROW_NUMBER() OVER (ORDER BY order_index ASC, actual_record_id ASC) - 1 AS new_idx
+                    FROM actual_exercise_records
+                    WHERE actual_workout_id = %s
+                )
+                UPDATE actual_exercise_records aer
+                SET order_index = r.new_idx
+                FROM reseq r
+                WHERE aer.actual_record_id = r.actual_record_id
+                  AND aer.actual_workout_id = %s
+                """,
+                (actual_workout_id, actual_workout_id)
             )
-            UPDATE actual_exercise_records aer
-            SET order_index = r.new_idx
-            FROM reseq r
-            WHERE aer.actual_record_id = r.actual_record_id
-              AND aer.actual_workout_id = %s
-            """,
-            (actual_workout_id, actual_workout_id)
-        )
 
         # Report how many were removed (re-check count difference)
         remaining = db.execute(
@@ -1620,6 +1249,7 @@ def get_exercise_with_neighbors_by_workout(workout_id, exercise_id):
             SELECT
                 aer.exercise_id,
                 aer.intensity,
+                aer.load_numeric,
                 aer.reps,
                 aer.sets,
                 aer.time,
@@ -1652,15 +1282,19 @@ def get_exercise_with_neighbors_by_workout(workout_id, exercise_id):
 
         for idx, row in enumerate(records):
             (
-                eid, intensity, reps, sets, time, exercise_type, order_index,
+                eid, intensity, load, reps, sets, time, exercise_type, order_index,
                 name, video_link, instructions, equipment_type, loading_type,
                 main_muscles, secondary_muscles
             ) = row
 
             if exercise_type == 'Gym Equipment':
-                intensity = [round(float(w), 1) for w in intensity]
+                intensity = [round(w, 1) if w is not None else None for w in load]
             elif exercise_type == 'Timed Exercise':
-                intensity = [int(i.split(' ')[0]) for i in intensity]
+                # Plain numbers come parsed; older rows may carry a unit ("30 sec")
+                intensity = [
+                    int(w) if w is not None else int(i.split(' ')[0])
+                    for w, i in zip(load, intensity)
+                ]
             elif exercise_type == 'Resistance Band' or exercise_type == 'Bodyweight':
                 intensity = intensity
             else: 
@@ -1749,9 +1383,14 @@ def update_exercise_sets(workout_id, exercise_id):
                 "success": False
             }), 400
 
-        # Get actual_workout_id
+        # Get actual_workout_id (+ owner, for the history summary)
         result = db.execute(
-            "SELECT actual_workout_id FROM actual_workout WHERE workout_id = %s;",
+            """
+            SELECT aw.actual_workout_id, w.user_id
+            FROM actual_workout aw
+            JOIN workouts w ON w.workout_id = aw.workout_id
+            WHERE aw.workout_id = %s;
+            """,
             (workout_id,),
             fetch=True
         )
@@ -1759,7 +1398,7 @@ def update_exercise_sets(workout_id, exercise_id):
         if not result:
             return jsonify({"error": "Workout not found", "success": False}), 404
 
-        actual_workout_id = result[0][0]
+        actual_workout_id, owner_id = result[0]
 
         # Update the record
         update_query = """
@@ -1773,14 +1412,18 @@ def update_exercise_sets(workout_id, exercise_id):
                 actual_workout_id = %s AND exercise_id = %s;
         """
 
-        db.execute(update_query, (
-            sets,
-            reps,
-            intensity,
-            time,
-            actual_workout_id,
-            exercise_id
-        ))
+        # The sets and the summaries built from them are saved together
+        with db.transaction() as tx:
+            tx.execute(update_query, (
+                sets,
+                reps,
+                intensity,
+                time,
+                actual_workout_id,
+                exercise_id
+            ))
+            refresh_exercise_history(tx, owner_id, [exercise_id])
+            refresh_workout_completion(tx, actual_workout_id)
 
         return jsonify({
             "message": "Exercise sets updated successfully",
@@ -2035,18 +1678,13 @@ def exercise_database_filter():
         params = []
 
         # MUSCLES: case-insensitive on main OR secondary
+        # (lower_text_array + && so the GIN indexes from database/migrations.py apply)
         if mg_lower:
             where.append("""
                 (
-                  EXISTS (
-                    SELECT 1 FROM UNNEST(COALESCE(e.main_muscles, '{}')) m
-                    WHERE LOWER(m) = ANY(%s)
-                  )
+                  lower_text_array(e.main_muscles) && %s::TEXT[]
                   OR
-                  EXISTS (
-                    SELECT 1 FROM UNNEST(COALESCE(e.secondary_muscles, '{}')) s
-                    WHERE LOWER(s) = ANY(%s)
-                  )
+                  lower_text_array(e.secondary_muscles) && %s::TEXT[]
                 )
             """)
             params.extend([mg_lower, mg_lower])
@@ -2070,12 +1708,7 @@ def exercise_database_filter():
 
         # LEVEL: case-insensitive overlap
         if lvl_lower:
-            where.append("""
-                EXISTS (
-                  SELECT 1 FROM UNNEST(COALESCE(e.level, '{}')) lv
-                  WHERE LOWER(lv) = ANY(%s)
-                )
-            """)
+            where.append("lower_text_array(e.level) && %s::TEXT[]")
             params.append(lvl_lower)
 
         # DIFFICULTY / EQUIPMENT_TYPE / RISK_LEVEL: numeric arrays
@@ -2202,15 +1835,7 @@ def get_exercise_preference(user_id, exercise_id):
     Fetch the user's preference for a specific exercise.
     """
     try:
-        result = db.execute(
-            """
-            SELECT preference
-            FROM exercise_preferences
-            WHERE user_id = %s AND exercise_id = %s;
-            """,
-            (user_id, exercise_id),
-            fetch=True
-        )
+        result = db.execute_prepared(EXERCISE_PREFERENCE, (user_id, exercise_id), fetch=True)
 
         if not result:
             return jsonify({"preference": None, "success": True}), 200
@@ -2248,15 +1873,8 @@ def set_exercise_preference(user_id, exercise_id):
                 "success": False
             }), 400
 
-        db.execute(
-            """
-            INSERT INTO exercise_preferences (user_id, exercise_id, preference)
-            VALUES (%s, %s, %s)
-            ON CONFLICT (user_id, exercise_id)
-            DO UPDATE SET preference = EXCLUDED.preference;
-            """,
-            (user_id, exercise_id, preference)
-        )
+        db.execute_prepared(UPSERT_EXERCISE_PREFERENCE, (user_id, exercise_id, preference))
+        training_context_cache.invalidate_user(user_id)
 
         return jsonify({
             "message": "Preference saved successfully",
@@ -0,0 +1,276 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from flask import g, has_request_context
+from database.prepared import register_statement
+from .route_helpers import compute_age, resolve_venue_equipment
+
+
+# ---------------------------------------------------------------------
+# Training context loader
+#
+# Notes:
+# - Everything the generators need about a user (profile, current venue,
+#   venue equipment, exercise preferences, history) comes back from ONE
+#   query. History is read from the bounded user_exercise_history summary
+#   (see history.py), not from the raw records.
+# - Loaded contexts are memoized for the current request (flask.g) and for
+#   TRAINING_CONTEXT_TTL seconds per user (at most
+#   TRAINING_CONTEXT_MAX_ENTRIES users per worker, LRU), so a burst of
+#   add / replace / adjust calls reuses them. Writes that change a context call
+#   training_context_cache.invalidate_user / invalidate_venue.
+# - generate_workout always loads fresh (max_age=0) and primes the cache.
+# ---------------------------------------------------------------------
+
+TRAINING_CONTEXT_TTL = float(os.getenv("TRAINING_CONTEXT_TTL", "15"))
+TRAINING_CONTEXT_MAX_ENTRIES = int(os.getenv("TRAINING_CONTEXT_MAX_ENTRIES", "256"))
+
+TRAINING_CONTEXT_QUERY = register_statement("training_context", """
+    WITH u AS (
+        SELECT user_id, birthday, level, workout_number, current_venue_id
+        FROM Users
+        WHERE user_id = %s
+    )
+    SELECT
+        u.birthday,
+        u.level,
+        u.workout_number,
+        u.current_venue_id,
+        v.equipment_version,
+        v.days_of_week,
+        v.workout_frequency,
+        v.time_per_workout,
+        v.goals,
+        v.pain_points,
+        v.priority_muscles,
+        v.split,
+        v.rest_time_between_set,
+        (
+            SELECT COALESCE(json_agg(json_build_array(
+                       e.equipment_id, e.name, ve.quantity, e.weight_resistance_time
+                   ) ORDER BY e.name), '[]'::json)
+            FROM Venue_equipment ve
+            JOIN equipment e ON e.equipment_id = ve.equipment_id
+            WHERE ve.venue_id = u.current_venue_id AND COALESCE(ve.quantity, 0) > 0
+        ) AS equipment,
+        (
+            SELECT COALESCE(json_agg(json_build_array(e.name, ep.preference)), '[]'::json)
+            FROM exercise_preferences ep
+            JOIN Exercises e ON e.exercise_id = ep.exercise_id
+            WHERE ep.user_id = u.user_id
+        ) AS preferences,
+        (
+            SELECT COALESCE(json_agg(json_build_array(
+                       e.name, NULLIF(h.phase, ''), h.recent
+                   )), '[]'::json)
+            FROM user_exercise_history h
+            JOIN Exercises e ON e.exercise_id = h.exercise_id
+            WHERE h.user_id = u.user_id
+        ) AS history
+    FROM u
+    LEFT JOIN Venues v ON v.venue_id = u.current_venue_id
+""")
+
+
+@dataclass
+class TrainingContext:
+    """
+    Normalized user/venue/equipment/history inputs for workout generation
+    and intensity suggestions. Shared between requests: read-only.
+    """
+    user_id: int
+    age: int
+    level: str
+    workout_number: int
+    split: str | None
+    user_goals: list
+    pain_points: list
+    priority_muscles: list
+    days_of_week: list
+    workout_frequency: int | None
+    time_per_workout: int
+    rest_time_between_set: int | None
+    venue_id: int | None
+    equipment_version: int | None
+    venue_equipment: dict
+    user_favorites: set = field(default_factory=set)
+    suggest_less: set = field(default_factory=set)
+    dont_show_again: set = field(default_factory=set)
+    records: dict = field(default_factory=dict)
+    loaded_at: float = 0.0
+
+    @property
+    def equipment_names(self):
+        return self.venue_equipment["equipment"]
+
+    @property
+    def available_weights(self):
+        return self.venue_equipment["available_weights"]
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _performance_order(perf):
+    # Same order as the workouts themselves: date, then workout, then slot.
+    return (perf.get("date") is None, perf.get("date") or "",
+            perf.get("actual_workout_id") or 0, perf.get("order_index") or 0)
+
+
+def _build_user_records(user_id, history):
+    """
+    Shape user_exercise_history rows like the algorithms expect:
+    {str(user_id): {"by_exercise": {name: [{"phase", "weight", "reps", "time"}, ...]}}}
+
+    Each exercise list merges the recent performances of every phase,
+    oldest first.
+    """
+    performances = {}
+    for (ex_name, phase, recent) in history:
+        performances.setdefault(ex_name, []).extend((phase, perf) for perf in recent or [])
+
+    by_exercise = {}
+    for ex_name, perfs in performances.items():
+        perfs.sort(key=lambda item: _performance_order(item[1]))
+        for phase, perf in perfs:
+            intensity_arr = perf.get("intensity") or []
+            exercise_type = perf.get("exercise_type")
+            last = intensity_arr[-1] if intensity_arr else None
+            if exercise_type == "Gym Equipment":
+                exercise_intensity = _to_float(last)
+            elif exercise_type == "Resistance Band":
+                exercise_intensity = last
+            else:
+                exercise_intensity = None
+
+            by_exercise.setdefault(ex_name, []).append({
+                "phase": phase,
+                "weight": exercise_intensity,
+                "reps": perf.get("reps"),
+                "time": last if exercise_type == "Timed Exercise" else None,
+            })
+    return {str(user_id): {"by_exercise": by_exercise}}
+
+
+def _fetch_training_context(db, user_id):
+    rows = db.execute_prepared(TRAINING_CONTEXT_QUERY, (user_id,), fetch=True)
+    if not rows:
+        return None
+
+    (birthday, user_level, workout_number, venue_id, equipment_version,
+     days_of_week, workout_frequency, time_per_workout, goals, pains,
+     priority_muscles, split, rest_time_between_set,
+     equipment_rows, pref_rows, history) = rows[0]
+
+    user_favorites, suggest_less, dont_show_again = set(), set(), set()
+    for (exercise_name, pref_val) in pref_rows or []:
+        if pref_val == 3: user_favorites.add(exercise_name)
+        elif pref_val == 2: suggest_less.add(exercise_name)
+        elif pref_val == 1: dont_show_again.add(exercise_name)
+
+    return TrainingContext(
+        user_id=user_id,
+        age=compute_age(birthday),
+        level=str(user_level if user_level is not None else "1"),
+        workout_number=int(workout_number or 0),
+        split=split,
+        user_goals=list(goals or []),
+        pain_points=[p.split(" ")[0] for p in (pains or [])],
+        priority_muscles=list(priority_muscles or []),
+        days_of_week=list(days_of_week or []),
+        workout_frequency=workout_frequency,
+        time_per_workout=int(time_per_workout or 120),
+        rest_time_between_set=rest_time_between_set,
+        venue_id=venue_id,
+        equipment_version=equipment_version,
+        venue_equipment=resolve_venue_equipment(
+            db, venue_id, equipment_version, equip_rows=equipment_rows or []
+        ),
+        user_favorites=user_favorites,
+        suggest_less=suggest_less,
+        dont_show_again=dont_show_again,
+        records=_build_user_records(user_id, history or []),
+        loaded_at=time.monotonic(),
+    )
+
+
+class TrainingContextCache:
+    """
+    Short-TTL, per-process LRU of TrainingContext keyed by user_id.
+
+    Bounded to max_entries; entries older than ttl are dropped when read.
+    """
+
+    def __init__(self, max_entries=TRAINING_CONTEXT_MAX_ENTRIES, ttl=TRAINING_CONTEXT_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id, max_age):
+        with self._lock:
+            ctx = self._entries.get(user_id)
+            if ctx is None:
+                return None
+            age = time.monotonic() - ctx.loaded_at
+            if age > self.ttl:
+                del self._entries[user_id]
+                return None
+            if age > max_age:
+                return None
+            self._entries.move_to_end(user_id)
+            return ctx
+
+    def put(self, ctx):
+        with self._lock:
+            self._entries[ctx.user_id] = ctx
+            self._entries.move_to_end(ctx.user_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate_user(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def invalidate_venue(self, venue_id):
+        with self._lock:
+            for user_id in [u for u, c in self._entries.items() if c.venue_id == venue_id]:
+                del self._entries[user_id]
+
+
+training_context_cache = TrainingContextCache()
+
+
+def load_training_context(db, user_id, max_age=TRAINING_CONTEXT_TTL):
+    """
+    Return the TrainingContext for a user, or None if the user doesn't exist.
+
+    Parameters:
+    - max_age (float): accept a cached context up to this many seconds old;
+      0 forces a reload (the fresh context still replaces the cached one).
+    """
+    memo = g.setdefault("training_contexts", {}) if has_request_context() else {}
+    ctx = memo.get(user_id)
+    if ctx is not None:
+        return ctx
+
+    if max_age > 0:
+        ctx = training_context_cache.get(user_id, max_age)
+    if ctx is None:
+        ctx = _fetch_training_context(db, user_id)
+        if ctx is None:
+            return None
+        training_context_cache.put(ctx)
+
+    memo[user_id] = ctx
+    return ctx
@@ -1,12 +1,19 @@
+import os
+import copy
+import json
 import math
-import random
+import hashlib
+import secrets
+import threading
+import numpy as np
 import pandas as pd
-from pathlib import Path
+from types import MappingProxyType
+from functools import lru_cache
+from collections import OrderedDict
 from itertools import combinations
 from .temp import gym_equipment
-
-# Path to exercises.json in the same folder as this file
-EXERCISES_PATH = Path(__file__).resolve().parent / "exercises.json"
+from .catalog import get_catalog, register_muscle_vocabulary
+from .catalog_index import CodedListColumn
 
 
 # ---------------------------------------------------------------------
@@ -115,11 +122,29 @@ def valid_four_day_upper_lower_days(days_of_week):
 
 # ---------------------------------------------------------------------
 # Split recommendation
+#
+# Notes:
+# - compute_split_recommendation() holds the rules; recommend_split()
+#   answers from SPLIT_RECOMMENDATIONS, compiled at import by running
+#   the rules once per distinct input class:
+#     * the schedule class of the days: each of the 128 day-of-week
+#       subsets (days as a sorted list of 1-7) maps to which of the
+#       valid_*_days checks it passes (SCHEDULE_CLASSES),
+#     * frequency 1-5, and 6 for anything >= 6,
+#     * level < 1 / 1 / >= 2, time <= 30 / <= 45 / > 45,
+#     * whether the goals include a strength / a hypertrophy goal.
+# - Inputs outside those classes (unsorted or repeated days, a non-int
+#   frequency, ...) go straight to the rules, so answers never change.
 # ---------------------------------------------------------------------
-def recommend_split (days_of_week, workout_frequency, time_per_workout, level, goals):
+
+STRENGTH_GOALS = ('Powerlifting', 'Get stronger')
+HYPERTROPHY_GOALS = ('Bodybuilding', "Build muscles", "Get lean")
+
+
+def compute_split_recommendation(days_of_week, workout_frequency, time_per_workout, level, goals):
     """
     Recommend a workout split based on schedule, frequency, time,
-    experience level, and goals.
+    experience level, and goals (uncached; see recommend_split).
 
     Parameters:
     - days_of_week (list[int])
@@ -155,7 +180,7 @@ def recommend_split (days_of_week, workout_frequency, time_per_workout, level, g
   
     if workout_frequency == 4:
         valid = valid_four_day_upper_lower_days(days_of_week)
-        if any(goal in ['Powerlifting', 'Get stronger'] for goal in goals) and any(goal in ['Bodybuilding', "Build muscles", "Get lean"] for goal in goals) and valid:
+        if any(goal in STRENGTH_GOALS for goal in goals) and any(goal in HYPERTROPHY_GOALS for goal in goals) and valid:
             return 'Power Hypertrophy Upper Lower'
         if valid:
             return 'Upper-Lower'
@@ -163,9 +188,9 @@ def recommend_split (days_of_week, workout_frequency, time_per_workout, level, g
             return 'Push-Pull-Legs'
         
     if workout_frequency == 5: 
-        if time_per_workout <= 45 and not any(goal in ['Powerlifting', 'Get stronger'] for goal in goals):
+        if time_per_workout <= 45 and not any(goal in STRENGTH_GOALS for goal in goals):
             return 'Body part split'
-        if not any(goal in ['Powerlifting', 'Get stronger'] for goal in goals):
+        if not any(goal in STRENGTH_GOALS for goal in goals):
             return 'Hybrid PPL + Upper-Lower'
         else:
             return 'Push-Pull-Legs'
@@ -176,6 +201,98 @@ def recommend_split (days_of_week, workout_frequency, time_per_workout, level, g
         return 'Push-Pull-Legs'
 
 
+def _days_mask(days_of_week):
+    """
+    Bitmask of a strictly increasing list of days 1-7, else None.
+    """
+    mask, previous = 0, 0
+    for day in days_of_week:
+        if type(day) is not int or not previous < day <= 7:
+            return None
+        mask |= 1 << (day - 1)
+        previous = day
+    return mask
+
+
+def _split_key(days_of_week, workout_frequency, time_per_workout, level, goals):
+    """
+    SPLIT_RECOMMENDATIONS key for these inputs, or None if they fall
+    outside the tabulated classes.
+    """
+    if not isinstance(days_of_week, (list, tuple)) or not isinstance(goals, (list, tuple)):
+        return None
+    if type(workout_frequency) is not int or workout_frequency < 1:
+        return None
+    if type(time_per_workout) not in (int, float) or time_per_workout != time_per_workout:
+        return None
+    mask = _days_mask(days_of_week)
+    if mask is None:
+        return None
+
+    return (
+        SCHEDULE_CLASSES[mask],
+        min(workout_frequency, 6),
+        0 if level < 1 else 1 if level < 2 else 2,
+        0 if time_per_workout <= 30 else 1 if time_per_workout <= 45 else 2,
+        any(goal in STRENGTH_GOALS for goal in goals),
+        any(goal in HYPERTROPHY_GOALS for goal in goals),
+    )
+
+
+def _schedule_class(days):
+    return (
+        bool(valid_two_day_fullbody_days(days, 3)),
+        bool(valid_two_day_fullbody_days(days, 2)),
+        bool(valid_three_day_upper_lower_days(days)),
+        bool(valid_three_day_fullbody_days(days)),
+        bool(valid_four_day_upper_lower_days(days)),
+    )
+
+
+# Day mask (bit d - 1 set for day d) -> schedule class
+SCHEDULE_CLASSES = tuple(
+    _schedule_class([d for d in range(1, 8) if mask & (1 << (d - 1))])
+    for mask in range(128)
+)
+
+
+def _compile_split_recommendations():
+    # The rules only see the days through the valid_*_days checks, so
+    # one representative schedule per class is enough.
+    representatives = {}
+    for mask, schedule in enumerate(SCHEDULE_CLASSES):
+        representatives.setdefault(schedule, [d for d in range(1, 8) if mask & (1 << (d - 1))])
+
+    table = {}
+    for schedule, days in representatives.items():
+        for frequency in range(1, 7):
+            for level_class, level in enumerate((0, 1, 2)):
+                for time_class, minutes in enumerate((30, 45, 60)):
+                    for strength in (False, True):
+                        for hypertrophy in (False, True):
+                            goals = [STRENGTH_GOALS[1]] * strength + [HYPERTROPHY_GOALS[1]] * hypertrophy
+                            table[(schedule, frequency, level_class, time_class, strength, hypertrophy)] = \
+                                compute_split_recommendation(days, frequency, minutes, level, goals)
+    return MappingProxyType(table)
+
+
+SPLIT_RECOMMENDATIONS = _compile_split_recommendations()
+
+
+def recommend_split(days_of_week, workout_frequency, time_per_workout, level, goals):
+    """
+    Recommend a workout split (same answers as compute_split_recommendation,
+    looked up in SPLIT_RECOMMENDATIONS).
+
+    Returns:
+    - str: Name of the recommended split.
+    """
+    key = _split_key(days_of_week, workout_frequency, time_per_workout, int(level), goals)
+    if key is None:
+        return compute_split_recommendation(days_of_week, workout_frequency, time_per_workout, level, goals)
+    return SPLIT_RECOMMENDATIONS[key]
+
+
 goal_to_modality_further_simplified = {
     "Get stronger": ['H'],
     "Bodybuilding": ['H'],
@@ -367,11 +484,35 @@ split_dictionary_complex = {
     }
 }
 
+# Every muscle a split can target, in first-seen order; these get the
+# first codes of the catalog's muscle vocabulary.
+SPLIT_MUSCLES = list(dict.fromkeys(
+    muscle
+    for split in split_dictionary_complex.values()
+    for group in split["groups"]
+    for muscle in group
+))
+register_muscle_vocabulary(SPLIT_MUSCLES)
+
+# Number of split days (muscle groups) per split.
+SPLIT_GROUP_COUNTS = MappingProxyType({
+    name: len(split["groups"]) for name, split in split_dictionary_complex.items()
+})
+
 
 # ---------------------------------------------------------------------
 # Phase and group selection
 # ---------------------------------------------------------------------
 
+@lru_cache(maxsize=256)
+def _phase_cycle(user_goals):
+    """
+    Training phases the goals rotate through, in goal order, deduplicated
+    (a set's order would vary between processes).
+    """
+    return tuple(dict.fromkeys(goal_to_training_phase[g] for g in user_goals))
+
+
 def get_training_phase_and_group_for_day(user_goals, user_split, current_day):
     """
     Determine the training phase and split-group index for a session.
@@ -384,9 +525,9 @@ def get_training_phase_and_group_for_day(user_goals, user_split, current_day):
     Returns:
     - tuple[str, int]: (training_phase, split_muscle_group_index)
     """
-    unique_phases = list({goal_to_training_phase[g] for g in user_goals})
+    unique_phases = _phase_cycle(tuple(user_goals))
 
-    split_length = len(split_dictionary_complex[user_split]["groups"])
+    split_length = SPLIT_GROUP_COUNTS[user_split]
     # print(split_length)
 
     # Index of current split day (0: push, 1: pull, etc.).
@@ -405,7 +546,8 @@ def get_training_phase_and_group_for_day(user_goals, user_split, current_day):
 # Dataset filtering and utility helpers
 # ---------------------------------------------------------------------
 
-def filter_data(df, user_level, user_equipment, training_modalities, age, pain_points):
+def filter_data(df, user_level, user_equipment, training_modalities, age, pain_points,
+                index=None, equipment_mask=None):
     """
     Filter exercises by level, equipment, training modalities, pains, age.
 
@@ -416,10 +558,27 @@ def filter_data(df, user_level, user_equipment, training_modalities, age, pain_p
     - training_modalities (list[str])
     - pain_points (list[str])
     - age (int)
+    - index (CatalogIndex, optional): prebuilt bitsets for the catalog `df`
+      was taken from. When given, filtering is a handful of mask ANDs.
+    - equipment_mask (np.ndarray, optional): precomputed
+      index.equipment_mask(user_equipment), e.g. from the venue cache.
 
     Returns:
     - pd.DataFrame: Filtered dataset.
     """
+    if index is not None:
+        if equipment_mask is None:
+            equipment_mask = index.equipment_mask(user_equipment)
+        mask = (
+            index.level_mask(user_level)
+            & equipment_mask
+            & index.any_of(index.purpose, training_modalities)
+            & ~index.any_of(index.pain, pain_points)
+        )
+        if age > 50:
+            mask &= index.risk_level <= 2
+        return df[mask[index.positions(df)]]
+
     user_equipment_set = set(user_equipment)
 
     # print(df[
@@ -468,17 +627,22 @@ def get_reps_and_rest_time(training_phase):
     return phase_to_reps_and_time.get(training_phase)
 
 
-def filter_muscles(df, muscles):
+def filter_muscles(df, muscles, index=None):
     """
     Filter exercises to those that train at least one target muscle.
 
     Parameters:
     - df (pd.DataFrame)
     - muscles (list[str])
+    - index (CatalogIndex, optional): see filter_data.
 
     Returns:
     - pd.DataFrame
     """
+    if index is not None:
+        mask = index.any_of(index.muscle, muscles)
+        return df[mask[index.positions(df)]]
+
     # print(df)
     filtered_df = df[
         df['main_muscles'].apply(
@@ -491,19 +655,23 @@ def filter_muscles(df, muscles):
 
 
 def generate_biased_distribution_chatgpt(ranges, priority_muscles, muscles,
-                                         bias_factor=0.1, round_digits=2):
+                                         bias_factor=0.1, round_digits=2, rng=None):
     """
     Sample a distribution within per-muscle ranges, bias priority muscles,
     clamp to [min, max], then renormalize to sum to 1 (no negatives).
+
+    rng (np.random.Generator, optional) drives the sampling; a fresh,
+    unseeded one is used when omitted.
     """
     assert len(ranges) == len(muscles), "ranges and muscles length mismatch"
+    rng = rng if rng is not None else np.random.default_rng()
 
     # 1) Sample raw values within each (min, max).
     raw = []
     for (lo, hi) in ranges:
         lo = max(0.0, lo)
         hi = max(lo, hi)
-        raw.append(random.uniform(lo, hi))
+        raw.append(float(rng.uniform(lo, hi)))
 
     # 2) Apply multiplicative bias to priority muscles.
     biased = []
@@ -578,13 +746,72 @@ def calculate_exercises_per_muscle(total_exercises, muscle_groups,
 
 
 # ---------------------------------------------------------------------
-# Exercise selection with user preferences (not yet wired)
+# Exercise selection with user preferences
+#
+# Notes:
+# - All muscles are sampled in one pass over a (muscle x exercise)
+#   incidence matrix: every candidate gets the key log(weight) + Gumbel
+#   noise and each muscle keeps its top-n keys (Gumbel-top-k). That is
+#   the same distribution as drawing n times without replacement with
+#   probability proportional to weight (DataFrame.sample(weights=...)),
+#   and the top-n come out in draw order.
+# - Weights: favorites 2, suggest-less 0.25 (wins over favorite),
+#   everything else 1; dont-show-again rows are never candidates.
+# - Muscles are sampled independently, so one exercise may be picked
+#   for two muscles (as before).
 # ---------------------------------------------------------------------
 
+FAVORITE_WEIGHT = 2
+SUGGEST_LESS_WEIGHT = 0.25
+
+# Order of the selected exercises within a muscle: Compound, Isolation,
+# then anything else; ties by equipment_type (asc), difficulty (desc).
+EXERCISE_TYPE_ORDER = ["Compound", "Isolation"]
+
+
+def _muscle_incidence(filtered_df, muscles, index=None):
+    """
+    Bool matrix (len(muscles) x len(filtered_df)): row i marks the
+    exercises whose main_muscles contain muscles[i].
+    """
+    if index is not None:
+        column, positions = index.muscle, index.positions(filtered_df)
+    else:
+        column = CodedListColumn.from_lists(filtered_df["main_muscles"], len(filtered_df))
+        positions = np.arange(len(filtered_df))
+
+    incidence = np.zeros((len(muscles), len(filtered_df)), dtype=bool)
+    for i, muscle in enumerate(muscles):
+        hit = column.get(muscle)
+        if hit is not None:
+            incidence[i] = hit[positions]
+    return incidence
+
+
+def _sort_keys(filtered_df):
+    """
+    np.lexsort keys (least significant first) for EXERCISE_TYPE_ORDER;
+    missing values sort last, as with DataFrame.sort_values.
+    """
+    rank = {t: i for i, t in enumerate(EXERCISE_TYPE_ORDER)}
+    type_rank = np.fromiter(
+        (rank.get(t, len(rank)) if isinstance(t, str) else len(rank) for t in filtered_df["type"]),
+        dtype=np.int64, count=len(filtered_df)
+    )
+    equipment_type = pd.to_numeric(filtered_df["equipment_type"], errors="coerce").to_numpy(dtype=float)
+    difficulty = pd.to_numeric(filtered_df["difficulty"], errors="coerce").to_numpy(dtype=float)
+    return (
+        np.where(np.isnan(difficulty), np.inf, -difficulty),
+        np.where(np.isnan(equipment_type), np.inf, equipment_type),
+        type_rank,
+    )
+
+
 def select_exercises_with_user_preferences(filtered_df, exercises_per_muscle,
                                            user_favorites=None,
                                            suggest_less=None,
-                                           dont_show_again=None, random_state=None):
+                                           dont_show_again=None, random_state=None,
+                                           index=None):
     """
     Select exercises per muscle group based on user preferences.
 
@@ -594,90 +821,60 @@ def select_exercises_with_user_preferences(filtered_df, exercises_per_muscle,
     - user_favorites (set[str])
     - suggest_less (set[str])
     - dont_show_again (set[str])
+    - random_state (np.random.Generator | int, optional): share one
+      Generator across calls for a reproducible workout.
+    - index (CatalogIndex, optional): when filtered_df is a subset of the
+      catalog, its muscle bitmasks replace the per-row membership test.
 
     Returns:
     - dict[str, pd.DataFrame]: Selected rows per muscle group.    
     """
-    FAVORITE_WEIGHT = 2
-    SUGGEST_LESS_WEIGHT = 0.25
+    rng = random_state if isinstance(random_state, np.random.Generator) \
+        else np.random.default_rng(random_state)
 
     user_favorites = set(user_favorites or [])
     suggest_less = set(suggest_less or [])
     dont_show_again = set(dont_show_again or [])
 
-    selected_exercises = {}
-
-    for muscle, num_exercises in exercises_per_muscle.items():
-        #Skip if the number of exercises to request is equal to zero
-        if num_exercises <= 0:
-            selected_exercises[muscle] = filtered_df.iloc[0:0]
-            continue
-
-        #First, filter exercises for the muscle group
-        muscle_exercises = filtered_df[
-            filtered_df["main_muscles"].apply(lambda x: muscle in x)
-            ].copy()
-
-        #Exclude "Don't show again" exercises
-        if len(dont_show_again) > 0:
-            muscle_exercises = muscle_exercises[
-                ~muscle_exercises["name"].isin(dont_show_again)
-            ]
-
-        #If nothing left after filtering, return empty for this muscle
-        if muscle_exercises.empty:
-            selected_exercises[muscle] = muscle_exercises
-            continue
-
-        #Assign sampling weights (OLD) TO-REMOVE
-        exercise_weights = muscle_exercises["name"].apply(
-            lambda x: FAVORITE_WEIGHT if x in user_favorites
-            else SUGGEST_LESS_WEIGHT if x in suggest_less
-            else 1
-        )
-
-        w = pd.Series(1.0, index=muscle_exercises.index)
-        if user_favorites:
-            w = w.where(~muscle_exercises["name"].isin(user_favorites), FAVORITE_WEIGHT)
-        if suggest_less:
-            w = w.where(~muscle_exercises["name"].isin(suggest_less), SUGGEST_LESS_WEIGHT)
-
-        #Ensure numberic, non-negative (WHY? IS IT NECESSARY?)
-        w = pd.to_numeric(w, errors="coerce").fillna(0).clip(lower=0)
-
-        #Cap n (number for sample) to either number of exercises needed OR number of exercises available. Whatever is smaller
-        n = min(int(num_exercises), len(muscle_exercises))
-
-        # print(muscle, "-> ", int(num_exercises), len(muscle_exercises))
-
-        # Fallback to uniform if all weights are zero
-        weights_arg = None if w.sum() <= 0 else w
-
-        # print("The muscle group:", muscle)
-        # print("Num exercises requested:", num_exercises)
-        # print("Number of available exercises:", len(muscle_exercises))
-        # print("Weights:", exercise_weights)
-        # print("Sum of weights:", sum(exercise_weights))
-
-        #Sample exercises
-        sampled = muscle_exercises.sample(
-            n=n, weights=weights_arg, replace=False, random_state=random_state
-            )
-        # print(sampled)
-        sampled = sampled.copy()
-
-        sampled["type"] = pd.Categorical(
-            sampled["type"],
-            categories=["Compound", "Isolation"],
-            ordered = True
-        )
-
-        sampled = sampled.sort_values(
-            by=["type", "equipment_type", "difficulty"],
-            ascending=[True, True, False]
-        )
-        
-        selected_exercises[muscle] = sampled
+    empty = filtered_df.iloc[0:0]
+    selected_exercises = {muscle: empty for muscle in exercises_per_muscle}
+    wanted = {m: int(n) for m, n in exercises_per_muscle.items() if n > 0}
+    if not wanted or filtered_df.empty:
+        return selected_exercises
+
+    muscles = list(wanted)
+    candidates = _muscle_incidence(filtered_df, muscles, index=index)
+
+    names = filtered_df["name"]
+    if dont_show_again:
+        candidates &= ~names.isin(dont_show_again).to_numpy()
+
+    weights = np.ones(len(filtered_df))
+    if user_favorites:
+        weights[names.isin(user_favorites).to_numpy()] = FAVORITE_WEIGHT
+    if suggest_less:
+        weights[names.isin(suggest_less).to_numpy()] = SUGGEST_LESS_WEIGHT
+
+    # Gumbel-top-k for every muscle at once; non-candidates never win.
+    keys = np.log(weights) + rng.gumbel(size=candidates.shape)
+    keys[~candidates] = -np.inf
+    draw_order = np.argsort(-keys, axis=1, kind="stable")
+
+    sort_keys = _sort_keys(filtered_df)
+    picks = []
+    for i, muscle in enumerate(muscles):
+        n = min(wanted[muscle], int(candidates[i].sum()))
+        drawn = draw_order[i, :n]
+        picks.append(drawn[np.lexsort([k[drawn] for k in sort_keys])])
+
+    chosen = filtered_df.iloc[np.concatenate(picks)].copy()
+    chosen["type"] = pd.Categorical(chosen["type"], categories=EXERCISE_TYPE_ORDER, ordered=True)
+
+    start = 0
+    for muscle, pick in zip(muscles, picks):
+        if len(pick):
+            selected_exercises[muscle] = chosen.iloc[start:start + len(pick)]
+        start += len(pick)
 
     return selected_exercises
 
@@ -1106,15 +1303,19 @@ experience_multiplier = {
 
 # Updated determine_weight function with refactoring
 
-def determine_weight(row, user_id, user_level, records, filtered_dataset, training_phase, user_available_weights, user_equipment):
-    exercise_name = row["name"]
-    min_weight = row["lower_bound"]
-    exercise_type = infer_equipment_type(min_weight)
-    exercise_equipment = row["equipment"]
+def _suggest_intensity(exercise_name, min_weight, exercise_type, equipment_info,
+                       similar_exercise, user_id, user_level, records,
+                       training_phase, user_available_weights, user_equipment):
+    """
+    Core of determine_weight / determine_weights.
 
+    Parameters:
+    - exercise_type (str): infer_equipment_type(min_weight)
+    - equipment_info (tuple[str, int] | None): find_specific_equipment(...)
+    - similar_exercise (str | None): find_similar_exercise(...)
+    """
     def get_equipment_info():
-        info = find_specific_equipment(exercise_equipment)
-        return info if info else (None, 1)
+        return equipment_info if equipment_info else (None, 1)
 
     def check_and_adjust_weight(weight, equipment_type, quantity_needed):
         skip = equipment_type == "Fixed weight bar" and any(e in user_equipment for e in ["Olympic barbell", "EZ curl bar"])
@@ -1167,9 +1368,8 @@ def determine_weight(row, user_id, user_level, records, filtered_dataset, traini
     if exercise_type == "Gym Equipment":
         equipment_type, quantity_needed = get_equipment_info()
 
-        similar = find_similar_exercise(exercise_name, records, user_id, filtered_dataset)
-        if similar:
-            similar_records = records[user_id]["by_exercise"][similar]
+        if similar_exercise:
+            similar_records = records[user_id]["by_exercise"][similar_exercise]
             # print("About to call muscle_algorithm()...")
             suggested = muscle_algorithm(similar_records, quantity_needed)
         else:
@@ -1198,6 +1398,103 @@ def determine_weight(row, user_id, user_level, records, filtered_dataset, traini
     return {"weight": min_weight, "reps": 10, "time": None, "exercise_type": exercise_type}
 
 
+def determine_weight(row, user_id, user_level, records, filtered_dataset, training_phase, user_available_weights, user_equipment):
+    exercise_name = row["name"]
+    min_weight = row["lower_bound"]
+    exercise_type = infer_equipment_type(min_weight)
+
+    similar = None
+    if exercise_type == "Gym Equipment":
+        similar = find_similar_exercise(exercise_name, records, user_id, filtered_dataset)
+
+    return _suggest_intensity(
+        exercise_name, min_weight, exercise_type,
+        find_specific_equipment(row["equipment"]), similar,
+        user_id, user_level, records, training_phase,
+        user_available_weights, user_equipment,
+    )
+
+
+def _intensity_columns(df):
+    """
+    Per-row inputs of the intensity algorithms that only depend on the
+    catalog (memoized per catalog snapshot).
+    """
+    return {
+        "exercise_type": [infer_equipment_type(v) for v in df["lower_bound"]],
+        "equipment_info": [find_specific_equipment(eq) for eq in df["equipment"]],
+    }
+
+
+def find_similar_exercises(exercise_names, records, user_id, filtered_dataset):
+    """
+    Batched find_similar_exercise: one lookup table over filtered_dataset.
+
+    Returns:
+    - dict[str, str]: exercise name -> similar exercise name (matches only).
+    """
+    if user_id not in records or "Variations" not in filtered_dataset:
+        return {}
+    by_exercise = records[user_id]["by_exercise"]
+
+    # First row per name wins, like filtered_dataset[...].iloc[0].
+    variations_by_name = {}
+    for name, variations in zip(filtered_dataset["name"], filtered_dataset["Variations"]):
+        variations_by_name.setdefault(name, variations)
+
+    similar = {}
+    for name in exercise_names:
+        variations = variations_by_name.get(name)
+        if isinstance(variations, list):
+            for variation in variations:
+                if variation in by_exercise:
+                    similar[name] = variation
+                    break
+    return similar
+
+
+def determine_weights(rows, context):
+    """
+    Suggest intensities for a whole selection at once.
+
+    Parameters:
+    - rows (pd.DataFrame): catalog rows (any subset, in output order).
+    - context (dict): the remaining determine_weight arguments:
+      user_id, user_level, records, filtered_dataset, training_phase,
+      user_available_weights, user_equipment.
+
+    Returns:
+    - list[dict]: determine_weight results, aligned with rows.
+    """
+    if rows.empty:
+        return []
+
+    catalog = get_catalog()
+    columns = catalog.derived("intensity_columns", _intensity_columns)
+    positions = catalog.index.positions(rows)
+
+    names = rows["name"].tolist()
+    min_weights = rows["lower_bound"].tolist()
+    exercise_types = [columns["exercise_type"][p] for p in positions]
+    equipment_infos = [columns["equipment_info"][p] for p in positions]
+
+    user_id, records = context["user_id"], context["records"]
+    similar = find_similar_exercises(
+        [n for n, t in zip(names, exercise_types) if t == "Gym Equipment"],
+        records, user_id, context["filtered_dataset"]
+    )
+
+    return [
+        _suggest_intensity(
+            name, min_weight, exercise_type, equipment_info, similar.get(name),
+            user_id, context["user_level"], records, context["training_phase"],
+            context["user_available_weights"], context["user_equipment"],
+        )
+        for name, min_weight, exercise_type, equipment_info
+        in zip(names, min_weights, exercise_types, equipment_infos)
+    ]
+
+
 def determine_user_exercise_weight(
     exercise_name,
     user_id,
@@ -1219,11 +1516,8 @@ def determine_user_exercise_weight(
         'suggested_intensity': <dict>     # whatever determine_weight returns
       }
     """
-    import pandas as pd
-
-    # path = r'app\workout\exercises_original.json'
-    path = r'app\workout\exercises.json'
-    df = pd.read_json(EXERCISES_PATH)
+    catalog = get_catalog()
+    df = catalog.df
 
     # Normalize inputs
     user_goals = [str(g).capitalize() for g in (user_goals or [])]
@@ -1244,18 +1538,15 @@ def determine_user_exercise_weight(
     muscle_group = split_dictionary_complex[user_split]["groups"][muscle_group_index]
 
     # Filter dataset
-    primary_filter = filter_data(df, level, equipment, modality, age, pain_points)
-    secondary_filter = filter_muscles(primary_filter, muscle_group)
+    primary_filter = filter_data(df, level, equipment, modality, age, pain_points,
+                                 index=catalog.index)
+    secondary_filter = filter_muscles(primary_filter, muscle_group, index=catalog.index)
 
     # Grab exactly one row for the requested exercise (case-insensitive), or error
-    matches = df.loc[df['name'].str.casefold() == str(exercise_name).casefold()]
-    if matches.empty:
+    exercise_row = catalog.row_by_name(exercise_name)
+    if exercise_row is None:
         raise ValueError(f"Exercise not found in dataset: {exercise_name}")
 
-    # Use a single row (Series) for downstream logic
-    exercise_row = matches.iloc[0]
-    # ---- KEY CHANGES END ----
-
     # Call your weight logic with a SINGLE row
     result = determine_weight(
         row=exercise_row,                      # <— Series, not DataFrame
@@ -1275,7 +1566,8 @@ def determine_user_exercise_weight(
 
 
 def allocate_exercises_stochastically_with_bias(
-    total_exercises, muscle_groups, probabilities, priority_muscles=None, bias_factor=0.1
+    total_exercises, muscle_groups, probabilities, priority_muscles=None, bias_factor=0.1,
+    rng=None
 ):
     """
     Allocate exercises stochastically based on probabilities, with an optional bias towards priority muscles.
@@ -1286,10 +1578,13 @@ def allocate_exercises_stochastically_with_bias(
     - probabilities (list): Probability weights for each muscle group.
     - priority_muscles (list, optional): List of priority muscles to bias towards.
     - bias_factor (float): Degree of bias to apply (0.0 - 1.0).
+    - rng (np.random.Generator, optional): source of randomness; a fresh,
+      unseeded one is used when omitted.
 
     Returns:
     - dict: Stochastic allocation of exercises per muscle group.
     """
+    rng = rng if rng is not None else np.random.default_rng()
     if len(muscle_groups) != len(probabilities):
         raise ValueError("Muscle groups and probabilities must have the same length.")
 
@@ -1314,7 +1609,7 @@ def allocate_exercises_stochastically_with_bias(
     # Allocate exercises stochastically
     exercises_per_muscle = {muscle: 0 for muscle in muscle_groups}
     for _ in range(total_exercises):
-        rand_value = random.random()  
+        rand_value = rng.random()
         for i, weight in enumerate(cumulative_weights):
             if rand_value <= weight:
                 exercises_per_muscle[muscle_groups[i]] += 1
@@ -1322,6 +1617,78 @@ def allocate_exercises_stochastically_with_bias(
 
     return exercises_per_muscle
 
+# ---------------------------------------------------------------------
+# Reproducible generation
+#
+# Notes:
+# - Every random draw in workout_generator comes from one
+#   np.random.Generator seeded per request, so identical inputs + seed
+#   give the identical workout. The seed is stored on the workout
+#   (workouts.generation_seed) to replay it later.
+# - Replays (a caller-supplied seed, replay=True) are memoized per
+#   (seed, inputs, catalog version) in a small per-process LRU of
+#   WORKOUT_MEMO_MAX_ENTRIES (0 disables it). A freshly drawn seed can't
+#   repeat, so ordinary generations skip hashing the inputs altogether.
+# ---------------------------------------------------------------------
+
+WORKOUT_MEMO_MAX_ENTRIES = int(os.getenv("WORKOUT_MEMO_MAX_ENTRIES", "256"))
+
+
+def new_generation_seed():
+    """
+    A fresh random seed that fits a Postgres BIGINT.
+    """
+    return secrets.randbits(63)
+
+
+def _json_default(value):
+    if isinstance(value, (set, frozenset)):
+        return sorted(value, key=str)
+    if isinstance(value, np.generic):
+        return value.item()
+    return str(value)
+
+
+def generation_key(seed, catalog_version, inputs):
+    """
+    Stable digest of everything a generated workout depends on.
+    """
+    payload = json.dumps([seed, catalog_version, inputs], sort_keys=True,
+                         default=_json_default, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class GeneratedWorkoutMemo:
+    """
+    Bounded LRU of workout_generator results keyed by generation_key().
+    """
+
+    def __init__(self, max_entries=WORKOUT_MEMO_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            hit = self._entries.get(key)
+            if hit is None:
+                return None
+            self._entries.move_to_end(key)
+        return copy.deepcopy(hit)
+
+    def put(self, key, result):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = copy.deepcopy(result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+generated_workout_memo = GeneratedWorkoutMemo()
+
+
 # ---------------------------------------------------------------------
 # Workout generation
 # ---------------------------------------------------------------------
@@ -1352,15 +1719,37 @@ def workout_generator(
         priority_muscles,       # List of muscles
         user_favorites,         # List of favorite exercise names chosen by user must be a type(set)
         suggest_less,           # List of exercise names chosen to suggest less to the user must be a type(set)
-        dont_show_again         # List of exercise names not to show to the user must be a type(set)
+        dont_show_again,        # List of exercise names not to show to the user must be a type(set)
+        venue_equipment=None,   # Optional resolve_venue_equipment() entry; reuses its feasibility mask
+        seed=None,              # Generation seed (see new_generation_seed); None draws a fresh one
+        replay=False            # True when `seed` replays an earlier generation (memoized)
     ):      
     """
     Generate a workout given user info, goals, schedule, and equipment.
+
+    All randomness comes from np.random.default_rng(seed): the same inputs
+    and seed always give the same workout (replays are memoized, see
+    generated_workout_memo).
     """
-    # path = r'app\workout\exercises_original.json'
-    # path = r'app\workout\exercises.json'
-    path = Path.cwd() / "app" / "workout" / "exercises.json"
-    df = pd.read_json(path)
+    catalog = get_catalog()
+    df = catalog.df
+    if seed is None:
+        seed = new_generation_seed()
+
+    memo_key = None
+    if replay and generated_workout_memo.max_entries > 0:
+        memo_key = generation_key(seed, catalog.version, [
+            user_id, age, user_workout_count, user_split, user_records, rest_time,
+            time_per_workout, level, user_goals, pain_points, equipment,
+            user_available_weights, priority_muscles, user_favorites, suggest_less,
+            dont_show_again,
+        ])
+        memoized = generated_workout_memo.get(memo_key)
+        if memoized is not None:
+            return memoized
+
+    rng = np.random.default_rng(seed)
+
     # Constants
     avg_time_per_set = 1     # minutes per set
     sets_per_exercise = 4    # sets per exercise
@@ -1394,12 +1783,16 @@ def workout_generator(
     ]
     
     # Primary filtering (level/equipment/modalities/pains/age).
-    primary_filter = filter_data(df, level, equipment, modality, age, pain_points)
+    equipment_mask = None
+    if venue_equipment and venue_equipment.get("catalog_version") == catalog.version:
+        equipment_mask = venue_equipment["equipment_mask"]
+    primary_filter = filter_data(df, level, equipment, modality, age, pain_points,
+                                 index=catalog.index, equipment_mask=equipment_mask)
     # primary_filter = filter_data(df, level, gym_equipment['Fully equipped gym']["equipment"], modality, age, pain_points)
     # print(primary_filter[primary_filter['main_muscles'].map(lambda x: "Chest" in (x or []))])
 
     # Secondary filtering: only muscles for this split-day.
-    secondary_filter = filter_muscles(primary_filter, muscle_group)
+    secondary_filter = filter_muscles(primary_filter, muscle_group, index=catalog.index)
 
     total_exercises = calculate_total_exercises(
         time_per_workout, avg_time_per_set, sets_per_exercise,
@@ -1408,37 +1801,37 @@ def workout_generator(
 
     probabilities = split_dictionary_complex[user_split]["probabilities"][muscle_group_index]
 
-    exercises_probabilistic = allocate_exercises_stochastically_with_bias(total_exercises, muscle_group, probabilities, priority_muscles)
+    exercises_probabilistic = allocate_exercises_stochastically_with_bias(total_exercises, muscle_group, probabilities, priority_muscles, rng=rng)
 
     exercises = select_exercises_with_user_preferences(
         secondary_filter, exercises_probabilistic, user_favorites,
-        suggest_less, dont_show_again
+        suggest_less, dont_show_again, random_state=rng, index=catalog.index
     )
 
-    generated_exercises = []
-
-    for muscle_group, df_sel in exercises.items():
-        for _, exercise in df_sel.iterrows():
-            result = determine_weight(
-                row=exercise,
-                user_id=user_id,
-                user_level=level,
-                records=user_records,
-                filtered_dataset=secondary_filter,
-                training_phase=training_phase,
-                user_available_weights=user_available_weights,
-                user_equipment=equipment
-            )
-
-            generated_exercises.append({
-                'exercise': exercise['name'],
-                'suggested_intensity': result
-            })
+    selected = [df_sel for df_sel in exercises.values() if not df_sel.empty]
+    selected = pd.concat(selected) if selected else df.iloc[:0]
+
+    suggestions = determine_weights(selected, {
+        "user_id": user_id,
+        "user_level": level,
+        "records": user_records,
+        "filtered_dataset": secondary_filter,
+        "training_phase": training_phase,
+        "user_available_weights": user_available_weights,
+        "user_equipment": equipment,
+    })
+
+    generated_exercises = [
+        {'exercise': name, 'suggested_intensity': result}
+        for name, result in zip(selected["name"].tolist(), suggestions)
+    ]
 
     # print(equipment)
 
     estimated_session_time = avg_time_per_set * sets_per_exercise * len(generated_exercises)
     # print(f"Suggested workout session time: {estimated_session_time}")
     # print(generated_exercises)
+    if memo_key is not None:
+        generated_workout_memo.put(memo_key, (generated_exercises, estimated_session_time))
     return generated_exercises, estimated_session_time
 
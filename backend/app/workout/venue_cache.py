@@ -0,0 +1,67 @@
+import threading
+from collections import OrderedDict
+
+
+# ---------------------------------------------------------------------
+# Per-venue equipment cache
+#
+# Notes:
+# - Entries are keyed by venue_id and validated against
+#   Venues.equipment_version (bumped by every equipment mutation, see
+#   app.venues.utils.bump_equipment_version) and the catalog version the
+#   feasibility mask was computed for.
+# - The version lives in the database, so a bump made by one worker
+#   invalidates the entries held by every other worker on their next read.
+# - Entries are shared between requests and must be treated as read-only.
+# ---------------------------------------------------------------------
+
+VENUE_CACHE_MAX_ENTRIES = 1024
+
+
+class VenueEquipmentCache:
+    """
+    Bounded LRU of resolved venue equipment.
+
+    Each entry is a dict:
+    {
+        "equipment": list[str],           # labels used by filter_data / determine_weight
+        "available_weights": dict,        # build_available_weights() output
+        "equipment_mask": np.ndarray,     # feasible catalog rows for this venue
+        "catalog_version": int,
+    }
+    """
+
+    def __init__(self, max_entries=VENUE_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, venue_id, equipment_version, catalog_version):
+        """
+        Return the cached entry, or None if missing or stale.
+        """
+        with self._lock:
+            hit = self._entries.get(venue_id)
+            if hit is None:
+                return None
+            version, entry = hit
+            if version != equipment_version or entry["catalog_version"] != catalog_version:
+                del self._entries[venue_id]
+                return None
+            self._entries.move_to_end(venue_id)
+            return entry
+
+    def put(self, venue_id, equipment_version, entry):
+        with self._lock:
+            self._entries[venue_id] = (equipment_version, entry)
+            self._entries.move_to_end(venue_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def invalidate(self, venue_id):
+        with self._lock:
+            self._entries.pop(venue_id, None)
+
+
+venue_equipment_cache = VenueEquipmentCache()
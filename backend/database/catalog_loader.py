@@ -0,0 +1,317 @@
+import io
+import sys
+import json
+from pathlib import Path
+from psycopg2.extras import execute_values
+from .store import EQUIPMENT_LIST
+
+
+# ---------------------------------------------------------------------
+# Bulk exercise catalog loader
+#
+# Notes:
+# - The dataset is streamed into a temp staging table with one COPY,
+#   then merged into Exercises keyed by LOWER(TRIM(name)):
+#     * changed rows are UPDATEd in place (exercise_id is kept, so
+#       histories, preferences and records keep pointing at them),
+#     * unchanged rows are not touched at all,
+#     * new names are INSERTed (in dataset order).
+#   Exercises that disappeared from the dataset are reported, not deleted.
+# - Everything runs in one short transaction; readers are never blocked
+#   (MVCC) and only the changed rows are locked.
+# - Refresh a live database with `python -m database.catalog_loader [path]`.
+# - Equipment from EQUIPMENT_LIST is inserted in one statement, skipping
+#   (name, weight_resistance_time) pairs that already exist.
+# ---------------------------------------------------------------------
+
+DEFAULT_DATASET_PATH = Path(__file__).resolve().parent.parent.parent / 'algorithm' / 'dataset_7.json'
+
+# (Exercises column, COPY-able kind)
+EXERCISE_COLUMNS = [
+    ("name", "text"),
+    ("main_muscles", "array"),
+    ("secondary_muscles", "array"),
+    ("animation", "text"),
+    ("written_instructions", "text"),
+    ("movement", "text"),
+    ("lower_bound", "text"),
+    ("level", "array"),
+    ("difficulty", "int"),
+    ("equipment_type", "int"),
+    ("equipment", "array"),
+    ("prerequisite_exercise", "array"),
+    ("variations", "array"),
+    ("regression", "array"),
+    ("progression", "array"),
+    ("loading_type", "int"),
+    ("risk_level", "int"),
+    ("exercise_purpose", "array"),
+    ("force_type", "array"),
+    ("pain_exclusions", "array"),
+]
+
+_COLUMN_NAMES = [c for c, _ in EXERCISE_COLUMNS]
+_COLUMN_LIST = ", ".join(_COLUMN_NAMES)
+_STAGED_COLUMN_LIST = ", ".join(f"s.{c}" for c in _COLUMN_NAMES)
+
+
+def to_list(value):
+    return value if isinstance(value, list) else [value]
+
+
+def exercise_row(exercise):
+    """
+    Map one dataset entry to Exercises column values (EXERCISE_COLUMNS
+    order), or None if it has no animation yet.
+    """
+    anim = exercise.get("Animation name")
+
+    # Skip if Animation name is None, empty string, whitespace only, or NA
+    # TODO: Once we have all videos we should remove this condition to keep
+    # all exercises.
+    if not anim or str(anim).strip() == "" or str(anim).strip().upper() == "NA":
+        return None
+
+    return [
+        exercise.get('Exercise', ''),
+        exercise.get('Main muscle(s)', []),
+        exercise.get('Secondary muscles', []),
+        anim.strip(),
+        exercise.get('Exercise Description', ''),
+        exercise.get('Movement', ''),
+        exercise.get('Lower bound (lbs/resistance/time)', 0),
+        to_list(exercise.get("Level")),
+        exercise.get('Difficulty', 0),
+        exercise.get('Equipment Type (Gym:0, Body:1, Band:2)', 0),
+        exercise.get('Equipment'),
+        exercise.get('Prerequesite Exercise', []),
+        exercise.get('Variations', []),
+        exercise.get('Regression', []),
+        exercise.get('Progression', []),
+        exercise.get('Loading type (Asymmetrical / Symmetrical)'),
+        exercise.get('Risk level', 0),
+        exercise.get('Exercise Purpose', []),
+        exercise.get('Force type (Push, Pull, Rotation, Isomatric)', []),
+        exercise.get('Pain Exclusions', [])
+    ]
+
+
+# ---------------------------------------------------------------------
+# COPY text-format encoding
+# ---------------------------------------------------------------------
+
+_COPY_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+
+
+def _array_literal(value):
+    """
+    Postgres array literal for a (possibly nested) list of scalars.
+    Nested lists must be rectangular, as Postgres requires.
+    """
+    if not value:
+        return "{}"
+    if isinstance(value[0], list):
+        widths = {len(v) if isinstance(v, list) else None for v in value}
+        if len(widths) != 1 or None in widths or 0 in widths:
+            raise ValueError("nested array is not rectangular")
+        return "{" + ",".join(_array_literal(v) for v in value) + "}"
+
+    items = []
+    for item in value:
+        if isinstance(item, list):
+            raise ValueError("nested array is not rectangular")
+        if item is None:
+            items.append("NULL")
+        else:
+            text = str(item).replace("\\", "\\\\").replace('"', '\\"')
+            items.append(f'"{text}"')
+    return "{" + ",".join(items) + "}"
+
+
+def _copy_field(value, kind):
+    if value is None:
+        return "\\N"
+    if kind == "array":
+        text = _array_literal(to_list(value))
+    elif kind == "int":
+        text = str(int(value))
+    else:
+        text = str(value)
+    return text.translate(_COPY_ESCAPES)
+
+
+def _copy_buffer(rows):
+    buf = io.StringIO()
+    for ord_, row in rows:
+        fields = [str(ord_)] + [_copy_field(v, kind) for v, (_, kind) in zip(row, EXERCISE_COLUMNS)]
+        buf.write("\t".join(fields) + "\n")
+    buf.seek(0)
+    return buf
+
+
+# ---------------------------------------------------------------------
+# Loader
+# ---------------------------------------------------------------------
+
+CREATE_STAGING = f"""
+    CREATE TEMP TABLE exercise_staging ON COMMIT DROP AS
+    SELECT 0 AS ord, {_COLUMN_LIST}
+    FROM Exercises
+    WITH NO DATA;
+"""
+
+UPDATE_CHANGED = f"""
+    UPDATE Exercises e
+    SET ({_COLUMN_LIST}) = ({_STAGED_COLUMN_LIST})
+    FROM exercise_staging s
+    WHERE LOWER(TRIM(e.name)) = LOWER(TRIM(s.name))
+      AND ({", ".join(f"e.{c}" for c in _COLUMN_NAMES)})
+          IS DISTINCT FROM ({_STAGED_COLUMN_LIST});
+"""
+
+INSERT_NEW = f"""
+    INSERT INTO Exercises ({_COLUMN_LIST})
+    SELECT {_STAGED_COLUMN_LIST}
+    FROM exercise_staging s
+    WHERE NOT EXISTS (
+        SELECT 1 FROM Exercises e
+        WHERE LOWER(TRIM(e.name)) = LOWER(TRIM(s.name))
+    )
+    ORDER BY s.ord;
+"""
+
+COUNT_MISSING = """
+    SELECT COUNT(*)
+    FROM Exercises e
+    WHERE NOT EXISTS (
+        SELECT 1 FROM exercise_staging s
+        WHERE LOWER(TRIM(s.name)) = LOWER(TRIM(e.name))
+    );
+"""
+
+INSERT_EQUIPMENT = """
+    INSERT INTO equipment (name, weight_resistance_time)
+    SELECT v.name, v.weight_resistance_time
+    FROM (VALUES %s) AS v(ord, name, weight_resistance_time)
+    WHERE NOT EXISTS (
+        SELECT 1 FROM equipment eq
+        WHERE eq.name = v.name AND eq.weight_resistance_time = v.weight_resistance_time
+    )
+    ORDER BY v.ord;
+"""
+
+
+def equipment_rows():
+    """
+    (name, weight_resistance_time) for every EQUIPMENT_LIST entry,
+    e.g. "Dumbbells_12.5" -> ("Dumbbells", "12.5").
+    """
+    rows = []
+    for equipment in EQUIPMENT_LIST:
+        attributes = equipment.split('_')
+        name = " ".join(attributes[:-1]) if len(attributes) > 1 else attributes[0]
+
+        if len(attributes) > 1:
+            val = attributes[-1]
+            if 'E' in val:
+                val = 'Extra Light'
+            elif 'X' in val:
+                val = 'Extra Heavy'
+            weight_resistance_time = val
+        else:
+            weight_resistance_time = ''
+        rows.append((name, weight_resistance_time))
+    return rows
+
+
+def load_exercise_catalog(db, json_path=DEFAULT_DATASET_PATH):
+    """
+    Sync Exercises and equipment with the dataset (see notes above).
+
+    Parameters:
+        db (Database): database helper.
+        json_path (str | Path): normalized exercise dataset (JSON list).
+
+    Returns:
+        dict: counts for staged, inserted, updated, unchanged, skipped,
+        missing_from_dataset and equipment_inserted.
+    """
+    with open(json_path, 'r') as file:
+        json_data = json.load(file)
+
+    rows, seen, skipped = [], {}, 0
+    for exercise in json_data:
+        row = exercise_row(exercise)
+        if row is None:
+            skipped += 1
+            continue
+        try:
+            for value, (_, kind) in zip(row, EXERCISE_COLUMNS):
+                if kind == "array" and value is not None:
+                    _array_literal(to_list(value))
+        except ValueError as e:
+            print(f"Failed to stage exercise: {exercise.get('Exercise', '')}")
+            print(f"Error: {e}")
+            skipped += 1
+            continue
+
+        key = str(row[0]).strip().lower()
+        if key in seen:
+            # Names are the merge key: the last entry for a name wins
+            print(f"Duplicate exercise in dataset, keeping the last one: {row[0]}")
+            rows[seen[key]] = None
+        seen[key] = len(rows)
+        rows.append(row)
+
+    staged = [(i, row) for i, row in enumerate(rows) if row is not None]
+
+    with db.transaction() as tx:
+        tx.execute(CREATE_STAGING)
+        tx.cursor.copy_expert(
+            f"COPY exercise_staging (ord, {_COLUMN_LIST}) FROM STDIN",
+            _copy_buffer(staged)
+        )
+        tx.execute("ANALYZE exercise_staging;")
+
+        tx.execute(UPDATE_CHANGED)
+        updated = tx.cursor.rowcount
+        tx.execute(INSERT_NEW)
+        inserted = tx.cursor.rowcount
+        missing = tx.execute(COUNT_MISSING, fetch=True)[0][0]
+
+        execute_values(
+            tx.cursor,
+            INSERT_EQUIPMENT,
+            [(i, name, wrt) for i, (name, wrt) in enumerate(equipment_rows())],
+            template="(%s, %s, %s)",
+            page_size=1000
+        )
+        equipment_inserted = tx.cursor.rowcount
+
+    summary = {
+        "staged": len(staged),
+        "inserted": inserted,
+        "updated": updated,
+        "unchanged": max(len(staged) - inserted - updated, 0),
+        "skipped": skipped,
+        "missing_from_dataset": missing,
+        "equipment_inserted": equipment_inserted,
+    }
+    print(f"Exercise catalog loaded: {summary}")
+    return summary
+
+
+def main(argv=None):
+    from .database import Database
+
+    argv = sys.argv[1:] if argv is None else argv
+    db = Database()
+    try:
+        load_exercise_catalog(db, argv[0] if argv else DEFAULT_DATASET_PATH)
+    finally:
+        db.close_all()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
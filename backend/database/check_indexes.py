@@ -0,0 +1,160 @@
+import sys
+import json
+from .database import Database
+
+
+# ---------------------------------------------------------------------
+# EXPLAIN check for the indexes in database/migrations.py
+#
+# Usage (from backend/, against a seeded local Postgres):
+#   python -m database.check_indexes
+#
+# Notes:
+# - Each query below mirrors one the routes run. It is EXPLAINed with
+#   enable_seqscan off (small dev tables would otherwise always seq scan),
+#   so a FAIL means the index cannot serve that predicate at all.
+# - Read-only: runs in a transaction that is rolled back.
+# ---------------------------------------------------------------------
+
+INDEX_CHECKS = [
+    (
+        "latest workout for a user",
+        "SELECT workout_id FROM workouts WHERE user_id = %s ORDER BY date DESC, workout_id DESC LIMIT 1",
+        (1,),
+        "idx_workouts_user_date",
+    ),
+    (
+        "suggested workout of a workout",
+        "SELECT suggested_workout_id FROM suggested_workouts WHERE workout_id = %s",
+        (1,),
+        "idx_suggested_workouts_workout",
+    ),
+    (
+        "actual workout of a workout",
+        "SELECT actual_workout_id FROM actual_workout WHERE workout_id = %s",
+        (1,),
+        "idx_actual_workout_workout",
+    ),
+    (
+        "actual exercise rows of a workout",
+        "SELECT exercise_id, sets FROM actual_exercise_records WHERE actual_workout_id = %s ORDER BY order_index",
+        (1,),
+        "idx_actual_records_workout_exercise",
+    ),
+    (
+        "update one actual exercise row",
+        "SELECT actual_record_id FROM actual_exercise_records WHERE actual_workout_id = %s AND exercise_id = %s",
+        (1, 1),
+        "idx_actual_records_workout_exercise",
+    ),
+    (
+        "suggested exercise rows of a workout",
+        "SELECT exercise_id FROM suggested_exercise_records WHERE suggested_workout_id = %s",
+        (1,),
+        "idx_suggested_records_workout",
+    ),
+    (
+        "equipment of a venue",
+        "SELECT equipment_id FROM Venue_equipment WHERE venue_id = %s",
+        (1,),
+        "idx_venue_equipment_venue",
+    ),
+    (
+        "venues of a user",
+        "SELECT venue_id FROM Venues WHERE user_id = %s",
+        (1,),
+        "idx_venues_user",
+    ),
+    (
+        "exercises by normalized name",
+        "SELECT exercise_id FROM Exercises WHERE LOWER(TRIM(name)) = ANY(%s)",
+        (["push up", "squat"],),
+        "idx_exercises_name_norm",
+    ),
+    (
+        "equipment by name",
+        "SELECT equipment_id FROM equipment WHERE LOWER(name) = ANY(%s)",
+        (["barbell"],),
+        "idx_equipment_name_lower",
+    ),
+    (
+        "preferences of a user",
+        "SELECT exercise_id, preference FROM exercise_preferences WHERE user_id = %s",
+        (1,),
+        "exercise_preferences_user_id_exercise_id_key",
+    ),
+    (
+        "filter: main muscles",
+        "SELECT exercise_id FROM Exercises e WHERE lower_text_array(e.main_muscles) && %s::TEXT[]",
+        (["chest"],),
+        "idx_exercises_main_muscles_gin",
+    ),
+    (
+        "filter: secondary muscles",
+        "SELECT exercise_id FROM Exercises e WHERE lower_text_array(e.secondary_muscles) && %s::TEXT[]",
+        (["chest"],),
+        "idx_exercises_secondary_muscles_gin",
+    ),
+    (
+        "filter: level",
+        "SELECT exercise_id FROM Exercises e WHERE lower_text_array(e.level) && %s::TEXT[]",
+        (["beginner"],),
+        "idx_exercises_level_gin",
+    ),
+    (
+        "stats: completed workouts",
+        "SELECT aw.actual_workout_id FROM actual_workout aw WHERE aw.workout_id = ANY(%s) AND aw.completed_sets > 0",
+        ([1, 2, 3],),
+        "idx_actual_workout_completed",
+    ),
+]
+
+
+def _index_names(plan):
+    """
+    Every "Index Name" in an EXPLAIN (FORMAT JSON) plan tree.
+    """
+    names = set()
+    if "Index Name" in plan:
+        names.add(plan["Index Name"])
+    for child in plan.get("Plans", []):
+        names |= _index_names(child)
+    return names
+
+
+def check_indexes(db):
+    """
+    EXPLAIN every query in INDEX_CHECKS.
+
+    Returns:
+        list: (label, expected_index, used_indexes, ok) per check.
+    """
+    results = []
+    with db.transaction() as tx:
+        tx.execute("SET LOCAL enable_seqscan = off")
+        for label, query, params, expected in INDEX_CHECKS:
+            rows = tx.execute("EXPLAIN (FORMAT JSON) " + query, params, fetch=True)
+            plan = rows[0][0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            used = _index_names(plan[0]["Plan"])
+            results.append((label, expected, sorted(used), expected in used))
+        tx.conn.rollback()
+    return results
+
+
+def main():
+    db = Database()
+    results = check_indexes(db)
+    failed = 0
+    for label, expected, used, ok in results:
+        if not ok:
+            failed += 1
+        print(f"{'PASS' if ok else 'FAIL'}  {label:<38} expected {expected}  (plan uses: {', '.join(used) or 'no index'})")
+    print(f"{len(results) - failed}/{len(results)} index checks passed")
+    db.close_all()
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
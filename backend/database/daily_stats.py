@@ -0,0 +1,198 @@
+import sys
+
+
+# ---------------------------------------------------------------------
+# Per-user daily training rollup (user_daily_stats)
+#
+# Notes:
+# - One row per (user, day) with at least one completed workout
+#   (actual_workout.completed_sets > 0):
+#     * volume: sum of the per-set volume the charts plot (see
+#       SET_VOLUME_SQL),
+#     * set_count: completed sets,
+#     * workout_count: completed workouts,
+#     * muscle_volume: {muscle: volume}, each set's volume split equally
+#       across the exercise's main + secondary muscles (lowercased).
+# - The /stats routes read only this table, so a chart is a range scan
+#   over the user's training days instead of a pass over every record.
+# - The day of a workout is recomputed whenever its sets can change
+#   (refresh_daily_stats, called from
+#   app.workout.completion.refresh_workout_completion).
+# - Rebuild with `python -m database.daily_stats [user_id]`.
+# ---------------------------------------------------------------------
+
+# Volume of set idx.i of actual_exercise_records ae; loads and band levels
+# come from the typed intensity columns (migration 5, database/migrations.py).
+SET_VOLUME_SQL = """
+    CASE
+        WHEN LOWER(TRIM(ae.exercise_type)) = 'gym equipment'
+        THEN COALESCE(ae.load_numeric[idx.i]::numeric, 0)
+             * COALESCE(ae.reps[idx.i], 0)
+             * COALESCE(ae.sets[idx.i], 0)
+
+        WHEN LOWER(TRIM(ae.exercise_type)) = 'resistance band'
+        THEN COALESCE(ae.load_numeric[idx.i]::numeric, ae.band_level[idx.i], 0)
+             * COALESCE(ae.reps[idx.i], 0)
+             * COALESCE(ae.sets[idx.i], 0)
+
+        WHEN LOWER(TRIM(ae.exercise_type)) = 'bodyweight'
+        THEN COALESCE(ae.reps[idx.i], 0)
+             * COALESCE(ae.sets[idx.i], 0)
+
+        WHEN LOWER(TRIM(ae.exercise_type)) = 'timed'
+        THEN COALESCE(ae.time[idx.i], 0)
+             * COALESCE(ae.sets[idx.i], 0)
+
+        ELSE 0
+    END
+"""
+
+
+def _daily_stats_ctes(scope):
+    """
+    CTEs ending in `fresh` (one row per user and day) for the completed
+    workouts matching `scope`, a predicate over workouts w.
+    """
+    return f"""
+    completed AS (
+        SELECT w.user_id, w.date AS day, w.workout_id,
+               aw.actual_workout_id, aw.completed_sets
+        FROM workouts w
+        JOIN actual_workout aw ON aw.workout_id = w.workout_id
+        WHERE aw.completed_sets > 0
+          AND ({scope})
+    ),
+    per_set AS (
+        SELECT c.user_id, c.day, ae.exercise_id,
+               {SET_VOLUME_SQL} AS set_volume
+        FROM completed c
+        JOIN actual_exercise_records ae ON ae.actual_workout_id = c.actual_workout_id
+        JOIN LATERAL generate_series(
+            1,
+            GREATEST(
+                COALESCE(array_length(ae.reps, 1), 0),
+                COALESCE(array_length(ae.sets, 1), 0),
+                COALESCE(array_length(ae.intensity, 1), 0),
+                COALESCE(array_length(ae.time, 1), 0)
+            )
+        ) AS idx(i) ON TRUE
+    ),
+    volume AS (
+        SELECT user_id, day, SUM(set_volume) AS volume
+        FROM per_set
+        GROUP BY user_id, day
+    ),
+    muscle AS (
+        SELECT user_id, day, jsonb_object_agg(muscle, volume) AS muscle_volume
+        FROM (
+            SELECT p.user_id, p.day,
+                   LOWER(TRIM(u.muscle)) AS muscle,
+                   SUM(p.set_volume / GREATEST(
+                       COALESCE(array_length(e.main_muscles, 1), 0)
+                     + COALESCE(array_length(e.secondary_muscles, 1), 0),
+                       1
+                   )) AS volume
+            FROM per_set p
+            JOIN Exercises e ON e.exercise_id = p.exercise_id
+            CROSS JOIN LATERAL UNNEST(e.main_muscles || e.secondary_muscles) AS u(muscle)
+            WHERE LOWER(TRIM(u.muscle)) <> ''
+            GROUP BY p.user_id, p.day, LOWER(TRIM(u.muscle))
+        ) m
+        GROUP BY user_id, day
+    ),
+    fresh AS (
+        SELECT c.user_id, c.day,
+               COALESCE(v.volume, 0) AS volume,
+               SUM(c.completed_sets)::int AS set_count,
+               COUNT(DISTINCT c.workout_id)::int AS workout_count,
+               COALESCE(m.muscle_volume, '{{}}'::jsonb) AS muscle_volume
+        FROM completed c
+        LEFT JOIN volume v USING (user_id, day)
+        LEFT JOIN muscle m USING (user_id, day)
+        GROUP BY c.user_id, c.day, v.volume, m.muscle_volume
+    )
+    """
+
+
+_INSERT_FRESH = """
+    INSERT INTO user_daily_stats
+        (user_id, day, volume, set_count, workout_count, muscle_volume, updated_at)
+    SELECT user_id, day, volume, set_count, workout_count, muscle_volume, NOW()
+    FROM fresh
+"""
+
+# The day of one actual workout, in a single statement: upsert the
+# recomputed row, or delete it if that day has no completed workout left.
+REFRESH_DAILY_STATS_QUERY = """
+    WITH target AS (
+        SELECT w.user_id, w.date AS day
+        FROM actual_workout aw
+        JOIN workouts w ON w.workout_id = aw.workout_id
+        WHERE aw.actual_workout_id = %(actual_workout_id)s
+    ),
+    """ + _daily_stats_ctes(
+        "(w.user_id, w.date) IN (SELECT user_id, day FROM target)"
+    ) + """,
+    gone AS (
+        DELETE FROM user_daily_stats s
+        USING target t
+        WHERE s.user_id = t.user_id AND s.day = t.day
+          AND NOT EXISTS (SELECT 1 FROM fresh)
+    )
+    """ + _INSERT_FRESH + """
+    ON CONFLICT (user_id, day) DO UPDATE SET
+        volume        = EXCLUDED.volume,
+        set_count     = EXCLUDED.set_count,
+        workout_count = EXCLUDED.workout_count,
+        muscle_volume = EXCLUDED.muscle_volume,
+        updated_at    = EXCLUDED.updated_at
+"""
+
+REBUILD_DAILY_STATS_QUERY = "WITH " + _daily_stats_ctes(
+    "%(user_id)s::int IS NULL OR w.user_id = %(user_id)s::int"
+) + _INSERT_FRESH
+
+
+def refresh_daily_stats(db, actual_workout_id):
+    """
+    Recompute the rollup row of the day an actual workout belongs to.
+
+    Parameters:
+    - db (Database | Transaction)
+    - actual_workout_id (int)
+    """
+    if actual_workout_id is None:
+        return
+    db.execute(REFRESH_DAILY_STATS_QUERY, {"actual_workout_id": int(actual_workout_id)})
+
+
+def rebuild_daily_stats(db, user_id=None):
+    """
+    Rebuild the rollup from actual_exercise_records, for one user or
+    (user_id=None) everyone, in one transaction.
+    """
+    params = {"user_id": int(user_id) if user_id is not None else None}
+    with db.transaction() as tx:
+        tx.execute(
+            "DELETE FROM user_daily_stats WHERE %(user_id)s::int IS NULL OR user_id = %(user_id)s::int;",
+            params
+        )
+        tx.execute(REBUILD_DAILY_STATS_QUERY, params)
+        return tx.cursor.rowcount
+
+
+def main(argv=None):
+    from .database import Database
+
+    argv = sys.argv[1:] if argv is None else argv
+    db = Database()
+    try:
+        rows = rebuild_daily_stats(db, int(argv[0]) if argv else None)
+        print(f"Rebuilt user_daily_stats: {rows} rows")
+    finally:
+        db.close_all()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
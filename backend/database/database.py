@@ -1,15 +1,24 @@
 import os
-from psycopg2 import pool, OperationalError, InterfaceError
+import time
+import threading
+import weakref
+from psycopg2 import OperationalError, InterfaceError
 from pathlib import Path
 from dotenv import load_dotenv
 from contextlib import contextmanager
-from .utils import DATABASE_INIT_COMMANDS
+from .migrations import apply_migrations
+from .pool import BlockingConnectionPool
+from .prepared import DB_PREPARED_STATEMENTS, get_statement
 
 
 # Define the path to the .env file relative to the project root
 env_path = Path(__file__).resolve().parent.parent / '.env'
 load_dotenv(dotenv_path=env_path)
 
+# Connections idle for longer than this are validated (SELECT 1) before
+# reuse; fresher ones rely on TCP keepalives and retry-on-failure.
+DB_VALIDATE_IDLE_SECONDS = float(os.getenv("DB_VALIDATE_IDLE_SECONDS", "30"))
+
 class Database:
     def __init__(self):
         # Read database credentials from environment variables
@@ -18,11 +27,10 @@ class Database:
         db_user = os.getenv("DB_USER")
         db_password = os.getenv("DB_PASSWORD")
 
-        # Create a connection pool with a minimum of 1 and a maximum of 10 connections.
+        # Connection settings; the pool itself is created lazily (see db_pool)
+        # so preforked workers never share sockets opened at import time.
         db_sslmode = os.getenv("DB_SSLMODE", "require")
-        self.db_pool = pool.SimpleConnectionPool(
-            minconn=1,
-            maxconn=10,
+        self._conn_kwargs = dict(
             host=db_host,
             database=db_name,
             user=db_user,
@@ -37,45 +45,176 @@ class Database:
             keepalives_count=3,
             options="-c statement_timeout=60000 -c idle_in_transaction_session_timeout=60000"
         )
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+        # Per-thread open transaction (see transaction()); execute() and
+        # get_cursor() join it instead of checking out their own connection.
+        self._local = threading.local()
+
+        # id(conn) -> time.monotonic() when it was last returned to the pool
+        self._last_used = {}
+        self._stats = {"checkouts": 0, "validations": 0, "evictions": 0, "retries": 0}
+        self._stats_lock = threading.Lock()
 
+        # Prepared statements (see database/prepared.py): names PREPAREd on
+        # each live connection, plus per-name timings.
+        self.use_prepared = DB_PREPARED_STATEMENTS
+        self._prepared = weakref.WeakKeyDictionary()
+        self._query_stats = {}
+
+
+    @property
+    def db_pool(self):
+        """
+        The process's BlockingConnectionPool (sized by DB_POOL_MIN /
+        DB_POOL_MAX / DB_POOL_TIMEOUT), created on first use and re-created
+        in a child process after fork().
+        """
+        current = self._pool
+        if current is not None and current.pid == os.getpid():
+            return current
+
+        with self._pool_lock:
+            if self._pool is not None and self._pool.pid != os.getpid():
+                # Inherited from the parent: never touch its sockets.
+                self._pool.abandon()
+                self._pool = None
+                self._last_used = {}
+            if self._pool is None:
+                self._pool = BlockingConnectionPool(**self._conn_kwargs)
+            return self._pool
 
     def initialiaze_database(self):
-        for command in DATABASE_INIT_COMMANDS:
-            self.execute(command)
+        # Creates / upgrades the schema (see database/migrations.py)
+        apply_migrations(self)
+
+    def _current_transaction(self):
+        return getattr(self._local, "tx", None)
+
+    @contextmanager
+    def transaction(self):
+        """
+        Unit of work: every db.execute / db.get_cursor in the block runs on
+        one pinned connection and is committed once at the end (rolled back
+        if the block raises).
+
+        Nested calls open a SAVEPOINT instead, so an inner block can fail
+        and roll back without aborting the outer one.
+
+        Usage:
+            with db.transaction() as tx:
+                tx.execute("DELETE ...", (venue_id,))
+                db.execute("UPDATE ...", (user_id,))   # same transaction
+        """
+        outer = self._current_transaction()
+        if outer is not None:
+            with outer.savepoint():
+                yield outer
+            return
+
+        conn = self._get_healthy_conn()
+        tx = Transaction(conn)
+        self._local.tx = tx
+        try:
+            yield tx
+            conn.commit()
+        except BaseException:
+            try:
+                conn.rollback()
+            except Exception:
+                pass
+            raise
+        finally:
+            self._local.tx = None
+            tx.close()
+            self._release_conn(conn)
+
+        tx.run_after_commit()
+
+    def after_commit(self, callback):
+        """
+        Run `callback()` once the current transaction commits (dropped on
+        rollback), or right away when no transaction is open.
+        """
+        tx = self._current_transaction()
+        if tx is None:
+            callback()
+        else:
+            tx.on_commit.append(callback)
+
+    def _count(self, stat):
+        with self._stats_lock:
+            self._stats[stat] += 1
+
+    def pool_stats(self):
+        """
+        Counters since startup: checkouts, validations (idle pings),
+        evictions (connections closed instead of reused), retries, plus the
+        pool's own size / wait / timeout figures under "pool".
+        """
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["validate_idle_seconds"] = DB_VALIDATE_IDLE_SECONDS
+        if self._pool is not None:
+            stats["pool"] = self._pool.stats()
+        return stats
+
+    def _evict(self, conn):
+        self._last_used.pop(id(conn), None)
+        self._count("evictions")
+        self.db_pool.putconn(conn, close=True)
+
+    def _release_conn(self, conn):
+        # Only return healthy connections to the pool
+        try:
+            if conn and conn.closed == 0:
+                self._last_used[id(conn)] = time.monotonic()
+                self.db_pool.putconn(conn)
+            else:
+                self._evict(conn)
+        except Exception:
+            # If we can't even return it, force-close it
+            try:
+                self.db_pool.putconn(conn, close=True)
+            except Exception:
+                pass
 
     @contextmanager
     def get_cursor(self):
+        tx = self._current_transaction()
+        if tx is not None:
+            # Inside transaction(): the caller must not commit/rollback.
+            with tx.conn.cursor() as cur:
+                yield cur, tx.conn
+            return
+
         conn = self._get_healthy_conn()
         try:
             with conn.cursor() as cur:
                 yield cur, conn
         finally:
-            # Only return healthy connections to the pool
-            try:
-                if conn and conn.closed == 0:
-                    self.db_pool.putconn(conn)
-                else:
-                    self.db_pool.putconn(conn, close=True)
-            except Exception:
-                # If we can't even return it, force-close it
-                try:
-                    self.db_pool.putconn(conn, close=True)
-                except Exception:
-                    pass
+            self._release_conn(conn)
 
     def _get_healthy_conn(self):
-        # Grab a conn, ping it; if bad, evict and try once more
+        # Grab a conn; ping it only if it sat idle (or is new to us).
+        # If bad, evict and try once more.
         for _ in range(2):
             conn = self.db_pool.getconn()
+            self._count("checkouts")
             try:
                 if conn.closed != 0:
                     raise InterfaceError("connection already closed")
-                with conn.cursor() as cur:
-                    cur.execute("SELECT 1")
+                last_used = self._last_used.get(id(conn))
+                if last_used is None or time.monotonic() - last_used > DB_VALIDATE_IDLE_SECONDS:
+                    self._count("validations")
+                    with conn.cursor() as cur:
+                        cur.execute("SELECT 1")
+                    conn.rollback()  # don't leave the ping's transaction open
                 return conn
             except (OperationalError, InterfaceError):
                 # Evict broken connection
-                self.db_pool.putconn(conn, close=True)
+                self._evict(conn)
             except Exception:
                 # Unknown error — don't lose the conn silently
                 self.db_pool.putconn(conn)
@@ -97,23 +236,38 @@ class Database:
         Returns:
             list: Query results if fetch is True, otherwise None.
         """
+        tx = self._current_transaction()
+        if tx is not None:
+            return tx.execute(query, params, fetch)
+
+        def work(cur):
+            cur.execute(query, params)
+            return cur.fetchall() if fetch else None
+
+        return self._run(work)
+
+    def _run(self, work):
+        """
+        Run `work(cur)` on a pooled connection and commit; on a dropped
+        connection, retry once with a fresh one.
+        """
         with self.get_cursor() as (cur, conn):
             try:
-                cur.execute(query, params)
-                result = cur.fetchall() if fetch else None
+                result = work(cur)
                 conn.commit()
                 return result
             except (OperationalError, InterfaceError) as e:
-                # Drop this connection and try once with a fresh one
+                # Drop this connection (evicted on release) and try once
+                # with a fresh one
                 try:
                     conn.rollback()
                 except Exception:
                     pass
-                self.db_pool.putconn(conn, close=True)
+                conn.close()
+                self._count("retries")
 
                 with self.get_cursor() as (cur2, conn2):
-                    cur2.execute(query, params)
-                    result = cur2.fetchall() if fetch else None
+                    result = work(cur2)
                     conn2.commit()
                     return result
             except Exception as e:
@@ -122,11 +276,127 @@ class Database:
                 except Exception:
                     pass
                 # Return as unhealthy so it doesn’t recirculate
-                self.db_pool.putconn(conn, close=True)
+                conn.close()
                 raise
 
+    def execute_prepared(self, name, params=None, fetch=False):
+        """
+        Execute a statement registered with database.prepared.register_statement.
+
+        The statement is PREPAREd once per pooled connection and then run
+        by name. Same contract as execute(); joins db.transaction() blocks.
+        """
+        stmt = get_statement(name)
+        if not self.use_prepared:
+            started = time.perf_counter()
+            try:
+                return self.execute(stmt.query, params, fetch)
+            finally:
+                self._record_query(name, started, prepared=False)
+
+        def work(cur):
+            prepared = self._prepared.setdefault(cur.connection, set())
+            if name not in prepared:
+                cur.execute(stmt.prepare_sql)
+                prepared.add(name)
+                self._record_query(name, None, prepared=True)
+            cur.execute(stmt.execute_sql, tuple(params or ()))
+            return cur.fetchall() if fetch else None
+
+        started = time.perf_counter()
+        try:
+            tx = self._current_transaction()
+            if tx is not None:
+                return work(tx.cursor)
+            return self._run(work)
+        finally:
+            self._record_query(name, started, prepared=True)
+
+    def _record_query(self, name, started, prepared):
+        with self._stats_lock:
+            entry = self._query_stats.setdefault(name, {
+                "calls": 0, "prepares": 0, "total_ms": 0.0, "max_ms": 0.0, "prepared": prepared,
+            })
+            if started is None:
+                entry["prepares"] += 1
+                return
+            elapsed_ms = (time.perf_counter() - started) * 1000.0
+            entry["calls"] += 1
+            entry["total_ms"] += elapsed_ms
+            entry["max_ms"] = max(entry["max_ms"], elapsed_ms)
+            entry["prepared"] = prepared
+
+    def query_stats(self):
+        """
+        Per prepared-statement name: calls, prepares, total_ms, max_ms and
+        avg_ms (client-side, including the round trip).
+        """
+        with self._stats_lock:
+            stats = {name: dict(entry) for name, entry in self._query_stats.items()}
+        for entry in stats.values():
+            entry["avg_ms"] = entry["total_ms"] / entry["calls"] if entry["calls"] else 0.0
+        return stats
+
     def close_all(self):
         """
         Closes all connections in the pool.
         """
-        self.db_pool.closeall()
\ No newline at end of file
+        self.db_pool.closeall()
+
+
+class Transaction:
+    """
+    Handle yielded by Database.transaction().
+
+    Attributes:
+    - conn: the pinned psycopg2 connection.
+    - cursor: a cursor on it, open for the whole block (for helpers such
+      as psycopg2.extras.execute_values).
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.cursor = conn.cursor()
+        self.on_commit = []
+        self._savepoints = 0
+
+    def execute(self, query, params=None, fetch=False):
+        """
+        Same contract as Database.execute, without the per-statement commit.
+        """
+        self.cursor.execute(query, params)
+        return self.cursor.fetchall() if fetch else None
+
+    @contextmanager
+    def savepoint(self):
+        self._savepoints += 1
+        name = f"sp_{self._savepoints}"
+        pending = len(self.on_commit)
+        self.cursor.execute(f"SAVEPOINT {name}")
+        try:
+            yield self
+        except BaseException:
+            self.cursor.execute(f"ROLLBACK TO SAVEPOINT {name}")
+            del self.on_commit[pending:]
+            raise
+        else:
+            self.cursor.execute(f"RELEASE SAVEPOINT {name}")
+        finally:
+            self._savepoints -= 1
+
+    def after_commit(self, callback):
+        """
+        Run `callback()` once this transaction commits (dropped on rollback).
+        """
+        self.on_commit.append(callback)
+
+    def run_after_commit(self):
+        callbacks, self.on_commit = self.on_commit, []
+        for callback in callbacks:
+            callback()
+
+    def close(self):
+        try:
+            self.cursor.close()
+        except Exception:
+            pass
@@ -16,6 +16,7 @@ def populate_exercise_table(drop=True):
     if drop:
         DROP_TABLE_COMMANDS = [
             "DROP TABLE IF EXISTS Milestones CASCADE;",
+            "DROP TABLE IF EXISTS user_exercise_history CASCADE;",
             "DROP TABLE IF EXISTS actual_exercise_records CASCADE;",
             "DROP TABLE IF EXISTS actual_workout CASCADE;",
             "DROP TABLE IF EXISTS Venue_equipment CASCADE;",
@@ -27,6 +28,8 @@ def populate_exercise_table(drop=True):
             "DROP TABLE IF EXISTS Venues CASCADE;",
             "DROP TABLE IF EXISTS Users CASCADE;",
             "DROP TABLE IF EXISTS exercise_preferences CASCADE;",
+            "DROP TABLE IF EXISTS user_daily_stats CASCADE;",
+            "DROP TABLE IF EXISTS schema_migrations CASCADE;",
         ]
 
         # This is for pure initialization(First time). Might have to remove the
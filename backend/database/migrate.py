@@ -0,0 +1,48 @@
+import sys
+import argparse
+from .database import Database
+from .migrations import MIGRATIONS, applied_versions, apply_migrations
+
+
+# ---------------------------------------------------------------------
+# Migration CLI
+#
+# Usage (from backend/):
+#   python -m database.migrate            # apply every pending migration
+#   python -m database.migrate --to 3     # apply up to version 3
+#   python -m database.migrate status     # list applied / pending versions
+# ---------------------------------------------------------------------
+
+
+def print_status(db):
+    applied = applied_versions(db)
+    for version, name, _statements in sorted(MIGRATIONS, key=lambda m: m[0]):
+        if version in applied:
+            print(f"  [x] {version:>4}  {name}  (applied {applied[version][1]:%Y-%m-%d %H:%M})")
+        else:
+            print(f"  [ ] {version:>4}  {name}")
+    unknown = sorted(set(applied) - {m[0] for m in MIGRATIONS})
+    for version in unknown:
+        print(f"  [?] {version:>4}  {applied[version][0]}  (applied, but not in this codebase)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m database.migrate")
+    parser.add_argument("command", nargs="?", choices=["up", "status"], default="up")
+    parser.add_argument("--to", type=int, default=None, help="highest version to apply")
+    args = parser.parse_args(argv)
+
+    db = Database()
+    try:
+        if args.command == "status":
+            print_status(db)
+        else:
+            applied = apply_migrations(db, target=args.to)
+            print(f"{len(applied)} migration(s) applied" if applied else "Schema is up to date")
+    finally:
+        db.close_all()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,692 @@
+import zlib
+
+
+# ---------------------------------------------------------------------
+# Versioned schema migrations
+#
+# Notes:
+# - Each entry is (version, name, statements). apply_migrations() runs
+#   the pending ones in version order, each in its own transaction, and
+#   records it in schema_migrations, so schema changes (indexes, columns,
+#   dataset revisions) roll out incrementally instead of by drop + reload.
+# - Version 0 is the original CREATE TABLE IF NOT EXISTS schema; on an
+#   existing database it is a no-op that just gets recorded.
+# - Never edit a migration that has shipped; add a new version instead.
+#   Each version's SQL is written out here as literals, not built from
+#   constants elsewhere, so editing another module cannot change it.
+# - Run from the CLI (`python -m database.migrate`) or at startup with
+#   DB_MIGRATE_ON_STARTUP=1.
+# - Indexes here follow the queries the routes actually run; check them
+#   with `python -m database.check_indexes` against a seeded database.
+# ---------------------------------------------------------------------
+
+MIGRATIONS = [
+    (
+        0,
+        "baseline schema",
+        [
+            # Create Users table
+            '''
+            CREATE TABLE IF NOT EXISTS Users (
+                user_id SERIAL PRIMARY KEY,
+                name VARCHAR(255),
+                password TEXT,
+                current_venue_id INT,
+                birthday DATE,
+                gender VARCHAR(10),
+                level INT,
+                email VARCHAR(255),
+                picture VARCHAR(255),
+                workout_number INT,
+                agreed BOOLEAN DEFAULT FALSE  -- tracks if user agreed to terms/privacy
+            );
+            ''',
+            # Create Venues table
+            '''
+            CREATE TABLE IF NOT EXISTS Venues (
+                venue_id SERIAL PRIMARY KEY,
+                name VARCHAR(255),
+                user_id INT REFERENCES Users(user_id),
+                gym_setup INT,
+                goals TEXT[],
+                priority_muscles TEXT[],
+                pain_points TEXT[],
+                split VARCHAR(100),
+                days_of_week TEXT[],
+                workout_frequency INT,
+                time_per_workout INT,
+                rest_time_between_set INT,
+                equipment_version INT NOT NULL DEFAULT 0
+            );
+            ''',
+            # Create workouts table (for actual workouts)
+            '''
+            CREATE TABLE IF NOT EXISTS workouts (
+                workout_id SERIAL PRIMARY KEY,
+                user_id INT REFERENCES Users(user_id),
+                date DATE,
+                phase VARCHAR(50),
+                split_group VARCHAR(50)
+            );
+            ''',
+            # Create suggested_workouts table
+            '''
+            CREATE TABLE IF NOT EXISTS suggested_workouts (
+                suggested_workout_id SERIAL PRIMARY KEY,
+                workout_id INT REFERENCES workouts(workout_id),
+                duration_predicted INT
+            );
+            ''',
+            # Create Exercises table
+            '''
+            CREATE TABLE IF NOT EXISTS Exercises (
+                exercise_id SERIAL PRIMARY KEY,
+                name VARCHAR(255),
+                main_muscles TEXT[],
+                secondary_muscles TEXT[],
+                animation TEXT,
+                written_instructions TEXT,
+                movement VARCHAR(255),
+                lower_bound TEXT,
+                level TEXT[],
+                difficulty INT,
+                equipment_type INT,
+                equipment TEXT[],
+                prerequisite_exercise TEXT[],
+                variations TEXT[],
+                regression TEXT[],
+                progression TEXT[],
+                loading_type INT,
+                risk_level INT,
+                exercise_purpose TEXT[],
+                force_type TEXT[],
+                pain_exclusions TEXT[]
+            );
+            ''',
+            # Create suggested_exercise_records table
+            '''
+            CREATE TABLE IF NOT EXISTS suggested_exercise_records (
+                suggested_record_id SERIAL PRIMARY KEY,
+                suggested_workout_id INT REFERENCES suggested_workouts(suggested_workout_id),
+                exercise_id INT REFERENCES Exercises(exercise_id),
+                exercise_type VARCHAR(50),
+                intensity TEXT[],
+                reps INT[],
+                sets INT[],
+                time INT[],
+                order_index INT
+            );
+            ''',
+            # Create equipment table - deleted:         weight_resistance_time VARCHAR(50)
+            '''
+            CREATE TABLE IF NOT EXISTS equipment (
+                equipment_id SERIAL PRIMARY KEY,
+                name VARCHAR(255),
+                weight_resistance_time VARCHAR(50)
+            );
+            ''',
+            # Create Venue_equipment table
+            '''
+            CREATE TABLE IF NOT EXISTS Venue_equipment (
+                venue_equipment_id SERIAL PRIMARY KEY,
+                venue_id INT REFERENCES Venues(venue_id),
+                equipment_id INT REFERENCES equipment(equipment_id),
+                quantity INT
+            );
+            ''',
+            # Create exercise_preferences
+            '''
+            CREATE TABLE IF NOT EXISTS exercise_preferences (
+                preference_id SERIAL PRIMARY KEY,
+                user_id INT REFERENCES Users(user_id),
+                exercise_id INT REFERENCES Exercises(exercise_id),
+                preference INT CHECK (preference IN (1, 2, 3)),
+                UNIQUE(user_id, exercise_id)
+            );
+            ''',
+            # Create actual_workout table
+            '''
+            CREATE TABLE IF NOT EXISTS actual_workout (
+                actual_workout_id SERIAL PRIMARY KEY,
+                workout_id INT REFERENCES workouts(workout_id),
+                duration_actual INT
+            );
+            ''',
+            # Create actual_exercise_records table
+            # CREATE TABLE IF NOT EXISTS actual_exercise_records (
+            #     actual_record_id SERIAL PRIMARY KEY,
+            #     actual_workout_id INT REFERENCES actual_workout(actual_workout_id),
+            #     exercise_id INT REFERENCES Exercises(exercise_id),
+            #     weight DECIMAL[],
+            #     reps INT[],
+            #     sets INT[],
+            #     time INT[],
+            #     order_index INT
+            # );
+            '''
+            CREATE TABLE IF NOT EXISTS actual_exercise_records (
+                actual_record_id SERIAL PRIMARY KEY,
+                actual_workout_id INT REFERENCES actual_workout(actual_workout_id),
+                exercise_id INT REFERENCES Exercises(exercise_id),
+                exercise_type VARCHAR(50),
+                intensity TEXT[],
+                reps INT[],
+                sets INT[],
+                time INT[],
+                order_index INT
+            );
+            ''',
+            # Create Milestones table
+            '''
+            CREATE TABLE IF NOT EXISTS Milestones (
+                milestone_id SERIAL PRIMARY KEY,
+                user_id INT REFERENCES Users(user_id),
+                milestone_type VARCHAR(50),
+                description TEXT,
+                exercise_id INT REFERENCES Exercises(exercise_id),
+                target_value DECIMAL,
+                unit VARCHAR(50),
+                achieved_date DATE,
+                status VARCHAR(50)
+            );
+            ''',
+            # This is for resetting password when user forgot their passwords
+            # This was added recently
+            '''
+            CREATE TABLE IF NOT EXISTS password_resets (
+                reset_id SERIAL PRIMARY KEY,
+                user_id INT REFERENCES Users(user_id),
+                token_hash TEXT NOT NULL,
+                expires_at TIMESTAMPTZ NOT NULL,   -- aware UTC instant
+                used_at TIMESTAMPTZ,               -- when token was consumed
+                created_ip VARCHAR(64),
+                UNIQUE (token_hash)
+            );
+            ''',
+            '''
+            CREATE TABLE IF NOT EXISTS user_providers (
+                user_provider_id SERIAL PRIMARY KEY,
+                user_id INT REFERENCES Users(user_id) ON DELETE CASCADE,
+                provider VARCHAR(20) NOT NULL,          -- 'google', 'apple', etc.
+                provider_user_id VARCHAR(128) NOT NULL, -- Google's 'sub', Apple's 'sub'
+                UNIQUE (provider, provider_user_id)
+            );
+            ''',
+            # Bumped on every Venue_equipment change; keys the per-venue equipment cache
+            '''
+            ALTER TABLE Venues ADD COLUMN IF NOT EXISTS equipment_version INT NOT NULL DEFAULT 0;
+            ''',
+            # Per-user, per-exercise, per-phase history summary read by the intensity
+            # algorithms (maintained by app.workout.history.refresh_exercise_history)
+            '''
+            CREATE TABLE IF NOT EXISTS user_exercise_history (
+                user_id INT REFERENCES Users(user_id) ON DELETE CASCADE,
+                exercise_id INT REFERENCES Exercises(exercise_id),
+                phase VARCHAR(50) NOT NULL,        -- '' when the workout had no phase
+                recent JSONB NOT NULL,             -- last N completed performances, oldest first
+                last_performed_on DATE,
+                best_intensity NUMERIC,            -- heaviest completed set (numeric intensities only)
+                best_reps INT,
+                last_set JSONB,                    -- last completed set of the latest performance
+                updated_at TIMESTAMPTZ DEFAULT NOW(),
+                PRIMARY KEY (user_id, exercise_id, phase)
+            );
+            ''',
+        ],
+    ),
+    (
+        1,
+        "secondary indexes for the hot access paths",
+        [
+            # Latest / per-day workout lookups: WHERE user_id = %s ORDER BY date DESC, workout_id DESC
+            '''
+            CREATE INDEX IF NOT EXISTS idx_workouts_user_date
+                ON workouts (user_id, date DESC, workout_id DESC);
+            ''',
+            '''
+            CREATE INDEX IF NOT EXISTS idx_suggested_workouts_workout
+                ON suggested_workouts (workout_id);
+            ''',
+            '''
+            CREATE INDEX IF NOT EXISTS idx_actual_workout_workout
+                ON actual_workout (workout_id);
+            ''',
+            # Exercise rows of a workout, and the single-row updates by (workout, exercise)
+            '''
+            CREATE INDEX IF NOT EXISTS idx_actual_records_workout_exercise
+                ON actual_exercise_records (actual_workout_id, exercise_id);
+            ''',
+            '''
+            CREATE INDEX IF NOT EXISTS idx_suggested_records_workout
+                ON suggested_exercise_records (suggested_workout_id);
+            ''',
+            '''
+            CREATE INDEX IF NOT EXISTS idx_venue_equipment_venue
+                ON Venue_equipment (venue_id);
+            ''',
+            '''
+            CREATE INDEX IF NOT EXISTS idx_venues_user
+                ON Venues (user_id);
+            ''',
+            # Name lookups: WHERE LOWER(TRIM(name)) = ANY(%s) / WHERE LOWER(name) = ...
+            '''
+            CREATE INDEX IF NOT EXISTS idx_exercises_name_norm
+                ON Exercises (LOWER(TRIM(name)));
+            ''',
+            '''
+            CREATE INDEX IF NOT EXISTS idx_equipment_name_lower
+                ON equipment (LOWER(name));
+            ''',
+            # exercise_preferences(user_id) is already served by the
+            # UNIQUE (user_id, exercise_id) index; no extra index needed.
+
+            # /workout/database/filter matches text arrays case-insensitively.
+            # lower_text_array() lets that be written as `&&` over an
+            # expression GIN index (NULL arrays become '{}').
+            '''
+            CREATE OR REPLACE FUNCTION lower_text_array(arr TEXT[])
+            RETURNS TEXT[]
+            LANGUAGE sql IMMUTABLE PARALLEL SAFE
+            AS $$ SELECT ARRAY(SELECT LOWER(x) FROM UNNEST(arr) AS x) $$;
+            ''',
+            '''
+            CREATE INDEX IF NOT EXISTS idx_exercises_main_muscles_gin
+                ON Exercises USING GIN (lower_text_array(main_muscles));
+            ''',
+            '''
+            CREATE INDEX IF NOT EXISTS idx_exercises_secondary_muscles_gin
+                ON Exercises USING GIN (lower_text_array(secondary_muscles));
+            ''',
+            '''
+            CREATE INDEX IF NOT EXISTS idx_exercises_level_gin
+                ON Exercises USING GIN (lower_text_array(level));
+            ''',
+        ],
+    ),
+    (
+        2,
+        "workouts.generation_seed",
+        [
+            # Seed of the RNG a workout was generated with, so it can be replayed
+            '''
+            ALTER TABLE workouts ADD COLUMN IF NOT EXISTS generation_seed BIGINT;
+            ''',
+        ],
+    ),
+    (
+        3,
+        "actual_workout completion state",
+        [
+            # Maintained by app/workout/completion.py
+            '''
+            ALTER TABLE actual_workout
+                ADD COLUMN IF NOT EXISTS completed_sets INT NOT NULL DEFAULT 0,
+                ADD COLUMN IF NOT EXISTS first_completed_at TIMESTAMPTZ;
+            ''',
+            # Backfill; the real completion time is unknown for existing
+            # rows, so first_completed_at falls back to the workout date.
+            '''
+            UPDATE actual_workout aw
+            SET completed_sets = c.completed_sets,
+                first_completed_at = w.date::timestamp AT TIME ZONE 'UTC'
+            FROM (
+                SELECT aer.actual_workout_id, COUNT(*)::int AS completed_sets
+                FROM actual_exercise_records aer
+                CROSS JOIN LATERAL UNNEST(aer.sets) AS s(done)
+                WHERE s.done = 1
+                GROUP BY aer.actual_workout_id
+            ) c, workouts w
+            WHERE aw.actual_workout_id = c.actual_workout_id
+              AND w.workout_id = aw.workout_id;
+            ''',
+            # Stats queries: completed workouts only
+            '''
+            CREATE INDEX IF NOT EXISTS idx_actual_workout_completed
+                ON actual_workout (workout_id)
+                WHERE completed_sets > 0;
+            ''',
+        ],
+    ),
+    (
+        4,
+        "user_daily_stats rollup",
+        [
+            # Maintained by database/daily_stats.py
+            '''
+            CREATE TABLE IF NOT EXISTS user_daily_stats (
+                user_id INT REFERENCES Users(user_id) ON DELETE CASCADE,
+                day DATE NOT NULL,
+                volume NUMERIC NOT NULL DEFAULT 0,
+                set_count INT NOT NULL DEFAULT 0,
+                workout_count INT NOT NULL DEFAULT 0,
+                muscle_volume JSONB NOT NULL DEFAULT '{}',   -- {muscle: volume}
+                updated_at TIMESTAMPTZ DEFAULT NOW(),
+                PRIMARY KEY (user_id, day)
+            );
+            ''',
+            # Backfill (the SQL database/daily_stats.py generated when
+            # this migration shipped)
+            '''
+            WITH
+            band_map(name, val) AS (
+                VALUES ('extra light', 1), ('light', 2), ('medium', 3), ('heavy', 4), ('extra heavy', 5)
+            ),
+            completed AS (
+                SELECT w.user_id, w.date AS day, w.workout_id,
+                       aw.actual_workout_id, aw.completed_sets
+                FROM workouts w
+                JOIN actual_workout aw ON aw.workout_id = w.workout_id
+                WHERE aw.completed_sets > 0
+                  AND (TRUE)
+            ),
+            per_set AS (
+                SELECT c.user_id, c.day, ae.exercise_id,
+                       CASE
+                           WHEN LOWER(TRIM(ae.exercise_type)) = 'gym equipment'
+                                AND COALESCE(ae.intensity[idx.i], '') ~ '^[0-9]+(\\.[0-9]+)?$'
+                           THEN (ae.intensity[idx.i])::DECIMAL
+                                * COALESCE(ae.reps[idx.i], 0)
+                                * COALESCE(ae.sets[idx.i], 0)
+
+                           WHEN LOWER(TRIM(ae.exercise_type)) = 'resistance band'
+                           THEN COALESCE(
+                                  CASE
+                                    WHEN COALESCE(ae.intensity[idx.i], '') ~ '^[0-9]+(\\.[0-9]+)?$'
+                                      THEN (ae.intensity[idx.i])::DECIMAL
+                                    ELSE (SELECT val FROM band_map WHERE name = LOWER(ae.intensity[idx.i]))::DECIMAL
+                                  END,
+                                  0
+                                )
+                                * COALESCE(ae.reps[idx.i], 0)
+                                * COALESCE(ae.sets[idx.i], 0)
+
+                           WHEN LOWER(TRIM(ae.exercise_type)) = 'bodyweight'
+                           THEN COALESCE(ae.reps[idx.i], 0)
+                                * COALESCE(ae.sets[idx.i], 0)
+
+                           WHEN LOWER(TRIM(ae.exercise_type)) = 'timed'
+                           THEN COALESCE(ae.time[idx.i], 0)
+                                * COALESCE(ae.sets[idx.i], 0)
+
+                           ELSE 0
+                       END AS set_volume
+                FROM completed c
+                JOIN actual_exercise_records ae ON ae.actual_workout_id = c.actual_workout_id
+                JOIN LATERAL generate_series(
+                    1,
+                    GREATEST(
+                        COALESCE(array_length(ae.reps, 1), 0),
+                        COALESCE(array_length(ae.sets, 1), 0),
+                        COALESCE(array_length(ae.intensity, 1), 0),
+                        COALESCE(array_length(ae.time, 1), 0)
+                    )
+                ) AS idx(i) ON TRUE
+            ),
+            volume AS (
+                SELECT user_id, day, SUM(set_volume) AS volume
+                FROM per_set
+                GROUP BY user_id, day
+            ),
+            muscle AS (
+                SELECT user_id, day, jsonb_object_agg(muscle, volume) AS muscle_volume
+                FROM (
+                    SELECT p.user_id, p.day,
+                           LOWER(TRIM(u.muscle)) AS muscle,
+                           SUM(p.set_volume / GREATEST(
+                               COALESCE(array_length(e.main_muscles, 1), 0)
+                             + COALESCE(array_length(e.secondary_muscles, 1), 0),
+                               1
+                           )) AS volume
+                    FROM per_set p
+                    JOIN Exercises e ON e.exercise_id = p.exercise_id
+                    CROSS JOIN LATERAL UNNEST(e.main_muscles || e.secondary_muscles) AS u(muscle)
+                    WHERE LOWER(TRIM(u.muscle)) <> ''
+                    GROUP BY p.user_id, p.day, LOWER(TRIM(u.muscle))
+                ) m
+                GROUP BY user_id, day
+            ),
+            fresh AS (
+                SELECT c.user_id, c.day,
+                       COALESCE(v.volume, 0) AS volume,
+                       SUM(c.completed_sets)::int AS set_count,
+                       COUNT(DISTINCT c.workout_id)::int AS workout_count,
+                       COALESCE(m.muscle_volume, '{}'::jsonb) AS muscle_volume
+                FROM completed c
+                LEFT JOIN volume v USING (user_id, day)
+                LEFT JOIN muscle m USING (user_id, day)
+                GROUP BY c.user_id, c.day, v.volume, m.muscle_volume
+            )
+            INSERT INTO user_daily_stats
+                (user_id, day, volume, set_count, workout_count, muscle_volume, updated_at)
+            SELECT user_id, day, volume, set_count, workout_count, muscle_volume, NOW()
+            FROM fresh;
+            ''',
+        ],
+    ),
+    (
+        5,
+        "typed intensity columns",
+        [
+            # intensity is TEXT[] ("40", "Light", "Bodyweight", ...). Two
+            # arrays of the same length are kept next to it so readers do
+            # arithmetic instead of regex-checking and casting each element:
+            #   * load_numeric: the element as a number when it is one, else NULL
+            #     (REAL keeps 6 significant digits; cast to numeric before summing),
+            #   * band_level: a band name as its 1-5 level, else NULL.
+            # STORED generated columns, so every writer keeps them in sync
+            # and adding them backfills the existing rows.
+            '''
+            CREATE OR REPLACE FUNCTION intensity_load(arr TEXT[])
+            RETURNS REAL[]
+            LANGUAGE sql IMMUTABLE PARALLEL SAFE
+            AS $$
+                SELECT CASE WHEN arr IS NULL THEN NULL ELSE ARRAY(
+                    SELECT CASE WHEN TRIM(x) ~ '^[0-9]+([.][0-9]+)?$' THEN TRIM(x)::real END
+                    FROM UNNEST(arr) WITH ORDINALITY AS u(x, i)
+                    ORDER BY i
+                ) END
+            $$;
+            ''',
+            '''
+            CREATE OR REPLACE FUNCTION intensity_band_level(arr TEXT[])
+            RETURNS SMALLINT[]
+            LANGUAGE sql IMMUTABLE PARALLEL SAFE
+            AS $$
+                SELECT CASE WHEN arr IS NULL THEN NULL ELSE ARRAY(
+                    SELECT (CASE LOWER(TRIM(x))
+                        WHEN 'extra light' THEN 1
+                        WHEN 'light' THEN 2
+                        WHEN 'medium' THEN 3
+                        WHEN 'heavy' THEN 4
+                        WHEN 'extra heavy' THEN 5
+                    END)::smallint
+                    FROM UNNEST(arr) WITH ORDINALITY AS u(x, i)
+                    ORDER BY i
+                ) END
+            $$;
+            ''',
+            '''
+            ALTER TABLE suggested_exercise_records
+                ADD COLUMN IF NOT EXISTS load_numeric REAL[]
+                    GENERATED ALWAYS AS (intensity_load(intensity)) STORED,
+                ADD COLUMN IF NOT EXISTS band_level SMALLINT[]
+                    GENERATED ALWAYS AS (intensity_band_level(intensity)) STORED;
+            ''',
+            '''
+            ALTER TABLE actual_exercise_records
+                ADD COLUMN IF NOT EXISTS load_numeric REAL[]
+                    GENERATED ALWAYS AS (intensity_load(intensity)) STORED,
+                ADD COLUMN IF NOT EXISTS band_level SMALLINT[]
+                    GENERATED ALWAYS AS (intensity_band_level(intensity)) STORED;
+            ''',
+        ],
+    ),
+    (
+        6,
+        "backfill user_exercise_history",
+        [
+            # Migration 0 creates user_exercise_history empty and the routes
+            # only refresh the exercises a user touches afterwards, so build
+            # every summary once from the recorded sets (same shape as
+            # workout.history.REFRESH_EXERCISE_HISTORY_QUERY, every user and
+            # exercise, depth 20). Needs migration 5's load_numeric.
+            '''
+            WITH perf AS (
+                SELECT
+                    w.user_id,
+                    aer.exercise_id,
+                    COALESCE(w.phase, '') AS phase,
+                    aer.exercise_type,
+                    aer.intensity,
+                    aer.load_numeric,
+                    aer.reps,
+                    aer.sets,
+                    aer.time,
+                    w.date,
+                    aer.actual_workout_id,
+                    aer.order_index,
+                    ROW_NUMBER() OVER (
+                        PARTITION BY w.user_id, aer.exercise_id, COALESCE(w.phase, '')
+                        ORDER BY w.date DESC, aer.actual_workout_id DESC, aer.order_index DESC
+                    ) AS rn
+                FROM actual_exercise_records aer
+                JOIN actual_workout aw ON aw.actual_workout_id = aer.actual_workout_id
+                JOIN workouts w        ON w.workout_id = aw.workout_id
+                WHERE 1 = ANY(aer.sets)
+            ),
+            completed_sets AS (
+                SELECT p.user_id, p.exercise_id, p.phase, p.rn,
+                       s.intensity, s.load, s.reps, s.time, s.idx
+                FROM perf p
+                CROSS JOIN LATERAL unnest(p.intensity, p.load_numeric, p.reps, p.sets, p.time)
+                    WITH ORDINALITY AS s(intensity, load, reps, done, time, idx)
+                WHERE s.done = 1
+            ),
+            best AS (
+                SELECT DISTINCT ON (user_id, exercise_id, phase)
+                       user_id, exercise_id, phase,
+                       load::numeric AS best_intensity,
+                       reps AS best_reps
+                FROM completed_sets
+                WHERE load IS NOT NULL
+                ORDER BY user_id, exercise_id, phase,
+                         load DESC, reps DESC NULLS LAST
+            ),
+            last_set AS (
+                SELECT DISTINCT ON (user_id, exercise_id, phase)
+                       user_id, exercise_id, phase,
+                       jsonb_build_object('intensity', intensity, 'reps', reps, 'time', time) AS last_set
+                FROM completed_sets
+                WHERE rn = 1
+                ORDER BY user_id, exercise_id, phase, idx DESC
+            ),
+            recent AS (
+                SELECT user_id, exercise_id, phase,
+                       jsonb_agg(jsonb_build_object(
+                           'exercise_type', exercise_type,
+                           'intensity', intensity,
+                           'reps', reps,
+                           'time', time,
+                           'date', date,
+                           'actual_workout_id', actual_workout_id,
+                           'order_index', order_index
+                       ) ORDER BY rn DESC) AS recent,
+                       MAX(date) AS last_performed_on
+                FROM perf
+                WHERE rn <= 20
+                GROUP BY user_id, exercise_id, phase
+            )
+            INSERT INTO user_exercise_history
+                (user_id, exercise_id, phase, recent, last_performed_on,
+                 best_intensity, best_reps, last_set, updated_at)
+            SELECT r.user_id, r.exercise_id, r.phase, r.recent, r.last_performed_on,
+                   b.best_intensity, b.best_reps, l.last_set, NOW()
+            FROM recent r
+            LEFT JOIN best b     USING (user_id, exercise_id, phase)
+            LEFT JOIN last_set l USING (user_id, exercise_id, phase)
+            ON CONFLICT (user_id, exercise_id, phase) DO UPDATE SET
+                recent            = EXCLUDED.recent,
+                last_performed_on = EXCLUDED.last_performed_on,
+                best_intensity    = EXCLUDED.best_intensity,
+                best_reps         = EXCLUDED.best_reps,
+                last_set          = EXCLUDED.last_set,
+                updated_at        = EXCLUDED.updated_at;
+            ''',
+        ],
+    ),
+]
+
+
+SCHEMA_MIGRATIONS_TABLE = '''
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        version INT PRIMARY KEY,
+        name TEXT NOT NULL,
+        applied_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+    );
+'''
+
+# Serializes runners (several workers may start at once)
+MIGRATION_LOCK_KEY = zlib.crc32(b"genfit.schema_migrations")
+
+
+def applied_versions(db):
+    """
+    Returns:
+        dict: version -> (name, applied_at) for every applied migration.
+    """
+    with db.transaction() as tx:
+        tx.execute("SELECT pg_advisory_xact_lock(%s);", (MIGRATION_LOCK_KEY,))
+        tx.execute(SCHEMA_MIGRATIONS_TABLE)
+        rows = tx.execute(
+            "SELECT version, name, applied_at FROM schema_migrations ORDER BY version;",
+            fetch=True
+        ) or []
+    return {version: (name, applied_at) for version, name, applied_at in rows}
+
+
+def pending_migrations(db, target=None):
+    """
+    Migrations not yet applied, in version order (up to `target` if given).
+    """
+    applied = applied_versions(db)
+    return [
+        m for m in sorted(MIGRATIONS, key=lambda m: m[0])
+        if m[0] not in applied and (target is None or m[0] <= target)
+    ]
+
+
+def apply_migrations(db, target=None):
+    """
+    Apply every pending migration up to `target` (default: latest).
+
+    Each migration runs in one transaction together with its
+    schema_migrations row, under an advisory lock, so a failed migration
+    leaves nothing half-applied and concurrent runners apply it once.
+
+    Parameters:
+        db (Database): database helper.
+        target (int, optional): highest version to apply.
+
+    Returns:
+        list: versions applied by this call.
+    """
+    applied_now = []
+    for version, name, statements in pending_migrations(db, target):
+        with db.transaction() as tx:
+            tx.execute("SELECT pg_advisory_xact_lock(%s);", (MIGRATION_LOCK_KEY,))
+            already = tx.execute(
+                "SELECT 1 FROM schema_migrations WHERE version = %s;",
+                (version,),
+                fetch=True
+            )
+            if already:
+                continue
+            for statement in statements:
+                tx.execute(statement)
+            tx.execute(
+                "INSERT INTO schema_migrations (version, name) VALUES (%s, %s);",
+                (version, name)
+            )
+        print(f"Applied migration {version}: {name}")
+        applied_now.append(version)
+    return applied_now
@@ -0,0 +1,209 @@
+import os
+import time
+import threading
+from collections import deque
+import psycopg2
+from psycopg2 import pool
+
+
+# ---------------------------------------------------------------------
+# Blocking, thread-safe connection pool
+#
+# Notes:
+# - Drop-in for psycopg2.pool.SimpleConnectionPool (getconn / putconn /
+#   closeall), safe to share between threads.
+# - When every connection is checked out, getconn() waits (FIFO: the
+#   longest waiter gets the next free connection) for up to `timeout`
+#   seconds, then raises PoolTimeout instead of failing immediately.
+# - Sized per worker process from DB_POOL_MIN / DB_POOL_MAX; waits give
+#   up after DB_POOL_TIMEOUT seconds.
+# ---------------------------------------------------------------------
+
+DB_POOL_MIN = int(os.getenv("DB_POOL_MIN", "1"))
+DB_POOL_MAX = int(os.getenv("DB_POOL_MAX", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+
+
+class PoolTimeout(pool.PoolError):
+    """
+    No connection became available within the pool timeout.
+    """
+
+
+class _Waiter:
+    __slots__ = ("event", "conn")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.conn = None
+
+
+class BlockingConnectionPool:
+    """
+    Bounded pool of psycopg2 connections with a FIFO wait queue.
+
+    Parameters:
+    - minconn (int): connections opened up front.
+    - maxconn (int): hard cap on open connections.
+    - timeout (float): seconds getconn() waits before raising PoolTimeout.
+    - **kwargs: passed to psycopg2.connect.
+    """
+
+    def __init__(self, minconn=DB_POOL_MIN, maxconn=DB_POOL_MAX,
+                 timeout=DB_POOL_TIMEOUT, **kwargs):
+        if maxconn < 1 or minconn > maxconn:
+            raise ValueError("Pool needs 1 <= maxconn and minconn <= maxconn")
+
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.pid = os.getpid()
+        self._kwargs = kwargs
+        self._lock = threading.Lock()
+        self._idle = deque()      # free connections, most recently used last
+        self._waiters = deque()   # _Waiter, oldest first
+        self._size = 0            # open connections (idle + checked out)
+        self._closed = False
+        self._stats = {
+            "acquired": 0,
+            "waits": 0,
+            "timeouts": 0,
+            "wait_seconds_total": 0.0,
+            "wait_seconds_max": 0.0,
+        }
+
+        for _ in range(minconn):
+            self._idle.append(psycopg2.connect(**self._kwargs))
+            self._size += 1
+
+    def getconn(self):
+        """
+        Check out a connection, waiting up to `timeout` seconds.
+        """
+        with self._lock:
+            if self._closed:
+                raise pool.PoolError("connection pool is closed")
+            self._stats["acquired"] += 1
+
+            # Don't jump the queue: only take a free slot if nobody waits.
+            reserved = False
+            if not self._waiters:
+                if self._idle:
+                    return self._idle.pop()
+                if self._size < self.maxconn:
+                    self._size += 1  # reserve the slot; connect outside the lock
+                    reserved = True
+
+            if not reserved:
+                waiter = _Waiter()
+                self._waiters.append(waiter)
+                self._stats["waits"] += 1
+
+        if reserved:
+            try:
+                return psycopg2.connect(**self._kwargs)
+            except Exception:
+                self._free_slot()
+                raise
+
+        started = time.monotonic()
+        got = waiter.event.wait(self.timeout)
+        waited = time.monotonic() - started
+
+        with self._lock:
+            self._stats["wait_seconds_total"] += waited
+            self._stats["wait_seconds_max"] = max(self._stats["wait_seconds_max"], waited)
+            if not got and waiter.conn is None:
+                self._waiters.remove(waiter)
+                self._stats["timeouts"] += 1
+                raise PoolTimeout(
+                    f"no database connection available after {self.timeout:.1f}s"
+                )
+
+        if waiter.conn is _NEW_SLOT:
+            # A slot was freed for us; open a fresh connection in it.
+            try:
+                return psycopg2.connect(**self._kwargs)
+            except Exception:
+                self._free_slot()
+                raise
+        return waiter.conn
+
+    def putconn(self, conn, close=False):
+        """
+        Return a connection; close=True (or a closed conn) drops it.
+        """
+        if not close and conn.closed == 0:
+            # Don't hand out a connection with an open transaction.
+            try:
+                conn.rollback()
+            except Exception:
+                close = True
+
+        if close or conn.closed != 0 or self._closed:
+            try:
+                conn.close()
+            except Exception:
+                pass
+            self._free_slot()
+            return
+
+        with self._lock:
+            if self._waiters:
+                waiter = self._waiters.popleft()
+                waiter.conn = conn
+                waiter.event.set()
+            else:
+                self._idle.append(conn)
+
+    def _free_slot(self):
+        with self._lock:
+            if self._waiters and not self._closed:
+                # Keep the slot reserved and let the oldest waiter open it.
+                waiter = self._waiters.popleft()
+                waiter.conn = _NEW_SLOT
+                waiter.event.set()
+            else:
+                self._size -= 1
+
+    def closeall(self):
+        with self._lock:
+            self._closed = True
+            idle, self._idle = list(self._idle), deque()
+            self._size -= len(idle)
+        for conn in idle:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats.update({
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": self._size - len(self._idle),
+                "waiting": len(self._waiters),
+                "maxconn": self.maxconn,
+                "timeout": self.timeout,
+            })
+        return stats
+
+    def abandon(self):
+        """
+        Forget every connection without closing it. Used in a forked child:
+        closing would terminate the parent's sessions on the shared sockets.
+        """
+        with self._lock:
+            _inherited.extend(self._idle)
+            self._idle.clear()
+            self._closed = True
+
+
+# Sentinel handed to a waiter when a slot (not a connection) is freed.
+_NEW_SLOT = object()
+
+# Connections inherited across fork(); referenced forever so they are never
+# garbage collected (which would close the parent's sockets).
+_inherited = []
@@ -0,0 +1,74 @@
+import os
+import re
+
+
+# ---------------------------------------------------------------------
+# Registry of hot-path queries run as server-side prepared statements
+#
+# Notes:
+# - Queries are written like any other db.execute query (%s placeholders)
+#   and registered once at import time under a unique name.
+# - Database.execute_prepared(name, params) PREPAREs the statement the
+#   first time a pooled connection runs it, then only sends EXECUTE, so
+#   Postgres skips parsing and (after a few runs) planning.
+# - DB_PREPARED_STATEMENTS=0 runs the same SQL through db.execute instead,
+#   which makes before/after timings easy to compare (see
+#   Database.query_stats).
+# ---------------------------------------------------------------------
+
+DB_PREPARED_STATEMENTS = os.getenv("DB_PREPARED_STATEMENTS", "1").strip().lower() not in ("0", "false", "no", "off")
+
+_NAME_RE = re.compile(r"^[a-z_][a-z0-9_]*$")
+_PLACEHOLDER_RE = re.compile(r"%%|%s")
+
+
+class PreparedStatement:
+    """
+    Attributes:
+    - name (str): statement name (also the key in query stats).
+    - query (str): the psycopg2-style SQL, for the non-prepared fallback.
+    - prepare_sql (str): "PREPARE name AS ..." with $1..$n placeholders.
+    - execute_sql (str): "EXECUTE name (%s, ...)".
+    """
+
+    def __init__(self, name, query):
+        if not _NAME_RE.match(name):
+            raise ValueError(f"Invalid prepared statement name: {name!r}")
+
+        n_params = 0
+
+        def _positional(match):
+            nonlocal n_params
+            if match.group(0) == "%%":
+                return "%"
+            n_params += 1
+            return f"${n_params}"
+
+        self.name = name
+        self.query = query
+        self.prepare_sql = f"PREPARE {name} AS {_PLACEHOLDER_RE.sub(_positional, query)}"
+        self.n_params = n_params
+        args = ", ".join(["%s"] * n_params)
+        self.execute_sql = f"EXECUTE {name} ({args})" if n_params else f"EXECUTE {name}"
+
+
+_statements = {}
+
+
+def register_statement(name, query):
+    """
+    Register a hot query; returns its name for use with
+    db.execute_prepared(name, params, fetch).
+    """
+    existing = _statements.get(name)
+    if existing is not None and existing.query != query:
+        raise ValueError(f"Prepared statement {name!r} registered twice with different SQL")
+    _statements[name] = PreparedStatement(name, query)
+    return name
+
+
+def get_statement(name):
+    try:
+        return _statements[name]
+    except KeyError:
+        raise KeyError(f"Unknown prepared statement: {name!r}") from None